@@ -4,6 +4,10 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
+import sys
+
+# pipelines trained with train.py --engineered unpickle feature_engineering.py from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 st.set_page_config(page_title="Medical Device Failure Risk", layout="centered")
 
@@ -1,20 +1,53 @@
 # generate_v4_dataset.py
 """
-Generates synthetic_device_failure_dataset_v4.csv
+Generates v4-schema synthetic device failure data (default output
+synthetic_device_failure_dataset_generated.csv).
 Designed to have stronger, cleaner signals for failure prediction.
+
+Usage:
+    python datascript.py                                   # 3000 rows, seed 2025
+    python datascript.py -n 100000000 --chunk-size 1000000 --workers 8 -o fleet_100m.parquet
+
+Rows are generated in chunks of --chunk-size and streamed to the output (CSV, or
+Parquet for .parquet/.pq paths, which needs pyarrow), so memory is bounded by the
+chunk size. Chunk i draws from its own np.random.Generator seeded with
+SeedSequence(seed, spawn_key=(0, i)), so chunks are independent, can be built in
+any worker process, and the output is bit-reproducible for a given seed and chunk
+size whatever --workers is.
+
+Two whole-dataset statistics of the original script are replaced by streaming ones:
+  - the risk median used to center the logistic is estimated once from a pilot
+    sample (--pilot-size rows from its own stream) before any chunk is generated;
+  - prevalence targeting flips labels inside each chunk (highest-risk zeros or
+    lowest-risk ones), so every chunk and therefore the whole file lands near
+    --target.
+
+The committed synthetic_device_failure_dataset_v4.csv came from the original
+script (global np.random.seed(2025)) and cannot be regenerated by this one: the
+same seed now gives different rows. train.py's defaults and the v4 prediction
+CSVs depend on that file, so an existing output is never overwritten without
+--force.
 """
 
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 from scipy.special import expit
 
-# reproducibility
-np.random.seed(2025)
-
 # -----------------------
 # Parameters
 # -----------------------
 N = 3000  # number of rows
+SEED = 2025
+CHUNK_SIZE = 1_000_000
+PILOT_SIZE = 200_000
+TARGET_PREVALENCE = 0.408
+PREVALENCE_TOLERANCE = 0.01
 
 device_names = ["Ventilator", "CT Scanner", "Ultrasound", "MRI Scanner", "X-Ray",
                 "Infusion Pump", "ECG", "Patient Monitor"]
@@ -24,115 +57,229 @@ environments = ["ICU", "Ward", "Operating Room", "Lab", "Diagnostic Center"]
 criticality_levels = ["High", "Medium", "Low"]
 spare_parts = ["Good", "Moderate", "Poor"]
 
-# -----------------------
-# Base distributions
-# -----------------------
-device_age_years = np.random.poisson(lam=6, size=N)
-usage_hours_per_week = np.clip(
-    np.random.normal(loc=60, scale=18, size=N).astype(int), 5, 168
-)
-maintenance_frequency_per_year = np.random.choice(
-    [0, 1, 2, 4, 6, 12], size=N, p=[0.02, 0.08, 0.18, 0.32, 0.28, 0.12]
-)
-last_maintenance_gap_days = np.clip(
-    (365 / np.maximum(maintenance_frequency_per_year, 1)).astype(int) +
-    np.random.randint(-10, 40, size=N),
-    0, 720
-)
-failures_past_year = np.random.poisson(lam=0.12, size=N)
-
-# Error logs: stronger relation and lower noise
-base_error = (device_age_years * 1.5 +
-              usage_hours_per_week * 0.14 +
-              last_maintenance_gap_days * 0.1)
-error_noise = np.random.normal(0, 3, size=N)  # reduced noise for clearer signal
-error_logs_past_month = np.clip((base_error / 3 + error_noise).astype(int), 0, 400)
-
-manufacturers_sample = np.random.choice(manufacturers, size=N, p=[0.18, 0.15, 0.14, 0.12, 0.12, 0.18, 0.11])
 manu_rating_map = {
     "GE Healthcare": 4, "Siemens": 4, "Philips": 3, "Canon Medical": 3,
     "Medtronic": 3, "Mindray": 2, "Fujifilm": 3
 }
-manufacturer_support_rating = np.array([manu_rating_map[m] for m in manufacturers_sample]) \
-                              + np.random.randint(-1, 2, size=N)
-manufacturer_support_rating = np.clip(manufacturer_support_rating, 1, 5)
 
-device_name_sample = np.random.choice(device_names, size=N, p=[0.14, 0.12, 0.16, 0.10, 0.14, 0.15, 0.10, 0.09])
-environment_sample = np.random.choice(environments, size=N, p=[0.28, 0.28, 0.14, 0.10, 0.20])
-criticality_sample = np.random.choice(criticality_levels, size=N, p=[0.45, 0.40, 0.15])
-spare_parts_sample = np.random.choice(spare_parts, size=N, p=[0.34, 0.36, 0.30])
+# categoricals are sampled as integer codes into the lists above and only become
+# pandas Categoricals when a chunk is assembled
+CATEGORICALS = {
+    "device_name": device_names,
+    "manufacturer": manufacturers,
+    "environment": environments,
+    "criticality_level": criticality_levels,
+    "spare_parts_availability": spare_parts,
+}
+MANU_RATING = np.array([manu_rating_map[m] for m in manufacturers])  # code -> base rating
+HIGH_CRITICALITY = criticality_levels.index("High")
+POOR_SPARES = spare_parts.index("Poor")
+
+# spawn_key namespaces: (0, i) for chunk i, (1,) for the pilot sample
+_CHUNK_KEY = 0
+_PILOT_KEY = 1
+
+
+def _rng(seed, *spawn_key):
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=spawn_key))
 
-# -----------------------
-# Risk score (strong signals + nonlinear interactions)
-# -----------------------
-risk_continuous = (
-    0.12 * error_logs_past_month +        # amplified
-    0.35 * device_age_years +            # amplified
-    0.02 * last_maintenance_gap_days +    # amplified
-    0.005 * usage_hours_per_week +
-    0.6 * failures_past_year +           # stronger effect for prior failures
-    -0.8 * (manufacturer_support_rating - 3) +  # stronger protective effect
-    0.9 * (criticality_sample == "High").astype(int) +  # high criticality strong impact
-    0.6 * (spare_parts_sample == "Poor").astype(int)    # poor spares strong impact
-)
-
-# strong nonlinear interactions
-risk_continuous += 0.06 * (device_age_years * (error_logs_past_month > 8))
-risk_continuous += 0.08 * (last_maintenance_gap_days > 90).astype(int) * error_logs_past_month
-risk_continuous += 0.5 * (failures_past_year > 0).astype(int)  # previous failures amplify risk
-
-# convert to probability using logistic (expit), center and scale to keep reasonable prevalence
-prob = expit((risk_continuous - np.median(risk_continuous)) * 0.85)
-
-# sample labels probabilistically (keeps realistic noise)
-failure_within_year = np.random.binomial(1, prob)
 
 # -----------------------
-# Assemble DataFrame
+# Base distributions
 # -----------------------
-df_v4 = pd.DataFrame({
-    "device_id": np.arange(1, N + 1),
-    "device_name": device_name_sample,
-    "manufacturer": manufacturers_sample,
-    "device_age_years": device_age_years,
-    "usage_hours_per_week": usage_hours_per_week,
-    "maintenance_frequency_per_year": maintenance_frequency_per_year,
-    "last_maintenance_gap_days": last_maintenance_gap_days,
-    "error_logs_past_month": error_logs_past_month,
-    "environment": environment_sample,
-    "criticality_level": criticality_sample,
-    "spare_parts_availability": spare_parts_sample,
-    "failures_past_year": failures_past_year,
-    "manufacturer_support_rating": manufacturer_support_rating,
-    "failure_within_year": failure_within_year
-})
+def sample_features(rng, n):
+    """
+    Draw n rows of device features (everything except device_id and the label);
+    categorical columns are integer codes into their CATEGORICALS list.
+    """
+    device_age_years = rng.poisson(lam=6, size=n)
+    usage_hours_per_week = np.clip(
+        rng.normal(loc=60, scale=18, size=n).astype(int), 5, 168
+    )
+    maintenance_frequency_per_year = rng.choice(
+        [0, 1, 2, 4, 6, 12], size=n, p=[0.02, 0.08, 0.18, 0.32, 0.28, 0.12]
+    )
+    last_maintenance_gap_days = np.clip(
+        (365 / np.maximum(maintenance_frequency_per_year, 1)).astype(int) +
+        rng.integers(-10, 40, size=n),
+        0, 720
+    )
+    failures_past_year = rng.poisson(lam=0.12, size=n)
+
+    # Error logs: stronger relation and lower noise
+    base_error = (device_age_years * 1.5 +
+                  usage_hours_per_week * 0.14 +
+                  last_maintenance_gap_days * 0.1)
+    error_noise = rng.normal(0, 3, size=n)  # reduced noise for clearer signal
+    error_logs_past_month = np.clip((base_error / 3 + error_noise).astype(int), 0, 400)
+
+    manufacturers_sample = rng.choice(len(manufacturers), size=n, p=[0.18, 0.15, 0.14, 0.12, 0.12, 0.18, 0.11])
+    manufacturer_support_rating = MANU_RATING[manufacturers_sample] + rng.integers(-1, 2, size=n)
+    manufacturer_support_rating = np.clip(manufacturer_support_rating, 1, 5)
+
+    device_name_sample = rng.choice(len(device_names), size=n, p=[0.14, 0.12, 0.16, 0.10, 0.14, 0.15, 0.10, 0.09])
+    environment_sample = rng.choice(len(environments), size=n, p=[0.28, 0.28, 0.14, 0.10, 0.20])
+    criticality_sample = rng.choice(len(criticality_levels), size=n, p=[0.45, 0.40, 0.15])
+    spare_parts_sample = rng.choice(len(spare_parts), size=n, p=[0.34, 0.36, 0.30])
+
+    return {
+        "device_name": device_name_sample,
+        "manufacturer": manufacturers_sample,
+        "device_age_years": device_age_years,
+        "usage_hours_per_week": usage_hours_per_week,
+        "maintenance_frequency_per_year": maintenance_frequency_per_year,
+        "last_maintenance_gap_days": last_maintenance_gap_days,
+        "error_logs_past_month": error_logs_past_month,
+        "environment": environment_sample,
+        "criticality_level": criticality_sample,
+        "spare_parts_availability": spare_parts_sample,
+        "failures_past_year": failures_past_year,
+        "manufacturer_support_rating": manufacturer_support_rating,
+    }
+
 
 # -----------------------
-# Adjust prevalence to ~40.8% if necessary by flipping highest-risk zeros
+# Risk score (strong signals + nonlinear interactions)
 # -----------------------
-current_prev = df_v4['failure_within_year'].mean()
-target = 0.408
-if abs(current_prev - target) > 0.01:
+def risk_score(f):
+    risk_continuous = (
+        0.12 * f["error_logs_past_month"] +        # amplified
+        0.35 * f["device_age_years"] +            # amplified
+        0.02 * f["last_maintenance_gap_days"] +    # amplified
+        0.005 * f["usage_hours_per_week"] +
+        0.6 * f["failures_past_year"] +           # stronger effect for prior failures
+        -0.8 * (f["manufacturer_support_rating"] - 3) +  # stronger protective effect
+        0.9 * (f["criticality_level"] == HIGH_CRITICALITY) +  # high criticality strong impact
+        0.6 * (f["spare_parts_availability"] == POOR_SPARES)    # poor spares strong impact
+    )
+
+    # strong nonlinear interactions
+    risk_continuous += 0.06 * (f["device_age_years"] * (f["error_logs_past_month"] > 8))
+    risk_continuous += 0.08 * (f["last_maintenance_gap_days"] > 90).astype(int) * f["error_logs_past_month"]
+    risk_continuous += 0.5 * (f["failures_past_year"] > 0).astype(int)  # previous failures amplify risk
+    return risk_continuous
+
+
+def estimate_risk_center(seed, pilot_size=PILOT_SIZE):
+    """Approximate median of the risk score from a pilot sample on its own stream."""
+    return float(np.median(risk_score(sample_features(_rng(seed, _PILOT_KEY), pilot_size))))
+
+
+def adjust_prevalence(labels, risk, target=TARGET_PREVALENCE, tolerance=PREVALENCE_TOLERANCE):
+    """Flip highest-risk zeros (or lowest-risk ones) in place to move the mean toward target."""
+    n = len(labels)
+    current_prev = labels.mean()
+    if abs(current_prev - target) <= tolerance:
+        return 0
     diff = target - current_prev
-    n_flip = int(abs(diff) * N)
+    n_flip = int(abs(diff) * n)
     if n_flip > 0:
         if diff > 0:
             # flip zeros with highest risk -> 1
-            zeros_idx = df_v4[df_v4['failure_within_year'] == 0].index
-            zeros_risk = risk_continuous[zeros_idx]
-            flip_idx = zeros_idx[np.argsort(-zeros_risk)[:n_flip]]
-            df_v4.loc[flip_idx, 'failure_within_year'] = 1
+            zeros_idx = np.flatnonzero(labels == 0)
+            flip_idx = zeros_idx[np.argpartition(-risk[zeros_idx], n_flip - 1)[:n_flip]]
+            labels[flip_idx] = 1
         else:
             # flip ones with lowest risk -> 0
-            ones_idx = df_v4[df_v4['failure_within_year'] == 1].index
-            ones_risk = risk_continuous[ones_idx]
-            flip_idx = ones_idx[np.argsort(ones_risk)[:n_flip]]
-            df_v4.loc[flip_idx, 'failure_within_year'] = 0
+            ones_idx = np.flatnonzero(labels == 1)
+            flip_idx = ones_idx[np.argpartition(risk[ones_idx], n_flip - 1)[:n_flip]]
+            labels[flip_idx] = 0
+    return n_flip
+
+
+def generate_chunk(seed, index, n_rows, start_id, center, target=TARGET_PREVALENCE):
+    """Rows start_id .. start_id + n_rows - 1 of the dataset; depends only on (seed, index)."""
+    rng = _rng(seed, _CHUNK_KEY, index)
+    features = sample_features(rng, n_rows)
+    risk_continuous = risk_score(features)
+
+    # convert to probability using logistic (expit), center and scale to keep reasonable prevalence
+    prob = expit((risk_continuous - center) * 0.85)
+
+    # sample labels probabilistically (keeps realistic noise)
+    failure_within_year = rng.binomial(1, prob)
+    if target is not None:
+        adjust_prevalence(failure_within_year, risk_continuous, target)
+
+    # -----------------------
+    # Assemble DataFrame
+    # -----------------------
+    for col, categories in CATEGORICALS.items():
+        features[col] = pd.Categorical.from_codes(features[col], categories)
+    df = pd.DataFrame({"device_id": np.arange(start_id, start_id + n_rows), **features})
+    df["failure_within_year"] = failure_within_year
+    return df
+
+
+def iter_dataset(n=N, chunk_size=CHUNK_SIZE, seed=SEED, workers=1, target=TARGET_PREVALENCE,
+                 pilot_size=PILOT_SIZE):
+    """Yield the dataset as DataFrame chunks in order, generating up to 2 * workers ahead."""
+    center = estimate_risk_center(seed, pilot_size)
+    tasks = [(seed, i, min(chunk_size, n - start), start + 1, center, target)
+             for i, start in enumerate(range(0, n, chunk_size))]
+    if workers <= 1:
+        for task in tasks:
+            yield generate_chunk(*task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(generate_chunk, *task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
 
 # -----------------------
-# Save CSV
+# Save CSV / Parquet
 # -----------------------
-out_path = "synthetic_device_failure_dataset_v4.csv"
-df_v4.to_csv(out_path, index=False)
-print("Saved v4 dataset to", out_path)
-print("Rows:", len(df_v4), "Failure rate:", df_v4['failure_within_year'].mean())
+def write_dataset(out_path, **kwargs):
+    """Stream iter_dataset(**kwargs) to out_path; returns (rows, failure rate)."""
+    parquet = os.path.splitext(out_path)[1].lower() in (".parquet", ".pq")
+    writer = None
+    rows = positives = 0
+    try:
+        for df in iter_dataset(**kwargs):
+            if parquet:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out_path, table.schema)
+                writer.write_table(table)
+            else:
+                df.to_csv(out_path, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+            rows += len(df)
+            positives += int(df["failure_within_year"].sum())
+            print(f"  {rows:,} rows", file=sys.stderr)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows, positives / rows if rows else 0.0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", "--rows", type=int, default=N)
+    ap.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--workers", type=int, default=1, help="processes generating chunks")
+    ap.add_argument("--target", type=float, default=TARGET_PREVALENCE,
+                    help="failure prevalence to steer each chunk towards")
+    ap.add_argument("--pilot-size", type=int, default=PILOT_SIZE,
+                    help="rows sampled to estimate the risk median")
+    ap.add_argument("-o", "--output", default="synthetic_device_failure_dataset_generated.csv")
+    ap.add_argument("--force", action="store_true", help="overwrite --output if it exists")
+    args = ap.parse_args(argv)
+    if os.path.exists(args.output) and not args.force:
+        ap.error(f"{args.output} exists; pass --force to overwrite it")
+
+    rows, rate = write_dataset(args.output, n=args.rows, chunk_size=args.chunk_size, seed=args.seed,
+                               workers=args.workers, target=args.target, pilot_size=args.pilot_size)
+    print("Saved dataset to", args.output)
+    print("Rows:", rows, "Failure rate:", rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# train.py
+"""
+Trains the candidate failure-prediction pipelines from Modelling.ipynb and saves
+the best one.
+
+Usage:
+    python train.py                                        # v4 CSV, logreg/rf/gb, best by ROC AUC
+    python train.py --data fleet_1m.parquet --models hgb,logreg --metric average_precision
+    python train.py --engineered                           # add the notebook's engineered features
+
+The ColumnTransformer (OneHotEncoder + StandardScaler) is fitted once on the
+training split and its output is shared by every candidate, which are then
+fitted in parallel with joblib (--jobs, default all cores). Each saved artifact is
+a normal Pipeline(preprocessor, clf) like best_model_gb.joblib, so app2.py,
+score_file.py and model_export.py can serve it. Next to it goes
+<name>.manifest.json holding metrics for all candidates, feature order, a hash of
+the training data, and fit times, and <name>.drift.json, the reference profile of
+the training split that ../drift.py compares live traffic with.
+
+--engineered puts ../feature_engineering.py's EngineeredFeatures in front of the
+preprocessor, so the saved pipeline derives cumulative_wear, error_rate, ... from
+the raw inputs itself and app2.py / CompiledScorer serve it unchanged.
+
+"hgb" (HistGradientBoostingClassifier) trains far faster than "gb" on large
+generated datasets (datascript.py -n 1000000 ...).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import (GradientBoostingClassifier, HistGradientBoostingClassifier,
+                              RandomForestClassifier)
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import classification_report, get_scorer
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from drift import build_profile, profile_path, save_profile  # noqa: E402
+from feature_engineering import ENGINEERED, EngineeredFeatures  # noqa: E402
+
+TARGET = "failure_within_year"
+DROP_COLS = ["device_id", TARGET]
+categorical_cols = ["device_name", "manufacturer", "environment",
+                    "criticality_level", "spare_parts_availability"]
+
+# candidate classifiers, as configured in Modelling.ipynb (hgb is new)
+CANDIDATES = {
+    "logreg": lambda: LogisticRegression(max_iter=500, class_weight="balanced", random_state=42),
+    "rf": lambda: RandomForestClassifier(n_estimators=200, max_depth=10, random_state=42,
+                                         class_weight="balanced"),
+    "gb": lambda: GradientBoostingClassifier(random_state=42),
+    "hgb": lambda: HistGradientBoostingClassifier(random_state=42),
+}
+REPORT_METRICS = ["roc_auc", "average_precision", "accuracy", "f1", "neg_log_loss"]
+
+
+def build_preprocessor(numeric_cols):
+    # Preprocessor: OHE for categoricals + scaling for numerics. Dense output, so the
+    # saved pipeline hands HistGradientBoosting the same input at serving time as in training
+    return ColumnTransformer(
+        transformers=[
+            ("cat", OneHotEncoder(handle_unknown="ignore", sparse_output=False), categorical_cols),
+            ("num", StandardScaler(), numeric_cols)
+        ]
+    )
+
+
+def load_dataset(path):
+    if os.path.splitext(path)[1].lower() in (".parquet", ".pq"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fit_candidate(name, Xt_train, y_train, Xt_test, y_test, metrics):
+    """Fit one classifier on the preprocessed training matrix and score it on the test matrix."""
+    clf = CANDIDATES[name]()
+    t0 = time.perf_counter()
+    clf.fit(Xt_train, y_train)
+    fit_seconds = time.perf_counter() - t0
+    scores = {m: float(get_scorer(m)(clf, Xt_test, y_test)) for m in metrics}
+    return name, clf, fit_seconds, scores
+
+
+def train(data_path, models, metric="roc_auc", jobs=-1, test_size=0.2, random_state=42, engineered=False):
+    """Fit the candidates; returns (best_name, {name: Pipeline}, manifest, report, drift profile)."""
+    # 1. Load dataset, define features & target
+    df = load_dataset(data_path)
+    X = df.drop(columns=[c for c in DROP_COLS if c in df.columns])
+    y = df[TARGET].to_numpy()
+    numeric_cols = [c for c in X.columns if c not in categorical_cols]
+
+    # 2. Train-test split
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=random_state, stratify=y
+    )
+
+    # 3. Preprocess once; every candidate trains on the same matrices
+    t0 = time.perf_counter()
+    steps = []
+    if engineered:
+        features = EngineeredFeatures().fit(X_train)
+        steps.append(("features", features))
+        preprocessor = build_preprocessor(numeric_cols + ENGINEERED)
+        Xt_train = preprocessor.fit_transform(features.transform(X_train))
+        Xt_test = preprocessor.transform(features.transform(X_test))
+    else:
+        preprocessor = build_preprocessor(numeric_cols)
+        Xt_train = preprocessor.fit_transform(X_train)
+        Xt_test = preprocessor.transform(X_test)
+    steps.append(("preprocessor", preprocessor))
+    preprocess_seconds = time.perf_counter() - t0
+
+    # 4. Fit candidates in parallel
+    metrics = list(dict.fromkeys([metric] + REPORT_METRICS))
+    fitted = Parallel(n_jobs=jobs)(
+        delayed(fit_candidate)(name, Xt_train, y_train, Xt_test, y_test, metrics) for name in models
+    )
+
+    pipelines, results = {}, {}
+    for name, clf, fit_seconds, scores in fitted:
+        pipelines[name] = Pipeline(steps=steps + [("clf", clf)])
+        results[name] = {"metrics": scores, "fit_seconds": round(fit_seconds, 3),
+                         "params": {k: v for k, v in clf.get_params().items()
+                                    if isinstance(v, (int, float, str, bool, type(None)))}}
+    best = max(results, key=lambda n: results[n]["metrics"][metric])
+
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "best_model": best,
+        "selection_metric": metric,
+        "candidates": results,
+        "feature_order": list(X.columns),
+        "categorical_cols": categorical_cols,
+        "numeric_cols": numeric_cols,
+        "engineered_features": ENGINEERED if engineered else [],
+        "target": TARGET,
+        "data": {"path": os.path.abspath(data_path), "sha256": file_sha256(data_path),
+                 "n_rows": int(len(df)), "n_train": int(len(y_train)), "n_test": int(len(y_test)),
+                 "prevalence": float(y.mean()), "test_size": test_size, "random_state": random_state},
+        "preprocess_seconds": round(preprocess_seconds, 3),
+        "versions": {"sklearn": sklearn.__version__, "numpy": np.__version__, "pandas": pd.__version__},
+    }
+    report = classification_report(y_test, pipelines[best].steps[-1][1].predict(Xt_test))
+    probs = pipelines[best].steps[-1][1].predict_proba(Xt_train)[:, 1]
+    profile = build_profile(X_train, numeric_cols, categorical_cols, probs)
+    return best, pipelines, manifest, report, profile
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--data", default="synthetic_device_failure_dataset_v4.csv")
+    ap.add_argument("--models", default="logreg,rf,gb",
+                    help=f"comma-separated subset of {', '.join(CANDIDATES)}")
+    ap.add_argument("--metric", default="roc_auc",
+                    help="sklearn scorer name used to pick the best model (higher is better)")
+    ap.add_argument("--jobs", type=int, default=-1, help="parallel fits (-1 = all cores)")
+    ap.add_argument("-o", "--output", default="best_model.joblib")
+    ap.add_argument("--save-all", action="store_true", help="also save every candidate as <output>.<name>.joblib")
+    ap.add_argument("--engineered", action="store_true", help="add the EngineeredFeatures step")
+    args = ap.parse_args(argv)
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    unknown = [m for m in models if m not in CANDIDATES]
+    if unknown:
+        ap.error(f"unknown models: {', '.join(unknown)}")
+    get_scorer(args.metric)  # fail fast on a bad metric name
+
+    t0 = time.perf_counter()
+    best, pipelines, manifest, report, profile = train(args.data, models, args.metric, args.jobs,
+                                                       engineered=args.engineered)
+    manifest["total_seconds"] = round(time.perf_counter() - t0, 3)
+
+    joblib.dump(pipelines[best], args.output)
+    manifest["artifact"] = {"path": os.path.abspath(args.output), "sha256": file_sha256(args.output)}
+    if args.save_all:
+        stem = os.path.splitext(args.output)[0]
+        manifest["all_artifacts"] = {}
+        for name, pipe in pipelines.items():
+            joblib.dump(pipe, f"{stem}.{name}.joblib")
+            manifest["all_artifacts"][name] = f"{stem}.{name}.joblib"
+    manifest_path = os.path.splitext(args.output)[0] + ".manifest.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    save_profile(profile, profile_path(args.output))
+
+    print(f"{'model':>8}  {args.metric:>18}  {'fit':>8}")
+    for name, res in sorted(manifest["candidates"].items(), key=lambda kv: -kv[1]["metrics"][args.metric]):
+        print(f"{name:>8}  {res['metrics'][args.metric]:18.4f}  {res['fit_seconds']:7.2f}s")
+    print(f"\n=== Best: {best} ===")
+    print(report)
+    print(f"Saved {best} model to {args.output}, manifest to {manifest_path} "
+          f"({manifest['total_seconds']:.1f}s total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# tune.py
+"""
+Hyperparameter search for the failure-prediction pipeline with successive halving.
+
+Usage:
+    python tune.py                                              # gb,hgb,rf on the v4 CSV
+    python tune.py --data fleet_1m.parquet --models hgb,gb --budget 600 -o tuned_model.joblib
+
+Each model family is searched with HalvingRandomSearchCV over the same
+ColumnTransformer(OneHotEncoder, StandardScaler) preprocessor as train.py. Round
+i scores the surviving candidates on factor**i times more rows and keeps the best
+1/factor. The Pipeline gets a joblib.Memory, so within a round and CV fold the
+preprocessor is fitted once and read from --cache-dir for every other candidate.
+Fits use all cores (--jobs).
+
+With --budget (seconds, whole run) the search is sized to finish in time. A pilot
+fit with default parameters estimates seconds per training row. From that, each
+family gets a cap on the rows its last round uses and on the rows of the final
+refit. Whatever budget a family leaves unused goes to the next one.
+Without a budget the full training split is used. The data is split three ways:
+training rows for the searches and refits, a validation split (--val-size of
+the non-test rows) and a test split. Every family's best pipeline is scored on
+the same validation rows, and the family with the best validation score is saved
+(without the cache) and described in <output>.manifest.json. The test split is
+scored for the report only and takes no part in selection, so its score is an
+unbiased estimate for the saved model. The families' CV scores are not
+comparable with each other: each halving search ends on its own row budget.
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from joblib import Memory
+from scipy.stats import loguniform
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import HalvingRandomSearchCV, train_test_split
+from sklearn.pipeline import Pipeline
+
+from train import (CANDIDATES, DROP_COLS, TARGET, build_preprocessor, categorical_cols, file_sha256,
+                   load_dataset)
+
+# searched parameters per model family (prefixed with the pipeline step name)
+SEARCH_SPACES = {
+    "gb": {
+        "clf__n_estimators": [50, 100, 200, 300],
+        "clf__learning_rate": loguniform(0.02, 0.3),
+        "clf__max_depth": [2, 3, 4, 5],
+        "clf__subsample": [0.6, 0.8, 1.0],
+        "clf__min_samples_leaf": [1, 5, 20, 50],
+    },
+    "hgb": {
+        "clf__max_iter": [100, 200, 400],
+        "clf__learning_rate": loguniform(0.02, 0.3),
+        "clf__max_leaf_nodes": [15, 31, 63],
+        "clf__min_samples_leaf": [10, 20, 50, 100],
+        "clf__l2_regularization": loguniform(1e-4, 1.0),
+    },
+    "rf": {
+        "clf__n_estimators": [100, 200, 400],
+        "clf__max_depth": [6, 10, 14, None],
+        "clf__min_samples_leaf": [1, 2, 5, 10],
+        "clf__max_features": ["sqrt", 0.5, None],
+        "clf__class_weight": [None, "balanced"],
+    },
+}
+
+FACTOR = 3
+MAX_ROUNDS = 4            # 27 candidates -> 9 -> 3 -> 1
+MIN_ROWS_PER_ROUND = 600  # smallest first-round sample worth scoring with CV
+PILOT_ROWS = 5000
+COST_SAFETY = 2.0         # searched parameters are on average pricier than the defaults
+
+
+def make_pipeline(name, numeric_cols, memory=None):
+    return Pipeline(steps=[("preprocessor", build_preprocessor(numeric_cols)),
+                           ("clf", CANDIDATES[name]())], memory=memory)
+
+
+def seconds_per_row(name, X, y, numeric_cols, random_state):
+    """Pilot fit with default parameters; training seconds per row."""
+    n = min(PILOT_ROWS, len(y))
+    idx = np.random.default_rng(random_state).choice(len(y), size=n, replace=False)
+    t0 = time.perf_counter()
+    make_pipeline(name, numeric_cols).fit(X.iloc[idx], y[idx])
+    return (time.perf_counter() - t0) / n
+
+
+def plan_rounds(max_rows):
+    """(rounds, candidates, min_rows) for a search whose last round uses max_rows."""
+    rounds = int(math.floor(math.log(max(max_rows, 1) / MIN_ROWS_PER_ROUND, FACTOR))) + 1
+    rounds = max(1, min(MAX_ROUNDS, rounds))
+    return rounds, FACTOR ** (rounds - 1), max_rows // FACTOR ** (rounds - 1)
+
+
+def tune_family(name, X, y, numeric_cols, metric, cv, budget, memory, jobs, random_state):
+    """Successive-halving search for one family; returns a result dict with the refitted pipeline."""
+    t_start = time.perf_counter()
+    n = len(y)
+    cores = joblib.cpu_count() if jobs == -1 else max(1, jobs)
+    t_row = seconds_per_row(name, X, y, numeric_cols, random_state)
+
+    if budget is None:
+        search_rows, refit_rows = n, n
+    else:
+        remaining = budget - (time.perf_counter() - t_start)
+        # one halving round costs ~ (candidates * rows) = max_rows, times the CV folds
+        per_round = cv * t_row * COST_SAFETY / cores
+        search_rows = int(0.75 * remaining / (MAX_ROUNDS * per_round))
+        refit_rows = int(0.25 * remaining / (t_row * COST_SAFETY))
+        search_rows = max(min(n, search_rows), MIN_ROWS_PER_ROUND)
+        refit_rows = max(min(n, refit_rows), search_rows if search_rows < n else n)
+    rounds, n_candidates, min_rows = plan_rounds(search_rows)
+
+    search = HalvingRandomSearchCV(
+        make_pipeline(name, numeric_cols, memory), SEARCH_SPACES[name], n_candidates=n_candidates,
+        factor=FACTOR, resource="n_samples", min_resources=min_rows,
+        max_resources=min_rows * FACTOR ** (rounds - 1), cv=cv, scoring=metric, refit=False,
+        n_jobs=jobs, random_state=random_state, error_score="raise")
+    search.fit(X, y)
+    search_seconds = time.perf_counter() - t_start
+
+    # refit the winner (without the cache) on as many rows as the budget allows
+    best = clone(make_pipeline(name, numeric_cols)).set_params(**search.best_params_)
+    idx = np.arange(n) if refit_rows >= n else \
+        np.random.default_rng(random_state).choice(n, size=refit_rows, replace=False)
+    t0 = time.perf_counter()
+    best.fit(X.iloc[idx], y[idx])
+    refit_seconds = time.perf_counter() - t0
+
+    return {
+        "pipeline": best,
+        "cv_score": float(search.best_score_),
+        "best_params": {k.replace("clf__", ""): (v.item() if hasattr(v, "item") else v)
+                        for k, v in search.best_params_.items()},
+        "rounds": rounds,
+        "candidates": n_candidates,
+        "rows_per_round": [int(r) for r in search.n_resources_],
+        "refit_rows": int(len(idx)),
+        "pilot_seconds_per_row": t_row,
+        "search_seconds": round(search_seconds, 3),
+        "refit_seconds": round(refit_seconds, 3),
+        "wall_seconds": round(time.perf_counter() - t_start, 3),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--data", default="synthetic_device_failure_dataset_v4.csv")
+    ap.add_argument("--models", default="gb,hgb,rf", help=f"comma-separated subset of {', '.join(SEARCH_SPACES)}")
+    ap.add_argument("--metric", default="roc_auc", help="sklearn scorer name (higher is better)")
+    ap.add_argument("--cv", type=int, default=3)
+    ap.add_argument("--val-size", type=float, default=0.2,
+                    help="share of the non-test rows held out to pick the family")
+    ap.add_argument("--budget", type=float, default=None, help="time budget in seconds for the whole search")
+    ap.add_argument("--jobs", type=int, default=-1, help="parallel fits (-1 = all cores)")
+    ap.add_argument("--cache-dir", default=None, help="preprocessing cache (default: a temporary directory)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("-o", "--output", default="tuned_model.joblib")
+    args = ap.parse_args(argv)
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    unknown = [m for m in models if m not in SEARCH_SPACES]
+    if unknown:
+        ap.error(f"unknown models: {', '.join(unknown)}")
+    scorer = get_scorer(args.metric)
+
+    t_start = time.perf_counter()
+    df = load_dataset(args.data)
+    X = df.drop(columns=[c for c in DROP_COLS if c in df.columns])
+    y = df[TARGET].to_numpy()
+    numeric_cols = [c for c in X.columns if c not in categorical_cols]
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=args.seed, stratify=y
+    )
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_train, y_train, test_size=args.val_size, random_state=args.seed, stratify=y_train
+    )
+
+    results = {}
+    cache = contextlib.nullcontext(args.cache_dir) if args.cache_dir else tempfile.TemporaryDirectory()
+    with cache as cache_dir:
+        memory = Memory(cache_dir, verbose=0)
+        for i, name in enumerate(models):
+            budget = None
+            if args.budget is not None:
+                # split what is left evenly over the families still to run
+                budget = (args.budget - (time.perf_counter() - t_start)) / (len(models) - i)
+                if budget <= 0:
+                    print(f"{name}: skipped, time budget exhausted")
+                    continue
+            res = tune_family(name, X_train, y_train, numeric_cols, args.metric, args.cv, budget,
+                              memory, args.jobs, args.seed)
+            res["val_score"] = float(scorer(res["pipeline"], X_val, y_val))
+            res["test_score"] = float(scorer(res["pipeline"], X_test, y_test))
+            results[name] = res
+            print(f"{name}: cv {args.metric} {res['cv_score']:.4f}, val {res['val_score']:.4f}, "
+                  f"test {res['test_score']:.4f}, "
+                  f"{res['candidates']} candidates over rows {res['rows_per_round']}, "
+                  f"refit on {res['refit_rows']:,} rows, {res['wall_seconds']:.1f}s")
+    if not results:
+        raise SystemExit("No model family finished within the budget")
+
+    # same validation rows for every family; cv_score depends on each search's last round,
+    # and the test rows stay out of the choice so test_score is not biased by it
+    best = max(results, key=lambda n: results[n]["val_score"])
+    wall = time.perf_counter() - t_start
+    joblib.dump(results[best]["pipeline"], args.output)
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "best_model": best,
+        "selection_metric": args.metric,
+        "selected_on": "val_score",
+        "split_rows": {"train": int(len(y_train)), "val": int(len(y_val)), "test": int(len(y_test))},
+        "budget_seconds": args.budget,
+        "wall_seconds": round(wall, 3),
+        "families": {n: {k: v for k, v in r.items() if k != "pipeline"} for n, r in results.items()},
+        "feature_order": list(X.columns),
+        "data": {"path": os.path.abspath(args.data), "sha256": file_sha256(args.data), "n_rows": int(len(df))},
+        "artifact": {"path": os.path.abspath(args.output), "sha256": file_sha256(args.output)},
+    }
+    manifest_path = os.path.splitext(args.output)[0] + ".manifest.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"\nBest: {best} (cv {args.metric} {results[best]['cv_score']:.4f}, "
+          f"val {results[best]['val_score']:.4f}, test {results[best]['test_score']:.4f}) "
+          f"params {results[best]['best_params']}")
+    print(f"Wall time {wall:.1f}s" + (f" of {args.budget:.0f}s budget" if args.budget else ""))
+    print(f"Saved to {args.output}, manifest to {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
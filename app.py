@@ -1,20 +1,41 @@
 # app.py - Flask backend with React frontend served
 
 import joblib
+import numbers
+import numpy as np
 import pandas as pd
-import traceback
 import logging
 import os
+import threading
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
 
-# ---------- load artifacts once ----------
-art = joblib.load("risk_model_artifacts.joblib")
-FEATURE_ORDER = art["feature_order"]
-MODEL = art["model_bin"]
-IMPUTER = art.get("imputer", None)   # SimpleImputer or Series/dict or None
-SCALER  = art.get("scaler", None)    # likely None for RF
-MODEL_PATH = art.get("model_path", "risk_model_artifacts.joblib")
+from http_cache import PrecomputedJSON
+from metrics import Metrics, cache_collector, instrument, model_collector
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from validation import DeviceSchema
+
+# recall-model artifact (feature_order, model_bin, imputer), hot-reloaded from this path
+ARTIFACT_PATH = os.environ.get("RISK_ARTIFACT_PATH", "risk_model_artifacts.joblib")
+METADATA_MAX_AGE = int(os.environ.get("METADATA_MAX_AGE", 300))
+# hot reload: seconds between artifact checks (0 = only via /admin/reload) and admin token
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", 5))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+# reject categorical values outside the artifact's categories (get_dummies ignores them otherwise)
+STRICT_CATEGORIES = os.environ.get("STRICT_CATEGORIES") == "1"
+# /predict-risk with a JSON array body: max payloads per request
+MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH_SIZE", 50000))
+
+# fields every /predict-risk payload needs; the artifact's metadata can add more and their categories
+PAYLOAD_FIELDS = {
+    "classification": "string",
+    "action_classification": "string",
+    "determined_cause": "string",
+    "type": "string",
+    "implanted": "string",
+    "year_initiated": "integer",
+}
 
 # ---------- Flask setup ----------
 app = Flask(__name__, static_folder="build/assets")
@@ -30,38 +51,102 @@ logging.basicConfig(level=logging.INFO)
 app.logger.setLevel(logging.INFO)
 
 # ---------- helper functions ----------
-def _impute(df: pd.DataFrame) -> pd.DataFrame:
-    if hasattr(IMPUTER, "transform") and type(IMPUTER).__name__ == "SimpleImputer":
-        return pd.DataFrame(IMPUTER.transform(df), columns=FEATURE_ORDER, index=df.index)
-    if isinstance(IMPUTER, pd.Series):
-        return df.fillna(IMPUTER.reindex(FEATURE_ORDER))
-    if isinstance(IMPUTER, dict):
-        return df.fillna(pd.Series(IMPUTER).reindex(FEATURE_ORDER))
-    return df.fillna(0)
-
-def _validate_payload(json_data):
-    expected = {
-        "classification": str,
-        "action_classification": str,
-        "determined_cause": str,
-        "type": str,
-        "implanted": str,
-        "year_initiated": int
+def build_feature_index(feature_order):
+    """
+    Where a payload entry lands in FEATURE_ORDER, as pd.get_dummies(...).reindex(...) put it:
+    a numeric field in the column of its own name, a string field in "<field>_<value>".
+    Any "_" in a column name can be the field/value separator, so every split is indexed.
+    """
+    numeric, dummies = {}, {}
+    for j, c in enumerate(feature_order):
+        numeric.setdefault(c, j)
+        for i, ch in enumerate(c):
+            if ch == "_":
+                dummies.setdefault((c[:i], c[i + 1:]), j)
+    return numeric, dummies
+
+def resolve_imputation(imputer, feature_order):
+    """
+    (missing marker, fill vector over FEATURE_ORDER) doing what the imputer did per request:
+    SimpleImputer statistics_, a Series/dict of fill values (columns without one stay
+    missing) or 0 for everything.
+    """
+    if hasattr(imputer, "transform") and type(imputer).__name__ == "SimpleImputer":
+        fill = pd.Series(np.asarray(imputer.statistics_, dtype=float),
+                         index=getattr(imputer, "feature_names_in_", feature_order))
+        missing = imputer.missing_values
+        if missing is None or missing is pd.NA or (isinstance(missing, float) and np.isnan(missing)):
+            missing = np.nan
+    elif isinstance(imputer, (pd.Series, dict)):
+        fill, missing = pd.Series(imputer, dtype=float), np.nan
+    else:
+        fill, missing = pd.Series(0.0, index=feature_order), np.nan
+    return missing, fill.reindex(feature_order).to_numpy(dtype=float)
+
+def encode_payloads(payloads, snap, out=None):
+    """Fill a (len(payloads), len(FEATURE_ORDER)) matrix straight from the payload dicts."""
+    numeric, dummies = snap.feature_index
+    X = np.zeros((len(payloads), len(snap.feature_order))) if out is None else out
+    if out is not None:
+        X.fill(0.0)
+    for row, payload in zip(X, payloads):
+        for k, v in payload.items():
+            if isinstance(v, str):
+                j = dummies.get((k, v))
+                if j is not None:
+                    row[j] = 1.0
+            elif isinstance(v, numbers.Real):
+                j = numeric.get(k)
+                if j is not None:
+                    row[j] = v
+    missing, fill = snap.fill
+    holes = np.isnan(X) if missing is np.nan else X == missing
+    if holes.any():
+        X[holes] = np.broadcast_to(fill, X.shape)[holes]
+    return X
+
+def _row_buffer(snap):
+    """Per-thread (1, n_features) row reused by single /predict-risk requests."""
+    buf = getattr(snap.buffers, "row", None)
+    if buf is None:
+        buf = snap.buffers.row = np.zeros((1, len(snap.feature_order)))
+    return buf
+
+def predict_high(snap, X):
+    """P(high risk) per encoded row; models without predict_proba give their 0/1 prediction."""
+    if snap.named_input:
+        X = pd.DataFrame(X, columns=snap.feature_order, copy=False)
+    try:
+        return snap.model.predict_proba(X)[:, 1]
+    except Exception:
+        return np.asarray(snap.model.predict(X), dtype=float)
+
+def _risk_result(snap, p, row):
+    return {
+        "risk_binary": "High" if p >= 0.5 else "Low",
+        "probability_high": round(p, 4),
+        "features_fired_sample": [snap.feature_order[j] for j in np.flatnonzero(row)[:12].tolist()],
     }
-    missing = []
-    bad_types = []
-    for k, t in expected.items():
-        if k not in json_data:
-            missing.append(k)
-        else:
-            val = json_data[k]
-            if t is int:
-                if not isinstance(val, int):
-                    bad_types.append(f"{k} should be int")
-            else:
-                if not isinstance(val, str):
-                    bad_types.append(f"{k} should be str")
-    return missing, bad_types
+
+def build_schema(metadata_payload):
+    """Request schema from PAYLOAD_FIELDS plus the columns and categories in the artifact metadata."""
+    meta = metadata_payload or {}
+    fields = dict(PAYLOAD_FIELDS)
+    for c in meta.get("categorical_cols", []):
+        fields.setdefault(c, "string")
+    for c in meta.get("numeric_cols", []):
+        fields.setdefault(c, "number")
+    categories = {c: v for c, v in meta.get("categorical_values", {}).items() if fields.get(c) == "string"}
+    return DeviceSchema(fields, categories, strict=STRICT_CATEGORIES)
+
+def _cache_key(json_data, relevant_keys):
+    """Sorted (key, value) pairs of the payload fields the model can see."""
+    key = tuple(sorted((k, v) for k, v in json_data.items() if k in relevant_keys))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
 
 # ---------------- Metadata extraction endpoint ----------------
 from sklearn.compose import ColumnTransformer
@@ -71,7 +156,7 @@ def _get_transformers_from_column_transformer(ct: ColumnTransformer):
     transformers = getattr(ct, "transformers", None) or getattr(ct, "transformers_", None) or []
     return transformers
 
-def extract_metadata_from_pipeline(candidate):
+def extract_metadata_from_pipeline(candidate, art=None):
     meta = {"categorical_cols": [], "categorical_values": {}, "numeric_cols": []}
     try:
         if candidate is None:
@@ -88,6 +173,7 @@ def extract_metadata_from_pipeline(candidate):
             pre = candidate
 
         if pre is None:
+            art = art or {}
             pre = art.get("preprocessor") or art.get("pre") or art.get("pipeline")
 
         if pre is None:
@@ -161,28 +247,98 @@ def extract_metadata_from_pipeline(candidate):
 
     return meta
 
-@app.route("/metadata", methods=["GET"])
-def metadata():
+def build_metadata(art, model_path, version):
+    candidate = art.get("pipeline") or art.get("preprocessor") or art.get("pre") or None
+    if candidate is None:
+        candidate = art["model_bin"]
+
+    meta = extract_metadata_from_pipeline(candidate, art)
+    categorical_values = meta.get("categorical_values", {})
+    for k in ("classification", "action_classification", "type", "implanted", "determined_cause"):
+        categorical_values.setdefault(k, [])
+    return {
+        "categorical_cols": meta.get("categorical_cols", []),
+        "categorical_values": categorical_values,
+        "numeric_cols": meta.get("numeric_cols", []),
+        "model_info": {"model_path": model_path, "model_version": version}
+    }
+
+# ---------- load artifacts (hot-swappable) ----------
+def load_artifacts(path, version):
+    art = joblib.load(path)
+    feature_order = art["feature_order"]
+    model_path = art.get("model_path", "risk_model_artifacts.joblib")
+    feature_index = build_feature_index(feature_order)
+
+    # metadata is extracted and serialized once per loaded artifact
     try:
-        candidate = art.get("pipeline") or art.get("preprocessor") or art.get("pre") or None
-        if candidate is None:
-            candidate = MODEL
-
-        meta = extract_metadata_from_pipeline(candidate)
-        categorical_values = meta.get("categorical_values", {})
-        for k in ("classification", "action_classification", "type", "implanted", "determined_cause"):
-            categorical_values.setdefault(k, [])
-        response = {
-            "categorical_cols": meta.get("categorical_cols", []),
-            "categorical_values": categorical_values,
-            "numeric_cols": meta.get("numeric_cols", []),
-            "model_info": {"model_path": MODEL_PATH}
-        }
-        app.logger.info("Serving /metadata keys: %s", list(response["categorical_values"].keys()))
-        return jsonify(response)
-    except Exception as e:
+        metadata = PrecomputedJSON(build_metadata(art, model_path, version), METADATA_MAX_AGE)
+        app.logger.info("Built /metadata keys: %s", list(metadata.payload["categorical_values"].keys()))
+    except Exception:
         app.logger.exception("Failed to build metadata")
-        return jsonify({"error": str(e)}), 500
+        metadata = None
+
+    return {
+        "art": art,
+        "feature_order": feature_order,
+        "model": art["model_bin"],
+        "imputer": art.get("imputer", None),   # SimpleImputer or Series/dict or None
+        "scaler": art.get("scaler", None),     # likely None for RF
+        "model_path": model_path,
+        # payload keys that can reach a FEATURE_ORDER column through get_dummies ("key" or "key_<value>")
+        "relevant_keys": set(feature_index[0]) | {k for k, _ in feature_index[1]},
+        # request encoding is resolved once per artifact: field=value -> column, imputation -> fill vector
+        "feature_index": feature_index,
+        "fill": resolve_imputation(art.get("imputer", None), feature_order),
+        "named_input": hasattr(art["model_bin"], "feature_names_in_"),
+        "buffers": threading.local(),
+        "metadata": metadata,
+        "schema": build_schema(metadata.payload if metadata is not None else None),
+    }
+
+def warmup_artifacts(snap):
+    predict_high(snap, encode_payloads([{}], snap))
+
+registry = ModelRegistry(ARTIFACT_PATH, load_artifacts, warmup=warmup_artifacts)
+registry.watch(MODEL_WATCH_INTERVAL)
+
+# prediction cache (size 0 disables it); entries carry the model version they were scored with
+cache = PredictionCache(int(os.environ.get("PREDICTION_CACHE_SIZE", 10000)),
+                        float(os.environ.get("PREDICTION_CACHE_TTL", 300)),
+                        version_fn=lambda: registry.version, check_interval=0)
+
+# per-stage timings of /predict-risk on GET /metrics (METRICS_ENABLED=0 turns it off)
+metrics = Metrics()
+metrics.collector(cache_collector(cache))
+metrics.collector(model_collector(registry))
+request_timer = instrument(app, metrics, ["predict"])
+
+def _admin_allowed():
+    return ADMIN_TOKEN is None or request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+
+@app.route("/admin/model", methods=["GET"])
+def admin_model():
+    return jsonify(registry.status())
+
+@app.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    """Reload the artifact in the background (?wait=1 to block until swapped)."""
+    if not _admin_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    force = request.args.get("force") == "1"
+    if request.args.get("wait") == "1":
+        registry.reload(force=force)
+        status = registry.status()
+        return jsonify(status), (500 if status["last_error"] else 200)
+    registry.reload_async(force=force)
+    return jsonify({"status": "reloading", "serving_version": registry.version}), 202
+
+@app.route("/metadata", methods=["GET"])
+def metadata():
+    snap = registry.current
+    if snap.metadata is None:
+        return jsonify({"error": "metadata unavailable for the loaded artifact"}), 500
+    return snap.metadata.response(request)
 
 @app.route("/_debug_metadata_stub", methods=["GET"])
 def _debug_metadata_stub():
@@ -200,39 +356,83 @@ def _debug_metadata_stub():
     })
 
 # ---------- Prediction endpoint ----------
+def _invalid_payload(errors):
+    return {
+        "error": "invalid payload",
+        "missing": [e["field"] for e in errors if e["error"] == "missing"],
+        "type_errors": [e["message"] if e["field"] is None else f"{e['field']}: {e['message']}"
+                        for e in errors if e["error"] != "missing"],
+        "fields": errors,
+    }
+
 @app.route("/predict-risk", methods=["POST"])
 def predict():
+    """
+    One payload (JSON object) -> one result, or a JSON array of payloads ->
+      { "results": [ { "index": 0, "risk_binary": "High", "probability_high": 0.94,
+                       "features_fired_sample": [...] },
+                     { "index": 1, "error": "invalid payload", "fields": [...], ... } ],
+        "n_scored": 1, "n_errors": 1, "model_version": "..." }
+    """
+    snap = registry.current
+    timer = request_timer()
     try:
         json_data = request.get_json(force=True)
+        timer.stage("parse")
+        if isinstance(json_data, list):
+            return _predict_batch(snap, json_data, timer)
         if not isinstance(json_data, dict):
             return jsonify({"error": "Invalid JSON payload"}), 400
 
-        missing, bad_types = _validate_payload(json_data)
-        if missing or bad_types:
-            return jsonify({"error": "invalid payload", "missing": missing, "type_errors": bad_types}), 400
+        errors = snap.schema.validate(json_data)
+        timer.stage("validate")
+        if errors:
+            return jsonify(_invalid_payload(errors)), 400
 
-        row = pd.DataFrame([json_data])
-        X = pd.get_dummies(row).reindex(columns=FEATURE_ORDER, fill_value=0)
-        X = _impute(X)
+        key = _cache_key(json_data, snap.relevant_keys)
+        cached = cache.get(key)
+        timer.stage("cache")
+        if cached is not None and cached["model_version"] == snap.version:
+            return jsonify(cached)
 
-        try:
-            proba_high = float(MODEL.predict_proba(X)[:, 1][0])
-        except Exception:
-            pred = MODEL.predict(X)[0]
-            proba_high = float(pred)
+        X = encode_payloads([json_data], snap, out=_row_buffer(snap))
+        timer.stage("encode")
 
-        label = "High" if proba_high >= 0.5 else "Low"
-        fired = [c for c in X.columns if X.iloc[0][c] != 0][:12]
+        proba_high = float(predict_high(snap, X)[0])
+        timer.stage("predict")
 
-        return jsonify({
-            "risk_binary": label,
-            "probability_high": round(proba_high, 4),
-            "features_fired_sample": fired
-        })
+        result = dict(_risk_result(snap, proba_high, X[0]), model_version=snap.version)
+        cache.put(key, result)
+        return jsonify(result)
 
     except Exception:
-        tb = traceback.format_exc()
-        return jsonify({"error": "internal_server_error", "trace": tb}), 500
+        # details go to the server log, not the client
+        app.logger.exception("Prediction failed")
+        return jsonify({"error": "internal_server_error"}), 500
+
+def _predict_batch(snap, payloads, timer):
+    timer.batch(len(payloads))
+    if len(payloads) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch of {len(payloads)} payloads exceeds limit of {MAX_BATCH_SIZE}"}), 413
+
+    valid, errors = snap.schema.validate_batch(payloads)
+    timer.stage("validate")
+    X = encode_payloads([payloads[i] for i in valid], snap)
+    timer.stage("encode")
+    probs = predict_high(snap, X) if len(valid) else np.empty(0)
+    timer.stage("predict")
+
+    results = [None] * len(payloads)
+    for r, (i, p) in enumerate(zip(valid, probs.tolist())):
+        results[i] = dict(_risk_result(snap, p, X[r]), index=i)
+    for i, fields in errors.items():
+        results[i] = dict(_invalid_payload(fields), index=i)
+    return jsonify({"results": results, "n_scored": len(valid), "n_errors": len(errors),
+                    "model_version": snap.version})
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(cache.stats())
 
 # ---------- Serve React frontend ----------
 @app.route("/", defaults={"path": ""})
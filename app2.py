@@ -2,19 +2,69 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import joblib
+import numpy as np
 import pandas as pd
 import os
+import contextlib
+import json
+import threading
 import traceback
 
-MODEL_PATH = "best_model_gb.joblib"  # ensure this file exists in backend/ folder
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+from drift import DriftMonitor, load_profile, profile_path
+from fast_scorer import CompiledScorer
+from fleet import Fleet
+from http_cache import PrecomputedJSON
+from model_export import is_compiled_artifact, load_compiled
+from metrics import NULL_TIMER, Metrics, cache_collector, instrument, model_collector
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache, feature_key
+from scoring import InvalidDevice, categorize_prob_fixed, categorize_probs, pipeline_columns, score_devices
+from validation import DeviceSchema, format_errors
+
+# joblib Pipeline, or a directory written by model_export.py (served without sklearn)
+MODEL_PATH = os.environ.get("MODEL_PATH", "best_model_gb.joblib")  # ensure this exists in backend/ folder
+
+# batch limits (rows per request and raw request bytes)
+MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH_SIZE", 50000))
+MAX_BATCH_BYTES = int(os.environ.get("PREDICT_MAX_BATCH_BYTES", 64 * 1024 * 1024))
+
+# parallel batch scoring: worker processes (1 = off) and the batch size that triggers it
+PREDICT_WORKERS = int(os.environ.get("PREDICT_WORKERS", 1))
+PARALLEL_MIN_ROWS = int(os.environ.get("PREDICT_PARALLEL_MIN_ROWS", 20000))
+
+# single-device prediction cache (size 0 disables it)
+CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 10000))
+CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 300))
+
+# hot reload: seconds between artifact checks (0 = only via /admin/reload) and admin token
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", 5))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+METADATA_MAX_AGE = int(os.environ.get("METADATA_MAX_AGE", 300))
+
+# fleet table scored at startup for /fleet analytics (unset = disabled, since every worker
+# import scores it), and an optional on-disk store directory that keeps the scored fleet
+# across restarts (seeded from FLEET_PATH), e.g.
+#   FLEET_PATH=Part2/synthetic_device_failure_dataset_v4.csv
+FLEET_PATH = os.environ.get("FLEET_PATH", "")
+FLEET_STORE = os.environ.get("FLEET_STORE")
+FLEET_TOP_K_MAX = int(os.environ.get("FLEET_TOP_K_MAX", 1000))
+
+# reject categorical values the model has never seen: "1" / "0", unset = only if the
+# model's OneHotEncoder would raise on them (handle_unknown="error")
+STRICT_CATEGORIES = os.environ.get("STRICT_CATEGORIES")
+
+# input-drift monitoring against the model's reference profile (drift.py); empty = disabled
+DRIFT_PROFILE = os.environ.get("DRIFT_PROFILE", profile_path(MODEL_PATH))
 
 app = Flask(__name__)
 CORS(app)  # in production, restrict origins
 
-# Load model on startup
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"Model file not found at {MODEL_PATH}. Place your joblib Pipeline there.")
-model = joblib.load(MODEL_PATH)
+
+@app.errorhandler(RequestEntityTooLarge)
+def body_too_large(e):
+    return jsonify({"error": f"Request body exceeds {MAX_BATCH_BYTES} bytes"}), 413
 
 
 def extract_metadata_from_pipeline(pipeline):
@@ -25,7 +75,8 @@ def extract_metadata_from_pipeline(pipeline):
         if pre is None:
             return meta
 
-        for name, trans, cols in pre.transformers:
+        # fitted transformers carry categories_; the unfitted spec in .transformers does not
+        for name, trans, cols in getattr(pre, "transformers_", pre.transformers):
             if name == "cat":
                 cat_cols = list(cols)
                 meta["categorical_cols"] = cat_cols
@@ -38,7 +89,9 @@ def extract_metadata_from_pipeline(pipeline):
                         meta["categorical_values"][col] = []
             if name == "num":
                 try:
-                    meta["numeric_cols"] = list(cols)
+                    # inputs only: engineered columns are derived by the pipeline itself
+                    inputs = set(getattr(pipeline, "feature_names_in_", cols))
+                    meta["numeric_cols"] = [c for c in cols if c in inputs]
                 except Exception:
                     pass
     except Exception:
@@ -46,24 +99,205 @@ def extract_metadata_from_pipeline(pipeline):
     return meta
 
 
-@app.route("/metadata", methods=["GET"])
-def metadata():
-    try:
-        meta = extract_metadata_from_pipeline(model)
-        meta["model_info"] = {"model_path": MODEL_PATH}
-        return jsonify(meta)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+def metadata_from_scorer(scorer):
+    """Frontend metadata for a compiled artifact, which has no sklearn pipeline."""
+    return {
+        "categorical_cols": list(scorer.cat_cols),
+        "categorical_values": {c: [str(v) for v in sorted(lut, key=lut.get)]
+                               for c, lut in zip(scorer.cat_cols, scorer.cat_maps)},
+        "numeric_cols": list(scorer.num_cols),
+    }
+
 
+def _rejects_unknown(pipeline):
+    """Whether the pipeline's OneHotEncoder raises on categories it was not fitted on."""
+    if STRICT_CATEGORIES is not None:
+        return STRICT_CATEGORIES == "1"
+    pre = pipeline.named_steps.get("preprocessor") if pipeline is not None else None
+    cat = dict((name, trans) for name, trans, _ in getattr(pre, "transformers_", [])).get("cat")
+    return getattr(cat, "handle_unknown", "ignore") == "error"
 
-def categorize_prob_fixed(p: float) -> str:
-    """Fixed cutoffs: Low=0.30, High=0.70."""
-    if p >= 0.70:
-        return "High Risk"
-    elif p >= 0.30:
-        return "Moderate Risk"
+
+def load_model(path, version):
+    """Load the model and everything derived from it for one snapshot."""
+    if is_compiled_artifact(path):
+        # fast-start artifact: memory-mapped arrays, no sklearn import
+        pipeline = None
+        scorer = load_compiled(path)
+        columns, numeric_cols = scorer.columns, scorer.num_cols
+        meta = metadata_from_scorer(scorer)
     else:
-        return "Safe"
+        pipeline = joblib.load(path)
+        columns, numeric_cols = pipeline_columns(pipeline)
+
+        # Compile a pandas-free scorer from the pipeline; fall back to the pipeline if unsupported
+        try:
+            scorer = CompiledScorer.from_pipeline(pipeline)
+        except Exception:
+            traceback.print_exc()
+            scorer = None
+        meta = extract_metadata_from_pipeline(pipeline)
+
+    # request validation is compiled from the same metadata (compiled scorers ignore unknown categories)
+    schema = DeviceSchema.from_columns(columns, numeric_cols, meta["categorical_values"],
+                                       strict=_rejects_unknown(pipeline))
+
+    # metadata is extracted and serialized once per loaded model
+    meta["model_info"] = {"model_path": path, "model_version": version}
+    return {"model": pipeline, "scorer": scorer, "columns": columns,
+            "numeric_cols": numeric_cols, "schema": schema, "meta": meta,
+            "metadata": PrecomputedJSON(meta, METADATA_MAX_AGE)}
+
+
+def warmup_model(snap):
+    """Score one synthetic device on every path so the first real request is not cold."""
+    meta = snap.meta
+    device = {c: (meta["categorical_values"].get(c) or [""])[0] for c in meta["categorical_cols"]}
+    device.update({c: 0 for c in snap.numeric_cols})
+    if snap.scorer is not None:
+        snap.scorer.predict_one(device)
+    if snap.model is not None:
+        snap.model.predict_proba(pd.DataFrame([device], columns=snap.columns))
+
+
+# Load model on startup
+if not os.path.exists(MODEL_PATH):
+    raise FileNotFoundError(f"Model file not found at {MODEL_PATH}. Place your joblib Pipeline there.")
+registry = ModelRegistry(MODEL_PATH, load_model, warmup=warmup_model)
+
+cache = PredictionCache(CACHE_SIZE, CACHE_TTL, version_fn=lambda: registry.version, check_interval=0)
+
+# per-stage timings of the scoring endpoints on GET /metrics (METRICS_ENABLED=0 turns it off)
+metrics = Metrics()
+metrics.collector(cache_collector(cache))
+metrics.collector(model_collector(registry))
+request_timer = instrument(app, metrics, ["predict_single", "predict_batch", "explain_batch"])
+
+
+def load_fleet(snap):
+    """Score the fleet table once with this snapshot's scorer; None if disabled or unavailable."""
+    if snap.scorer is None:
+        return None
+    has_table = bool(FLEET_PATH) and os.path.exists(FLEET_PATH)
+    try:
+        if FLEET_STORE:
+            # reopening rescores only if the model version changed since the last run
+            store = Fleet.open(FLEET_STORE, snap.scorer, snap.version)
+            if store.n == 0 and has_table:
+                from score_file import iter_chunks
+                for chunk in iter_chunks(FLEET_PATH, 500_000, columns=["device_id"] + snap.columns):
+                    store.upsert(chunk)
+                store.flush()
+            return store
+        if has_table:
+            return Fleet.from_file(FLEET_PATH, snap.scorer, snap.version)
+    except Exception:
+        traceback.print_exc()
+    return None
+
+
+fleet = load_fleet(registry.current)
+
+
+def _rescore_fleet(old, new):
+    """Registry swap hook: bring the fleet's stored scores to the new model version."""
+    if fleet is not None and new.scorer is not None:
+        try:
+            fleet.set_model(new.scorer, new.version)
+        except ValueError:
+            traceback.print_exc()
+
+
+def load_drift_monitor():
+    """Fresh monitor over DRIFT_PROFILE; None if disabled or the profile is missing."""
+    if not DRIFT_PROFILE or not os.path.exists(DRIFT_PROFILE):
+        return None
+    try:
+        return DriftMonitor(load_profile(DRIFT_PROFILE))
+    except (OSError, ValueError, KeyError):
+        traceback.print_exc()
+        return None
+
+
+drift = load_drift_monitor()
+
+
+def _on_swap(old, new):
+    """Registry swap hook: restart drift counts against the new profile, then rescore the fleet."""
+    global drift
+    # drift first: a failed rescore must not leave the old model's profile in place
+    drift = load_drift_monitor()
+    _rescore_fleet(old, new)
+
+
+registry.on_swap = _on_swap
+
+_parallel = None          # lease record of the current pool, see _parallel_scorer
+_parallel_lock = threading.Lock()
+
+
+def _release_pool(lease):
+    """Drop one user of a pool; a replaced pool is closed when its last user is done."""
+    with _parallel_lock:
+        lease["users"] -= 1
+        if lease["retired"] and lease["users"] == 0:
+            lease["scorer"].close(wait=False)
+
+
+@contextlib.contextmanager
+def _parallel_scorer(snap):
+    """
+    Lease the process pool for this snapshot's version; forked workers inherit its
+    scorer. A pool replaced by a newer version is closed only once no request is
+    still using it.
+    """
+    global _parallel
+    from parallel_scoring import ParallelScorer, matrix_dtype, share_scorer
+    with _parallel_lock:
+        if _parallel is not None and _parallel["version"] != snap.version:
+            old, _parallel = _parallel, None
+            old["retired"] = True
+            if old["users"] == 0:
+                old["scorer"].close(wait=False)
+        if _parallel is None:
+            share_scorer(snap.scorer.score_frame, snap.numeric_cols, snap.scorer.predict_proba)
+            _parallel = {"version": snap.version, "users": 0, "retired": False,
+                         "scorer": ParallelScorer(PREDICT_WORKERS, model_path=snap.path,
+                                                  dtype=matrix_dtype(snap.scorer.estimator))}
+        lease = _parallel
+        lease["users"] += 1
+    try:
+        yield lease["scorer"]
+    finally:
+        _release_pool(lease)
+
+
+def _admin_allowed():
+    return ADMIN_TOKEN is None or request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+
+
+@app.route("/admin/model", methods=["GET"])
+def admin_model():
+    return jsonify(registry.status())
+
+
+@app.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    """Reload the artifact in the background (?wait=1 to block until swapped)."""
+    if not _admin_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    force = request.args.get("force") == "1"
+    if request.args.get("wait") == "1":
+        registry.reload(force=force)
+        status = registry.status()
+        return jsonify(status), (500 if status["last_error"] else 200)
+    registry.reload_async(force=force)
+    return jsonify({"status": "reloading", "serving_version": registry.version}), 202
+
+
+@app.route("/metadata", methods=["GET"])
+def metadata():
+    return registry.current.metadata.response(request)
 
 
 @app.route("/health", methods=["GET"])
@@ -71,6 +305,35 @@ def health():
     return jsonify({"status": "ok"})
 
 
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(cache.stats())
+
+
+def _score_one(snap, device, timer=NULL_TIMER):
+    """Failure probability for one device that passed snap.schema."""
+    if snap.scorer is not None:
+        # fast path: encode the dict straight into a feature vector
+        x = snap.scorer.encode(device)
+        timer.stage("encode")
+        p = float(snap.scorer.predict_proba(x)[0])
+        timer.stage("predict")
+        return p
+
+    # build DataFrame with single row
+    df = pd.DataFrame([device])
+
+    # If pipeline training removed device_id, drop it before predict
+    if "device_id" in df.columns:
+        df = df.drop(columns=["device_id"])
+    timer.stage("encode")
+
+    # predict_proba using pipeline (which should include preprocessing)
+    probs = snap.model.predict_proba(df)[:, 1]
+    timer.stage("predict")
+    return float(probs[0])
+
+
 @app.route("/predict", methods=["POST"])
 def predict_single():
     """
@@ -78,35 +341,323 @@ def predict_single():
       { "device": { ...features... } }
 
     Response JSON:
-      { "failure_probability": 0.82, "risk_category": "High Risk", "input": {...} }
+      { "failure_probability": 0.82, "risk_category": "High Risk", "input": {...},
+        "model_version": "..." }
+
+    Invalid devices get a 400:
+      { "error": "missing fields: ...", "fields": [ { "field": "...", "error": "missing",
+                                                     "message": "field is required" }, ... ] }
     """
+    snap = registry.current
+    timer = request_timer()
     try:
         payload = request.get_json(force=True)
-        device = payload.get("device")
+        device = payload.get("device") if isinstance(payload, dict) else None
+        timer.stage("parse")
         if device is None:
             return jsonify({"error": "Missing 'device' object in request body"}), 400
 
-        # build DataFrame with single row
-        df = pd.DataFrame([device])
-
-        # If pipeline training removed device_id, drop it before predict
-        if "device_id" in df.columns:
-            df = df.drop(columns=["device_id"])
+        # before the cache: its keys equate True with 1, so a hit must not skip validation
+        errors = snap.schema.validate(device)
+        timer.stage("validate")
+        if errors:
+            raise InvalidDevice(format_errors(errors), errors)
 
-        # predict_proba using pipeline (which should include preprocessing)
-        probs = model.predict_proba(df)[:, 1]
-        p = float(probs[0])
+        key = feature_key(device, snap.columns)
+        hit = cache.get(key)
+        timer.stage("cache")
+        if hit is not None and hit[0] == snap.version:
+            p = hit[1]
+        else:
+            p = _score_one(snap, device, timer)
+            cache.put(key, (snap.version, p))
+        if drift is not None:
+            drift.observe(device, p)
         cat = categorize_prob_fixed(p)
 
         return jsonify({
             "failure_probability": p,
             "risk_category": cat,
-            "input": device
+            "input": device,
+            "model_version": snap.version
         })
+    except InvalidDevice as e:
+        return jsonify({"error": str(e), "fields": e.errors}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+def _read_body(limit=MAX_BATCH_BYTES):
+    """
+    The request body, read from the stream with a byte cap: a chunked body has no
+    Content-Length to check up front. Raises RequestEntityTooLarge past limit.
+    """
+    if request.content_length is not None and request.content_length > limit:
+        raise RequestEntityTooLarge()
+    chunks, size = [], 0
+    while True:
+        chunk = request.stream.read(min(1 << 20, limit + 1 - size))
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            raise RequestEntityTooLarge()
+
+
+def _read_batch_payload():
+    """Parse a batch body: JSON array, {"devices": [...]} or NDJSON (one device per line)."""
+    mimetype = request.mimetype or ""
+    body = _read_body()
+    if mimetype in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        lines = body.decode("utf-8").splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get("devices")
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of devices or {\"devices\": [...]}")
+    return payload
+
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    Request body (JSON):
+      [ {...features...}, ... ]   or   { "devices": [ {...}, ... ] }
+    or NDJSON (Content-Type: application/x-ndjson), one device object per line.
+
+    Response JSON:
+      { "results": [ { "index": 0, "failure_probability": 0.82, "risk_category": "High Risk" },
+                     { "index": 1, "error": "missing fields: ...", "fields": [...] } ],
+        "n_scored": 1, "n_errors": 1, "model_version": "..." }
+    """
+    snap = registry.current
+    timer = request_timer()
+    try:
+        devices = _read_batch_payload()
+    except (ValueError, BadRequest) as e:
+        return jsonify({"error": f"Invalid batch payload: {e}"}), 400
+    timer.stage("parse")
+    timer.batch(len(devices))
+    if len(devices) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch of {len(devices)} devices exceeds limit of {MAX_BATCH_SIZE}"}), 413
+
+    try:
+        valid, errors = snap.schema.validate_batch(devices)
+        rows = [devices[i] for i in valid]
+        timer.stage("validate")
+        if snap.scorer is not None:
+            X = snap.scorer.encode_devices(rows)
+            timer.stage("encode")
+            if PREDICT_WORKERS > 1 and len(rows) >= PARALLEL_MIN_ROWS:
+                with _parallel_scorer(snap) as pool:
+                    probs = pool.predict_proba(X)
+            else:
+                probs = snap.scorer.predict_proba(X)
+        else:
+            probs = score_devices(snap.model, rows, snap.columns)
+        cats = categorize_probs(probs)
+        timer.stage("predict")
+        if drift is not None:
+            drift.observe_devices(rows, probs)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+    results = [None] * len(devices)
+    for i, p, c in zip(valid, probs.tolist(), cats.tolist()):
+        results[i] = {"index": i, "failure_probability": p, "risk_category": c}
+    for i, fields in errors.items():
+        results[i] = {"index": i, "error": format_errors(fields), "fields": fields}
+
+    return jsonify({"results": results, "n_scored": len(valid), "n_errors": len(errors),
+                    "model_version": snap.version})
+
+
+@app.route("/explain", methods=["POST"])
+def explain_batch():
+    """
+    Why each device got its score. Same request body as /predict/batch, plus an
+    optional ?top_k=N to keep only the N largest contributions per device.
+
+    Response JSON:
+      { "results": [ { "index": 0, "failure_probability": 0.82, "risk_category": "High Risk",
+                       "base_value": -0.82,
+                       "contributions": [ { "feature": "error_logs_past_month", "value": 15,
+                                            "contribution": 1.3 }, ... ] }, ... ],
+        "units": "log-odds", "n_scored": 1, "n_errors": 0, "model_version": "..." }
+
+    Contributions are in log-odds: base_value plus all contributions of a device is
+    the logit of its failure probability. One-hot columns are summed back into
+    their categorical field; engineered features, if the model has them, are
+    reported as fields of their own.
+    """
+    snap = registry.current
+    timer = request_timer()
+    if snap.scorer is None or snap.scorer.ensemble is None:
+        return jsonify({"error": "Explanations need a gradient boosting model"}), 501
+    try:
+        top_k = max(0, int(request.args.get("top_k", 0))) or None
+        devices = _read_batch_payload()
+    except (ValueError, BadRequest) as e:
+        return jsonify({"error": f"Invalid explain request: {e}"}), 400
+    timer.stage("parse")
+    timer.batch(len(devices))
+    if len(devices) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch of {len(devices)} devices exceeds limit of {MAX_BATCH_SIZE}"}), 413
+
+    try:
+        valid, errors = snap.schema.validate_batch(devices)
+        rows = [devices[i] for i in valid]
+        timer.stage("validate")
+        X = snap.scorer.encode_devices(rows)
+        timer.stage("encode")
+        bias, contrib = snap.scorer.explain(X)
+        probs = 1.0 / (1.0 + np.exp(-(bias + contrib.sum(axis=1))))
+        cats = categorize_probs(probs)
+        order = np.argsort(-np.abs(contrib), axis=1, kind="stable")[:, :top_k]
+        timer.stage("predict")
+    except ValueError as e:
+        # models without contributions got their 501 above; this is a device the encoder rejected
+        return jsonify({"error": f"Invalid explain request: {e}"}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+    fields = snap.scorer.fields
+    results = [None] * len(devices)
+    for r, (i, p, c) in enumerate(zip(valid, probs.tolist(), cats.tolist())):
+        device, row = snap.scorer.field_values(devices[i]), contrib[r].tolist()
+        results[i] = {"index": i, "failure_probability": p, "risk_category": c, "base_value": bias,
+                      "contributions": [{"feature": fields[j], "value": device[fields[j]],
+                                         "contribution": row[j]} for j in order[r].tolist()]}
+    for i, fields in errors.items():
+        results[i] = {"index": i, "error": format_errors(fields), "fields": fields}
+
+    return jsonify({"results": results, "units": "log-odds", "n_scored": len(valid),
+                    "n_errors": len(errors), "model_version": snap.version})
+
+
+def _list_arg(name):
+    """Query parameter as a list: ?f=a,b and ?f=a&f=b both give ["a", "b"]."""
+    return [v for raw in request.args.getlist(name) for v in raw.split(",") if v]
+
+
+@app.route("/drift", methods=["GET"])
+def drift_report():
+    """
+    Drift of live /predict and /predict/batch traffic against the model's training
+    profile: per-feature PSI (and binned KS for numeric features) plus the same for
+    the failure_probability distribution.
+
+    Response JSON:
+      { "status": "ok" | "warn" | "alert" | "insufficient_data", "n_observed": 5120,
+        "reference_n": 2400, "thresholds": {...},
+        "features": { "error_logs_past_month": { "type": "numeric", "psi": 0.03, "ks": 0.04,
+                                                 "status": "ok", "edges": [...], "counts": [...] }, ... },
+        "failure_probability": { "psi": 0.02, "ks": 0.03, ... }, "model_version": "..." }
+    """
+    monitor = drift
+    if monitor is None:
+        return jsonify({"error": f"No drift profile loaded (DRIFT_PROFILE={DRIFT_PROFILE!r})"}), 503
+    return jsonify(dict(monitor.report(), model_version=registry.version))
+
+
+@app.route("/drift/reset", methods=["POST"])
+def drift_reset():
+    """Start a new observation window (admin)."""
+    if not _admin_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    if drift is None:
+        return jsonify({"error": "No drift profile loaded"}), 503
+    drift.reset()
+    return jsonify({"status": "reset"})
+
+
+@app.route("/fleet/summary", methods=["GET"])
+def fleet_summary():
+    """
+    Precomputed risk aggregates over the scored fleet.
+
+    Query: one parameter per group field to filter on (comma-separated values),
+    e.g. ?criticality_level=High&manufacturer=Siemens,Philips; group_by=<fields>;
+    histograms=1 to add per-group probability histograms.
+
+    Response JSON:
+      { "overall": { "n": 1355, "mean_probability": 0.43, "risk_counts": {...}, "histogram": [...] },
+        "bin_edges": [...], "groups": [ { "manufacturer": "Siemens", "n": 210, ... }, ... ],
+        "n_devices": 3000, "model_version": "..." }
+    """
+    if fleet is None:
+        return jsonify({"error": "No fleet table loaded"}), 503
+    filters = {f: _list_arg(f) for f in fleet.group_fields if f in request.args}
+    try:
+        result = fleet.summary(filters, _list_arg("group_by"), request.args.get("histograms") == "1")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@app.route("/fleet/top", methods=["GET"])
+def fleet_top():
+    """
+    The K riskiest devices in the scored fleet, highest failure probability first.
+
+    Query: k (default 50, at most FLEET_TOP_K_MAX) and one parameter per categorical
+    field to filter on, e.g. ?k=20&device_name=Ventilator&environment=ICU,Lab.
+
+    Response JSON:
+      { "devices": [ { "device_id": ..., "failure_probability": 0.97, "risk_category": "High Risk",
+                       "device_name": "Ventilator", ... }, ... ],
+        "n_devices": 3000, "model_version": "..." }
+    """
+    if fleet is None:
+        return jsonify({"error": "No fleet table loaded"}), 503
+    try:
+        k = int(request.args.get("k", 50))
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+    if not 1 <= k <= FLEET_TOP_K_MAX:
+        return jsonify({"error": f"k must be between 1 and {FLEET_TOP_K_MAX}"}), 400
+    filters = {f: _list_arg(f) for f in fleet.cat_cols if f in request.args}
+    try:
+        result = fleet.top(k, filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@app.route("/fleet/devices", methods=["POST"])
+def fleet_upsert():
+    """
+    Add or replace fleet devices (matched on device_id). Only new rows and rows whose
+    inputs changed are scored; the aggregates are updated in place and an on-disk
+    store is flushed. Body as for /predict/batch.
+    """
+    if not _admin_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    if fleet is None:
+        return jsonify({"error": "No fleet table loaded"}), 503
+    try:
+        rows = pd.DataFrame(_read_batch_payload())
+        counts = fleet.upsert(rows)
+        fleet.flush()
+    except (ValueError, BadRequest) as e:
+        # BadRequest: werkzeug's own body errors, e.g. a client that disconnects mid-upload
+        return jsonify({"error": f"Invalid fleet update: {e}"}), 400
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+    counts.update({"n_devices": fleet.n, "model_version": fleet.version})
+    return jsonify(counts)
+
+
+registry.watch(MODEL_WATCH_INTERVAL)
+
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,224 @@
+# app2_asgi.py - asyncio serving mode for the app2 API with micro-batched /predict
+"""
+Run with an ASGI server, e.g.:
+    uvicorn app2_asgi:app --host 0.0.0.0 --port 5000
+
+POST /predict requests that arrive concurrently are queued and scored together:
+a micro-batch is flushed when it holds MICROBATCH_MAX_SIZE devices or when
+MICROBATCH_MAX_WAIT_MS has passed since its first device, whichever comes first.
+Validation and the prediction cache run per request before queueing, so a bad
+device only fails its own request. Each device is queued with the registry
+snapshot it was validated against and scored on that snapshot, so a model swap
+while a batch fills cannot score it with a model it was not checked for. GET /batching/stats reports batch sizes; the
+flushed batch sizes also appear on /metrics as prediction_batch_size{endpoint="microbatch"}.
+Every other route is served by the Flask app from app2.py (run in a thread).
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import traceback
+
+import app2
+from microbatch import MicroBatcher
+from prediction_cache import feature_key
+from scoring import categorize_prob_fixed, score_devices
+from validation import format_errors
+
+# micro-batching: max devices per batch (1 = no batching) and max wait for the batch to fill
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", 64))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", 2.0))
+
+JSON_HEADERS = [(b"content-type", b"application/json"), (b"access-control-allow-origin", b"*")]
+
+
+def score_batch(items):
+    """
+    Score (snapshot, device) pairs, each device on the snapshot that validated it
+    (one call per snapshot, normally just one); returns (version, p) per pair.
+    """
+    if app2.metrics.enabled:
+        app2.metrics.observe("prediction_batch_size", ("microbatch",), len(items))
+    groups = {}
+    for i, (snap, _device) in enumerate(items):
+        groups.setdefault(id(snap), (snap, []))[1].append(i)
+    results = [None] * len(items)
+    for snap, positions in groups.values():
+        devices = [items[i][1] for i in positions]
+        if snap.scorer is not None:
+            probs = snap.scorer.score_devices(devices)
+        else:
+            probs = score_devices(snap.model, devices, snap.columns)
+        for i, p in zip(positions, probs.tolist()):
+            results[i] = (snap.version, p)
+    return results
+
+
+# ---------- ASGI plumbing ----------
+class BodyTooLarge(Exception):
+    pass
+
+
+async def _read_body(receive, limit=app2.MAX_BATCH_BYTES):
+    """Whole request body; raises BodyTooLarge as soon as more than limit bytes arrived."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _too_large():
+    return 413, {"error": f"Request body exceeds {app2.MAX_BATCH_BYTES} bytes"}
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": JSON_HEADERS + [(b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif key != "CONTENT_LENGTH":
+            key = "HTTP_" + key
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _call_wsgi(wsgi_app, environ):
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+    result = wsgi_app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return started["status"], started["headers"], body
+
+
+async def _forward_to_flask(scope, receive, send):
+    try:
+        body = await _read_body(receive)
+    except BodyTooLarge:
+        await _send_json(send, *_too_large())
+        return
+    loop = asyncio.get_running_loop()
+    status, headers, payload = await loop.run_in_executor(
+        None, _call_wsgi, app2.app.wsgi_app, _wsgi_environ(scope, body))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": payload})
+
+
+# ---------- app ----------
+class MicroBatchApp:
+    def __init__(self, max_batch_size=MICROBATCH_MAX_SIZE, max_wait_ms=MICROBATCH_MAX_WAIT_MS):
+        self.batcher = MicroBatcher(score_batch, max_batch_size, max_wait_ms)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] != "http":
+            return
+        elif scope["path"] == "/predict" and scope["method"] == "POST":
+            await self.predict(receive, send)
+        elif scope["path"] == "/batching/stats" and scope["method"] == "GET":
+            await _send_json(send, 200, self.batcher.stats())
+        else:
+            await _forward_to_flask(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.batcher.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def predict(self, receive, send):
+        """Same request/response contract (and /metrics stage timings) as app2's /predict."""
+        timer = app2.metrics.timer("predict_single")
+        status, payload = await self._predict(receive, timer)
+        await _send_json(send, status, payload)
+        timer.finish(status)
+
+    async def _predict(self, receive, timer):
+        try:
+            payload = json.loads(await _read_body(receive))
+            device = payload.get("device") if isinstance(payload, dict) else None
+        except BodyTooLarge:
+            return _too_large()
+        except ValueError as e:
+            return 400, {"error": f"Invalid JSON: {e}"}
+        timer.stage("parse")
+        if device is None:
+            return 400, {"error": "Missing 'device' object in request body"}
+
+        snap = app2.registry.current
+        errors = snap.schema.validate(device)
+        timer.stage("validate")
+        if errors:
+            return 400, {"error": format_errors(errors), "fields": errors}
+
+        key = feature_key(device, snap.columns)
+        hit = app2.cache.get(key)
+        timer.stage("cache")
+        try:
+            if hit is not None and hit[0] == snap.version:
+                version, p = hit
+            else:
+                # queueing + the shared batch's encode and predict_proba
+                version, p = await self.batcher.submit((snap, device))
+                timer.stage("batch")
+                app2.cache.put(key, (version, p))
+        except Exception as e:
+            traceback.print_exc()
+            return 500, {"error": str(e)}
+        if app2.drift is not None:
+            app2.drift.observe(device, p)
+
+        return 200, {
+            "failure_probability": p,
+            "risk_category": categorize_prob_fixed(p),
+            "input": device,
+            "model_version": version,
+        }
+
+
+app = MicroBatchApp()
@@ -0,0 +1,130 @@
+# bench_datagen.py - generation time and peak RSS of Part2/datascript.py
+"""
+Usage (from the repo root):
+    python benchmarks/bench_datagen.py [--rows 1000000,10000000] [--chunk-size 1000000]
+
+Each run is a fresh process, so peak RSS (ru_maxrss) is per run. Rows are
+generated in memory and discarded; writing is not timed.
+
+  original        the pre-chunking script: global np.random, string-valued
+                  categoricals, a per-row rating lookup, pandas .loc label flips
+  vectorized-1    datascript.iter_dataset with one chunk of all rows (integer codes,
+                  lookup tables, argpartition flips, Categoricals at output)
+  vectorized      datascript.iter_dataset with --chunk-size chunks
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the generation part of Part2/datascript.py before it was chunked and vectorized
+ORIGINAL = '''
+import numpy as np, pandas as pd
+from scipy.special import expit
+np.random.seed(2025)
+N = ROWS
+device_names = ["Ventilator", "CT Scanner", "Ultrasound", "MRI Scanner", "X-Ray",
+                "Infusion Pump", "ECG", "Patient Monitor"]
+manufacturers = ["GE Healthcare", "Siemens", "Philips", "Canon Medical", "Medtronic", "Mindray", "Fujifilm"]
+environments = ["ICU", "Ward", "Operating Room", "Lab", "Diagnostic Center"]
+criticality_levels = ["High", "Medium", "Low"]
+spare_parts = ["Good", "Moderate", "Poor"]
+device_age_years = np.random.poisson(lam=6, size=N)
+usage_hours_per_week = np.clip(np.random.normal(loc=60, scale=18, size=N).astype(int), 5, 168)
+maintenance_frequency_per_year = np.random.choice([0, 1, 2, 4, 6, 12], size=N,
+                                                  p=[0.02, 0.08, 0.18, 0.32, 0.28, 0.12])
+last_maintenance_gap_days = np.clip((365 / np.maximum(maintenance_frequency_per_year, 1)).astype(int) +
+                                    np.random.randint(-10, 40, size=N), 0, 720)
+failures_past_year = np.random.poisson(lam=0.12, size=N)
+base_error = device_age_years * 1.5 + usage_hours_per_week * 0.14 + last_maintenance_gap_days * 0.1
+error_logs_past_month = np.clip((base_error / 3 + np.random.normal(0, 3, size=N)).astype(int), 0, 400)
+manufacturers_sample = np.random.choice(manufacturers, size=N, p=[0.18, 0.15, 0.14, 0.12, 0.12, 0.18, 0.11])
+manu_rating_map = {"GE Healthcare": 4, "Siemens": 4, "Philips": 3, "Canon Medical": 3,
+                   "Medtronic": 3, "Mindray": 2, "Fujifilm": 3}
+manufacturer_support_rating = np.clip(np.array([manu_rating_map[m] for m in manufacturers_sample])
+                                      + np.random.randint(-1, 2, size=N), 1, 5)
+device_name_sample = np.random.choice(device_names, size=N, p=[0.14, 0.12, 0.16, 0.10, 0.14, 0.15, 0.10, 0.09])
+environment_sample = np.random.choice(environments, size=N, p=[0.28, 0.28, 0.14, 0.10, 0.20])
+criticality_sample = np.random.choice(criticality_levels, size=N, p=[0.45, 0.40, 0.15])
+spare_parts_sample = np.random.choice(spare_parts, size=N, p=[0.34, 0.36, 0.30])
+risk_continuous = (0.12 * error_logs_past_month + 0.35 * device_age_years + 0.02 * last_maintenance_gap_days
+                   + 0.005 * usage_hours_per_week + 0.6 * failures_past_year
+                   - 0.8 * (manufacturer_support_rating - 3)
+                   + 0.9 * (criticality_sample == "High").astype(int)
+                   + 0.6 * (spare_parts_sample == "Poor").astype(int))
+risk_continuous += 0.06 * (device_age_years * (error_logs_past_month > 8))
+risk_continuous += 0.08 * (last_maintenance_gap_days > 90).astype(int) * error_logs_past_month
+risk_continuous += 0.5 * (failures_past_year > 0).astype(int)
+prob = expit((risk_continuous - np.median(risk_continuous)) * 0.85)
+failure_within_year = np.random.binomial(1, prob)
+df_v4 = pd.DataFrame({
+    "device_id": np.arange(1, N + 1), "device_name": device_name_sample, "manufacturer": manufacturers_sample,
+    "device_age_years": device_age_years, "usage_hours_per_week": usage_hours_per_week,
+    "maintenance_frequency_per_year": maintenance_frequency_per_year,
+    "last_maintenance_gap_days": last_maintenance_gap_days, "error_logs_past_month": error_logs_past_month,
+    "environment": environment_sample, "criticality_level": criticality_sample,
+    "spare_parts_availability": spare_parts_sample, "failures_past_year": failures_past_year,
+    "manufacturer_support_rating": manufacturer_support_rating, "failure_within_year": failure_within_year})
+current_prev = df_v4["failure_within_year"].mean()
+diff = 0.408 - current_prev
+n_flip = int(abs(diff) * N)
+if abs(diff) > 0.01 and n_flip > 0:
+    if diff > 0:
+        zeros_idx = df_v4[df_v4["failure_within_year"] == 0].index
+        flip_idx = zeros_idx[np.argsort(-risk_continuous[zeros_idx])[:n_flip]]
+        df_v4.loc[flip_idx, "failure_within_year"] = 1
+    else:
+        ones_idx = df_v4[df_v4["failure_within_year"] == 1].index
+        flip_idx = ones_idx[np.argsort(risk_continuous[ones_idx])[:n_flip]]
+        df_v4.loc[flip_idx, "failure_within_year"] = 0
+'''
+
+VECTORIZED = '''
+import sys
+sys.path.insert(0, "Part2")
+import datascript
+for df in datascript.iter_dataset(n=ROWS, chunk_size=CHUNK):
+    pass
+'''
+
+TIMED = '''
+import resource, time
+t0 = time.perf_counter()
+{body}
+print(time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def _run(body):
+    code = TIMED.format(body=body)
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=ROOT,
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        return None
+    seconds, rss_kb = out.stdout.split()
+    return float(seconds), int(rss_kb) / 1024
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", default="1000000,10000000")
+    ap.add_argument("--chunk-size", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    print(f"{'rows':>11}  {'variant':>13}  {'time':>8}  {'peak RSS':>10}")
+    for n in (int(x) for x in args.rows.split(",")):
+        variants = {
+            "original": ORIGINAL.replace("ROWS", str(n)),
+            "vectorized-1": VECTORIZED.replace("ROWS", str(n)).replace("CHUNK", str(n)),
+            "vectorized": VECTORIZED.replace("ROWS", str(n)).replace("CHUNK", str(args.chunk_size)),
+        }
+        for name, body in variants.items():
+            res = _run(body)
+            shown = f"{res[0]:7.2f}s  {res[1]:8.0f}MB" if res else "   failed (out of memory?)"
+            print(f"{n:>11,}  {name:>13}  {shown}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_explain.py - latency of Saabas explanations for 1k-device batches
+"""
+Usage (from the repo root):
+    python benchmarks/bench_explain.py [--rows 1000] [--repeat 50]
+
+Checks that bias + contributions reproduces the model's log-odds (joblib
+pipeline and a model_export.py artifact) and that field contributions are the
+one-hot sums. It then reports p50/p99 latency for a batch of --rows devices:
+
+  scorer.explain     encoded matrix -> per-field contributions
+  explain_devices    device dicts -> encode -> contributions
+  /explain           full Flask request with ?top_k=5 via the test client
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+
+from fast_scorer import CompiledScorer  # noqa: E402
+from model_export import export_compiled, load_compiled  # noqa: E402
+
+
+def _timeit(fn, repeat):
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return np.percentile(times, 50) * 1e3, np.percentile(times, 99) * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    pipeline = joblib.load(os.path.join(ROOT, "best_model_gb.joblib"))
+    scorer = CompiledScorer.from_pipeline(pipeline)
+    df = pd.read_csv(os.path.join(ROOT, "Part2", "synthetic_device_failure_dataset_v4.csv"))
+    df = df.drop(columns=["device_id", "failure_within_year"])
+    df = pd.concat([df] * (args.rows // len(df) + 1), ignore_index=True).head(args.rows)
+    devices = df.to_dict(orient="records")
+    X = scorer.encode_columns(df)
+
+    raw = pipeline.named_steps["clf"].decision_function(pipeline.named_steps["preprocessor"].transform(df))
+    bias, contrib = scorer.explain(X)
+    print(f"max |bias + sum(contrib) - sklearn log-odds| = {np.abs(bias + contrib.sum(1) - raw).max():.2e}")
+    _, feat = scorer.ensemble.contributions(X)
+    summed = np.zeros_like(contrib)
+    np.add.at(summed.T, scorer.field_index(), feat.T)
+    print(f"max |field contrib - summed one-hot contrib|   = {np.abs(summed - contrib).max():.2e}")
+    with tempfile.TemporaryDirectory() as tmp:
+        export_compiled(scorer, tmp)
+        _, e_contrib = load_compiled(tmp).explain(X)
+        print(f"max |compiled artifact - joblib| contributions = {np.abs(e_contrib - contrib).max():.2e}")
+
+    import app2
+    client = app2.app.test_client()
+    print(f"\n{args.rows} rows, {scorer.ensemble.n_trees} trees, {args.repeat} repeats")
+    print(f"{'path':>16}  {'p50':>9}  {'p99':>9}")
+    for name, fn in [
+        ("scorer.explain", lambda: scorer.explain(X)),
+        ("explain_devices", lambda: scorer.explain_devices(devices)),
+        ("/explain", lambda: client.post("/explain?top_k=5", json=devices)),
+    ]:
+        p50, p99 = _timeit(fn, args.repeat)
+        print(f"{name:>16}  {p50:7.2f}ms  {p99:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# bench_features.py - cost and correctness of the engineered-feature stage
+"""
+Usage (from the repo root):
+    python benchmarks/bench_features.py [--rows 1000000] [--n 2000]
+
+Checks:
+  - engineer_columns() reproduces the notebook's engineered columns in
+    Part2/v4_test_predictions_with_proba.csv
+  - the scalar path (one device dict) equals the vectorized path
+  - a Pipeline(EngineeredFeatures, preprocessor, gb) trained by train.py
+    --engineered scores identically through sklearn, CompiledScorer (frame, dicts,
+    single rows) and a model_export.py artifact
+
+Then reports the stage's cost:
+  engineer_columns on --rows generated rows, and score_frame with and without it
+  single-row p50/p99 of engineer() and of predict_one for both models
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Part2"))
+
+import datascript  # noqa: E402
+import train  # noqa: E402
+from fast_scorer import CompiledScorer  # noqa: E402
+from feature_engineering import ENGINEERED, engineer, engineer_columns  # noqa: E402
+from model_export import export_compiled, load_compiled  # noqa: E402
+
+DATA_PATH = os.path.join(ROOT, "Part2", "synthetic_device_failure_dataset_v4.csv")
+NOTEBOOK_PATH = os.path.join(ROOT, "Part2", "v4_test_predictions_with_proba.csv")
+
+
+def _best(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _latency_us(fn, items):
+    fn(items[0])
+    times = np.empty(len(items))
+    for i, item in enumerate(items):
+        t0 = time.perf_counter()
+        fn(item)
+        times[i] = time.perf_counter() - t0
+    return np.percentile(times, 50) * 1e6, np.percentile(times, 99) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--n", type=int, default=2000, help="single-row calls per path")
+    args = ap.parse_args()
+
+    nb = pd.read_csv(NOTEBOOK_PATH)
+    got = engineer_columns(nb)
+    # the CSV stores error_rate in shortest-repr decimal, so allow float rounding
+    print("max |engineer_columns - notebook columns|: "
+          + ", ".join(f"{c} {np.abs(got[c] - nb[c]).max():.0e}" for c in ENGINEERED))
+    records = nb.to_dict(orient="records")
+    scalar = pd.DataFrame([engineer(r) for r in records])
+    print(f"scalar path == vectorized path: {all(np.array_equal(scalar[c], got[c]) for c in ENGINEERED)}")
+
+    # fit both variants on the v4 data the shipped model was trained on
+    _, plain, *_ = train.train(DATA_PATH, ["gb"], jobs=1)
+    _, eng, *_ = train.train(DATA_PATH, ["gb"], jobs=1, engineered=True)
+    plain, eng = plain["gb"], eng["gb"]
+    plain_scorer, eng_scorer = CompiledScorer.from_pipeline(plain), CompiledScorer.from_pipeline(eng)
+
+    X = pd.read_csv(DATA_PATH).drop(columns=["device_id", "failure_within_year"])
+    devices = X.to_dict(orient="records")
+    ref = eng.predict_proba(X)[:, 1]
+    with tempfile.TemporaryDirectory() as tmp:
+        export_compiled(eng_scorer, tmp)
+        artifact = load_compiled(tmp)
+        diffs = {
+            "score_frame": np.abs(eng_scorer.score_frame(X) - ref).max(),
+            "score_devices": np.abs(eng_scorer.score_devices(devices) - ref).max(),
+            "predict_one": max(abs(eng_scorer.predict_one(d) - p) for d, p in zip(devices, ref)),
+            "artifact": np.abs(artifact.score_frame(X) - ref).max(),
+        }
+    print("max |compiled - sklearn pipeline|: " + ", ".join(f"{k} {v:.1e}" for k, v in diffs.items()))
+
+    big = pd.concat(datascript.iter_dataset(n=args.rows), ignore_index=True)
+    for c in datascript.CATEGORICALS:
+        big[c] = big[c].astype(object)
+    big = big.drop(columns=["device_id", "failure_within_year"])
+    t_eng = _best(lambda: engineer_columns(big))
+    t_plain = _best(lambda: plain_scorer.score_frame(big))
+    t_with = _best(lambda: eng_scorer.score_frame(big))
+    print(f"\n{args.rows:,} rows")
+    print(f"  engineer_columns            {t_eng:6.3f}s  ({args.rows / t_eng / 1e6:.1f}M rows/s)")
+    print(f"  score_frame, plain model    {t_plain:6.3f}s")
+    print(f"  score_frame, engineered     {t_with:6.3f}s")
+
+    items = (devices * (args.n // len(devices) + 1))[:args.n]
+    print(f"\nsingle row ({args.n} calls)      p50        p99")
+    for name, fn in [("engineer()", engineer),
+                     ("predict_one, plain model", plain_scorer.predict_one),
+                     ("predict_one, engineered", eng_scorer.predict_one)]:
+        p50, p99 = _latency_us(fn, items)
+        print(f"  {name:<26} {p50:6.1f}us  {p99:6.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bench_fleet.py - fleet aggregates: load, query and incremental update costs
+"""
+Usage (from the repo root):
+    python benchmarks/bench_fleet.py [--rows 1000000]
+
+Builds a fleet of --rows generated devices (Part2/datascript.py), then reports:
+the time to score it and build the aggregate cube; p50 latency of summary queries
+with and without filters and group-bys; and the time to upsert 1k changed
+devices. After the updates, the aggregates are checked against a full pandas
+recomputation.
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Part2"))
+
+import datascript  # noqa: E402
+from fast_scorer import CompiledScorer  # noqa: E402
+from fleet import Fleet  # noqa: E402
+
+QUERIES = [
+    ("overall", {}, []),
+    ("filter 1 field", {"criticality_level": ["High"]}, []),
+    ("filter 2, group 1", {"criticality_level": ["High"], "environment": ["ICU", "Lab"]}, ["manufacturer"]),
+    ("group 2 fields", {}, ["manufacturer", "device_name"]),
+    ("group all 4", {}, ["manufacturer", "device_name", "environment", "criticality_level"]),
+]
+
+
+def _p50(fn, repeat=200):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--updates", type=int, default=1000)
+    args = ap.parse_args()
+
+    scorer = CompiledScorer.from_pipeline(joblib.load(os.path.join(ROOT, "best_model_gb.joblib")))
+    df = pd.concat(datascript.iter_dataset(n=args.rows, chunk_size=500_000), ignore_index=True)
+    for c in datascript.CATEGORICALS:
+        df[c] = df[c].astype(object)
+
+    fleet = Fleet(scorer, "bench")
+    t0 = time.perf_counter()
+    for start in range(0, len(df), 500_000):
+        fleet.upsert(df.iloc[start:start + 500_000])
+    print(f"load + score {args.rows:,} devices: {time.perf_counter() - t0:.2f}s")
+
+    print(f"\n{'query':>20}  {'p50':>9}")
+    for name, filters, group_by in QUERIES:
+        print(f"{name:>20}  {_p50(lambda: fleet.summary(filters, group_by)):7.3f}ms")
+
+    rng = np.random.default_rng(0)
+    changed = df.iloc[rng.choice(len(df), args.updates, replace=False)].copy()
+    changed["error_logs_past_month"] += rng.integers(1, 10, size=len(changed))
+    changed["environment"] = rng.choice(datascript.environments, size=len(changed))
+    t0 = time.perf_counter()
+    fleet.upsert(changed)
+    print(f"\nupsert {args.updates:,} changed devices: {(time.perf_counter() - t0) * 1e3:.1f}ms")
+
+    df = df.set_index("device_id")
+    df.loc[changed["device_id"].to_numpy(), changed.columns.drop("device_id")] = \
+        changed.drop(columns="device_id").to_numpy()
+    df["p"] = scorer.score_frame(df)
+    expected = df.groupby(["environment", "manufacturer"])["p"].agg(["size", "mean"])
+    got = fleet.summary(group_by=["environment", "manufacturer"])["groups"]
+    err = max(abs(g["mean_probability"] - expected.loc[(g["environment"], g["manufacturer"]), "mean"]) for g in got)
+    sizes_ok = all(g["n"] == expected.loc[(g["environment"], g["manufacturer"]), "size"] for g in got)
+    print(f"check vs pandas: {len(got)} groups, counts match {sizes_ok}, max mean error {err:.1e}")
+    value = df["manufacturer"].iloc[0]
+    once = fleet.summary({"manufacturer": [value]}, histograms=True)["overall"]
+    twice = fleet.summary({"manufacturer": [value, value]}, histograms=True)["overall"]
+    print(f"repeated filter value == single value: {once == twice} (n={once['n']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# bench_fleet_store.py - incremental rescoring cost of the on-disk fleet store
+"""
+Usage (from the repo root):
+    python benchmarks/bench_fleet_store.py [--rows 1000000]
+
+Creates a fleet store of --rows generated devices in a temporary directory and
+times these steps:
+  - delta feeds of 1k / 10k / 100k changed devices (upsert + flush)
+  - resending 100k devices whose inputs did not change (hash check only)
+  - reopening the store
+  - a model version change, which rescores every device
+After the deltas, the stored probabilities are compared with a full rescore.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Part2"))
+
+import datascript  # noqa: E402
+from fast_scorer import CompiledScorer  # noqa: E402
+from fleet import Fleet  # noqa: E402
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    scorer = CompiledScorer.from_pipeline(joblib.load(os.path.join(ROOT, "best_model_gb.joblib")))
+    df = pd.concat(datascript.iter_dataset(n=args.rows, chunk_size=500_000), ignore_index=True)
+    for c in datascript.CATEGORICALS:
+        df[c] = df[c].astype(object)
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, "fleet")
+        fleet = Fleet.open(store, scorer, "v1")
+        t, _ = _timed(lambda: (fleet.upsert(df), fleet.flush()))
+        print(f"initial load of {args.rows:,} devices: {t:.2f}s\n")
+
+        print(f"{'delta':>26}  {'scored':>8}  {'time':>9}")
+        for k in (1_000, 10_000, 100_000):
+            idx = rng.choice(len(df), k, replace=False)
+            df.loc[idx, "error_logs_past_month"] += 1
+            df.loc[idx, "last_maintenance_gap_days"] += 7
+            t, counts = _timed(lambda: (fleet.upsert(df.iloc[idx]), fleet.flush())[0])
+            print(f"{f'{k:,} changed':>26}  {counts['updated']:>8,}  {t * 1e3:7.1f}ms")
+        idx = rng.choice(len(df), 100_000, replace=False)
+        t, counts = _timed(lambda: fleet.upsert(df.iloc[idx]))
+        print(f"{'100,000 resent, unchanged':>26}  {counts['updated']:>8,}  {t * 1e3:7.1f}ms")
+
+        expected = scorer.score_frame(df)
+        rows = fleet.index.lookup(df["device_id"].to_numpy())
+        print(f"\nmax |stored - full rescore| = {np.abs(fleet.column('prob')[rows] - expected).max():.1e}")
+
+        t, fleet = _timed(lambda: Fleet.open(store, scorer, "v1"))
+        print(f"reopen store: {t:.2f}s")
+        t, fleet = _timed(lambda: Fleet.open(store, scorer, "v2"))
+        print(f"reopen with new model version (full rescore): {t:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
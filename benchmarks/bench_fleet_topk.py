@@ -0,0 +1,111 @@
+# bench_fleet_topk.py - top-K riskiest devices: index build, query latency, updates
+"""
+Usage (from the repo root):
+    python benchmarks/bench_fleet_topk.py [--rows 10000000] [--k 50]
+
+Loads --rows generated devices (Part2/datascript.py) into a Fleet chunk by chunk,
+then reports:
+  - the time to build the per-partition sorted index (first top() call)
+  - p50/p99 latency of top-K queries with no filter, partition filters and a
+    filter on a non-partition field (spare_parts_availability)
+  - the time to upsert 1k changed devices with the index maintained in place
+Every query is checked against a brute-force sort of the fleet's probabilities,
+before and after the updates.
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Part2"))
+
+import datascript  # noqa: E402
+from fast_scorer import CompiledScorer  # noqa: E402
+from fleet import Fleet  # noqa: E402
+
+QUERIES = [
+    ("no filter", {}),
+    ("device_name", {"device_name": ["Ventilator"]}),
+    ("device + environment", {"device_name": ["Ventilator"], "environment": ["ICU", "Lab"]}),
+    ("3 partition fields", {"manufacturer": ["Siemens"], "environment": ["ICU"], "criticality_level": ["High"]}),
+    ("spare parts (scan)", {"spare_parts_availability": ["Good"]}),
+    ("device + spare parts", {"device_name": ["MRI Scanner"], "spare_parts_availability": ["Good"]}),
+]
+
+
+def _latency(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return np.percentile(times, 50) * 1e3, np.percentile(times, 99) * 1e3
+
+
+def _check(fleet, k):
+    """Largest probability gap between top() and a full sort, over all QUERIES."""
+    probs = fleet.column("prob")
+    worst = 0.0
+    for _, filters in QUERIES:
+        ok = np.ones(fleet.n, dtype=bool)
+        for f, wanted in filters.items():
+            ok &= np.isin(fleet.values(f), wanted)
+        expected = np.sort(probs[ok])[::-1][:k]
+        got = np.array([d["failure_probability"] for d in fleet.top(k, filters)["devices"]])
+        if len(got) != len(expected):
+            return float("inf")
+        worst = max(worst, float(np.abs(got - expected).max(initial=0.0)))
+    return worst
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=10_000_000)
+    ap.add_argument("--k", type=int, default=50)
+    ap.add_argument("--updates", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=100)
+    args = ap.parse_args()
+
+    scorer = CompiledScorer.from_pipeline(joblib.load(os.path.join(ROOT, "best_model_gb.joblib")))
+    fleet = Fleet(scorer, "bench")
+    t0 = time.perf_counter()
+    for chunk in datascript.iter_dataset(n=args.rows, chunk_size=500_000):
+        for c in datascript.CATEGORICALS:
+            chunk[c] = chunk[c].astype(object)
+        fleet.upsert(chunk)
+    print(f"load + score {args.rows:,} devices: {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    fleet.top(args.k)
+    print(f"build top-K index: {time.perf_counter() - t0:.2f}s")
+    print(f"check vs full sort: max probability gap {_check(fleet, args.k):.1e}")
+
+    print(f"\n{'top-' + str(args.k) + ' query':>22}  {'p50':>9}  {'p99':>9}")
+    for name, filters in QUERIES:
+        p50, p99 = _latency(lambda: fleet.top(args.k, filters), args.repeat)
+        print(f"{name:>22}  {p50:7.2f}ms  {p99:7.2f}ms")
+
+    rng = np.random.default_rng(0)
+    rows = rng.choice(fleet.n, args.updates, replace=False)
+    changed = pd.DataFrame({"device_id": fleet.column("device_id")[rows]})
+    for c in fleet.cat_cols:
+        changed[c] = fleet.values(c, rows)
+    for c in fleet.num_cols:
+        changed[c] = fleet.column(c)[rows]
+    changed["error_logs_past_month"] += rng.integers(5, 30, size=len(changed))
+    changed["environment"] = rng.choice(datascript.environments, size=len(changed))
+    t0 = time.perf_counter()
+    fleet.upsert(changed)
+    print(f"\nupsert {args.updates:,} changed devices (index maintained): "
+          f"{(time.perf_counter() - t0) * 1e3:.1f}ms")
+    print(f"check vs full sort after updates: max probability gap {_check(fleet, args.k):.1e}")
+
+
+if __name__ == "__main__":
+    main()
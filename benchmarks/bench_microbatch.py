@@ -0,0 +1,96 @@
+# bench_microbatch.py - load test for the micro-batched /predict of app2_asgi.py
+"""
+Usage (from the repo root):
+    python benchmarks/bench_microbatch.py [--clients 64] [--requests 50]
+
+Drives the ASGI app in-process (no sockets): --clients concurrent clients each send
+--requests sequential POST /predict calls with devices from the v4 dataset. The
+prediction cache is disabled so every request is scored. For each
+(max batch size, max wait ms) setting it reports throughput, latency percentiles
+and the mean batch size actually formed; "1 / 0" is the unbatched baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+
+import app2_asgi  # noqa: E402
+
+SETTINGS = [(1, 0.0), (8, 1.0), (32, 2.0), (64, 2.0), (128, 5.0), (256, 10.0)]
+
+
+async def _post(app, body):
+    sent = [{"type": "http.request", "body": body, "more_body": False}]
+    out = []
+
+    async def receive():
+        return sent.pop() if sent else {"type": "http.disconnect"}
+
+    async def send(message):
+        out.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/predict", "headers": [
+        (b"content-type", b"application/json")]}
+    await app(scope, receive, send)
+    return out[0]["status"]
+
+
+async def _load(app, bodies, clients, per_client):
+    latencies = []
+
+    async def client(c):
+        for r in range(per_client):
+            body = bodies[(c * per_client + r) % len(bodies)]
+            t0 = time.perf_counter()
+            status = await _post(app, body)
+            latencies.append(time.perf_counter() - t0)
+            assert status == 200, status
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    wall = time.perf_counter() - t0
+    await app.batcher.close()
+    return wall, np.array(latencies)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clients", type=int, default=64)
+    ap.add_argument("--requests", type=int, default=50, help="sequential requests per client")
+    args = ap.parse_args()
+
+    df = pd.read_csv(os.path.join(ROOT, "Part2", "synthetic_device_failure_dataset_v4.csv"))
+    df = df.drop(columns=["device_id", "failure_within_year"])
+    bodies = [json.dumps({"device": d}).encode("utf-8") for d in df.to_dict(orient="records")]
+
+    # equivalence: batched answers match the single-row scorer
+    snap = app2_asgi.app2.registry.current
+    devices = df.head(64).to_dict(orient="records")
+    batched = np.array([p for _, p in app2_asgi.score_batch([(snap, d) for d in devices])])
+    single = np.array([app2_asgi.app2._score_one(snap, d) for d in devices])
+    print(f"max |batched - single| = {np.abs(batched - single).max():.2e}")
+
+    n = args.clients * args.requests
+    print(f"{args.clients} clients x {args.requests} requests")
+    print(f"{'batch/wait':>12}  {'req/s':>8}  {'p50':>8}  {'p99':>8}  {'mean batch':>10}")
+    for size, wait in SETTINGS:
+        app = app2_asgi.MicroBatchApp(max_batch_size=size, max_wait_ms=wait)
+        wall, lat = asyncio.run(_load(app, bodies, args.clients, args.requests))
+        stats = app.batcher.stats()
+        print(f"{size:>5} / {wait:<4g}  {n / wall:8.0f}  {np.percentile(lat, 50) * 1e3:6.2f}ms  "
+              f"{np.percentile(lat, 99) * 1e3:6.2f}ms  {stats['mean_batch_size']:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
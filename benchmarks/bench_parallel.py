@@ -0,0 +1,59 @@
+# bench_parallel.py - scaling of ParallelScorer with the number of worker processes
+"""
+Usage (from the repo root):
+    python benchmarks/bench_parallel.py [--rows 2000000] [--max-workers N]
+
+Encodes --rows devices (the v4 dataset tiled), then scores the matrix with
+1, 2, 4, ... up to --max-workers processes (default: CPU count) and reports
+rows/sec and speedup over a single in-process call. Pool start-up is excluded;
+each worker inherits the loaded scorer through fork.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parallel_scoring import ParallelScorer, matrix_dtype, share_scorer  # noqa: E402
+from score_file import load_scorer  # noqa: E402
+
+MODEL_PATH = os.path.join(ROOT, "best_model_gb.joblib")
+DATA_PATH = os.path.join(ROOT, "Part2", "synthetic_device_failure_dataset_v4.csv")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    score_frame, _cols, numeric_cols, scorer = load_scorer(MODEL_PATH)
+    share_scorer(score_frame, numeric_cols, scorer.predict_proba)
+    base = scorer.encode_columns(pd.read_csv(DATA_PATH))
+    X = np.resize(base, (args.rows, base.shape[1]))
+
+    t0 = time.perf_counter()
+    ref = scorer.predict_proba(X)
+    serial = time.perf_counter() - t0
+    print(f"cpus={os.cpu_count()}  rows={args.rows:,}")
+    print(f"  serial: {args.rows / serial:12,.0f} rows/s")
+
+    workers = 1
+    while workers <= args.max_workers:
+        with ParallelScorer(workers, model_path=MODEL_PATH, dtype=matrix_dtype(scorer.estimator)) as pool:
+            pool.predict_proba(X[:1000])  # warm the pool
+            t0 = time.perf_counter()
+            got = pool.predict_proba(X)
+            sec = time.perf_counter() - t0
+        assert np.array_equal(got, ref), "parallel output differs from serial"
+        print(f"  {workers:>3} workers: {args.rows / sec:12,.0f} rows/s  speedup x{serial / sec:.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
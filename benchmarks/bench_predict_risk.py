@@ -0,0 +1,174 @@
+# bench_predict_risk.py - app.py /predict-risk: feature-index encoding vs the get_dummies path
+"""
+Usage (from the repo root):
+    python benchmarks/bench_predict_risk.py [--artifact risk_model_artifacts.joblib] [--n 2000]
+
+Without --artifact (the recall artifact is not in the repo) a small random forest
+is fitted on synthetic recall payloads and saved with each kind of imputer app.py
+supports (SimpleImputer, SimpleImputer(missing_values=0), Series, dict, none).
+For each artifact the pre-index path (pd.get_dummies(row).reindex(FEATURE_ORDER),
+_impute, fired features by a column loop; kept here as the reference) and
+encode_payloads() must give the same matrix, probabilities and fired features on:
+valid payloads, unknown categories, NaN numerics, None values, booleans, extra keys
+and a field/value split that only get_dummies' naming reaches.
+
+Then, on the first artifact, through the Flask test client:
+  single /predict-risk p50 (cache off) for both encoders
+  N payloads as one JSON-array request vs N single requests
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIELDS = {"classification": ["Orthopedic Devices", "Cardiovascular Devices", "General Hospital"],
+          "action_classification": ["I", "II", "III"],
+          "determined_cause": ["Device Design", "Manufacturing Defect", "Software"],
+          "type": ["Recall", "Field Safety Notice"], "implanted": ["YES", "NO"]}
+
+
+def _payloads(n, rng):
+    df = pd.DataFrame({c: rng.choice(v, n) for c, v in FIELDS.items()})
+    df["year_initiated"] = rng.integers(2000, 2024, n)
+    return df
+
+
+def make_artifacts(out_dir, rng):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.impute import SimpleImputer
+
+    df = _payloads(600, rng)
+    y = (df["action_classification"] == "I") ^ (rng.random(len(df)) < 0.2)
+    X = pd.get_dummies(df).astype(float)
+    X.loc[rng.random(len(X)) < 0.1, "year_initiated"] = np.nan
+    order = list(X.columns)
+    model = RandomForestClassifier(60, random_state=0).fit(X.fillna(X.median()), y)
+    medians = X.median()
+    imputers = {"simple": SimpleImputer(strategy="median").fit(X),
+                "simple_zero": SimpleImputer(missing_values=0, strategy="mean").fit(X.fillna(1)),
+                "series": medians, "dict": medians.iloc[::2].to_dict(), "none": None}
+    paths = {}
+    for name, imputer in imputers.items():
+        paths[name] = os.path.join(out_dir, f"{name}.joblib")
+        joblib.dump({"feature_order": order, "model_bin": model, "imputer": imputer}, paths[name])
+    return paths
+
+
+def edge_payloads(rng):
+    base = _payloads(200, rng).to_dict(orient="records")
+    base = [{k: (v.item() if hasattr(v, "item") else v) for k, v in p.items()} for p in base]
+    edges = [
+        dict(base[0], classification="Dental Devices"),              # unknown category
+        dict(base[1], year_initiated=float("nan")),                   # imputed
+        dict(base[2], year_initiated=None),                           # get_dummies drops None
+        dict(base[3], year_initiated=True),                           # bool passes through
+        dict(base[4], device_id="X-1", notes="recalled", weight=3.5),  # extra keys
+        {"action": "classification_I", "year_initiated": 2011},       # other split of a column name
+        {"year_initiated": 0},                                        # a 0 SimpleImputer(0) fills
+    ]
+    return base + edges
+
+
+# ---------- the get_dummies path replaced by encode_payloads ----------
+def _impute_old(df, snap):
+    imputer, feature_order = snap.imputer, snap.feature_order
+    if hasattr(imputer, "transform") and type(imputer).__name__ == "SimpleImputer":
+        return pd.DataFrame(imputer.transform(df), columns=feature_order, index=df.index)
+    if isinstance(imputer, pd.Series):
+        return df.fillna(imputer.reindex(feature_order))
+    if isinstance(imputer, dict):
+        return df.fillna(pd.Series(imputer).reindex(feature_order))
+    return df.fillna(0)
+
+
+def old_encode(payload, snap):
+    X = pd.get_dummies(pd.DataFrame([payload])).reindex(columns=snap.feature_order, fill_value=0)
+    return _impute_old(X, snap)
+
+
+def old_score(payload, snap):
+    X = old_encode(payload, snap)
+    try:
+        p = float(snap.model.predict_proba(X)[:, 1][0])
+    except Exception:
+        p = float(snap.model.predict(X)[0])
+    return p, [c for c in X.columns if X.iloc[0][c] != 0][:12]
+
+
+def _p50_us(fn, n):
+    fn()
+    times = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - t0
+    return np.percentile(times, 50) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--artifact", help="real risk_model_artifacts.joblib to check instead of synthetic ones")
+    ap.add_argument("--n", type=int, default=2000, help="requests per latency case and batch size")
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"artifact": os.path.abspath(args.artifact)} if args.artifact else make_artifacts(tmp, rng)
+        first = next(iter(paths.values()))
+        os.environ["RISK_ARTIFACT_PATH"] = first
+        import app
+        from model_registry import ModelSnapshot
+
+        payloads = edge_payloads(rng)
+        print("imputer        encoded matrix   probabilities   fired features   payloads")
+        for name, path in paths.items():
+            snap = ModelSnapshot(name, path, **app.load_artifacts(path, name))
+            # payloads the old path raised on (a NaN given to SimpleImputer(missing_values=0)) are skipped
+            checked = []
+            for p in payloads:
+                try:
+                    checked.append((p, old_encode(p, snap).to_numpy(dtype=float), old_score(p, snap)))
+                except ValueError:
+                    pass
+            new_X = app.encode_payloads([p for p, _, _ in checked], snap)
+            probs = app.predict_high(snap, new_X)
+            fired = [app._risk_result(snap, p, row)["features_fired_sample"] for p, row in zip(probs, new_X)]
+            print(f"  {name:<12} {np.array_equal(new_X, np.vstack([x for _, x, _ in checked]), equal_nan=True)!s:>14}  "
+                  f"{np.array_equal(probs, [o[0] for _, _, o in checked])!s:>14}  "
+                  f"{fired == [o[1] for _, _, o in checked]!s:>14}   {len(checked)}/{len(payloads)}")
+
+        snap = app.registry.current
+        client = app.app.test_client()
+        valid = [p for p in payloads if not snap.schema.validate(p)]
+        one = valid[0]
+        print(f"\n/predict-risk, {os.path.basename(first)} (cache off)")
+        print(f"  encode one payload: get_dummies {_p50_us(lambda: old_encode(one, snap), args.n):7.1f}us   "
+              f"feature index {_p50_us(lambda: app.encode_payloads([one], snap, out=app._row_buffer(snap)), args.n):6.1f}us")
+        print(f"  single request p50: {_p50_us(lambda: client.post('/predict-risk', json=one), args.n) / 1e3:.2f}ms")
+
+        batch = (valid * (args.n // len(valid) + 1))[:args.n]
+        t0 = time.perf_counter()
+        singles = [client.post("/predict-risk", json=p).get_json() for p in batch]
+        t_single = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        results = client.post("/predict-risk", json=batch).get_json()["results"]
+        t_batch = time.perf_counter() - t0
+        same = all({k: v for k, v in r.items() if k != "index"} == {k: v for k, v in s.items() if k != "model_version"}
+                   for r, s in zip(results, singles))
+        print(f"  {len(batch)} payloads: one array request {t_batch * 1e3:.1f}ms vs {len(batch)} requests "
+              f"{t_single * 1e3:.0f}ms  (same results: {same})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# bench_single_row.py - single-device latency: sklearn pipeline vs CompiledScorer
+"""
+Usage (from the repo root):
+    python benchmarks/bench_single_row.py [--n 2000]
+
+Checks that the compiled scorer matches pipeline.predict_proba within 1e-9 on the
+v4 dataset, then reports p50/p99 latency for scoring one device dict.
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fast_scorer import CompiledScorer  # noqa: E402
+
+MODEL_PATH = os.path.join(ROOT, "best_model_gb.joblib")
+DATA_PATH = os.path.join(ROOT, "Part2", "synthetic_device_failure_dataset_v4.csv")
+
+
+def _latencies(fn, devices):
+    out = np.empty(len(devices))
+    for i, d in enumerate(devices):
+        t0 = time.perf_counter()
+        fn(d)
+        out[i] = time.perf_counter() - t0
+    return out * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=2000, help="number of single-row calls per path")
+    args = ap.parse_args()
+
+    pipeline = joblib.load(MODEL_PATH)
+    scorer = CompiledScorer.from_pipeline(pipeline)
+    X = pd.read_csv(DATA_PATH).drop(columns=["device_id", "failure_within_year"])
+
+    ref = pipeline.predict_proba(X)[:, 1]
+    fast = scorer.score_frame(X)
+    max_diff = float(np.abs(fast - ref).max())
+    print(f"max |compiled - pipeline| over {len(X)} rows: {max_diff:.3e}")
+    assert max_diff <= 1e-9, "compiled scorer diverges from pipeline.predict_proba"
+
+    devices = X.to_dict("records")[:args.n]
+
+    def pipeline_one(d):
+        return float(pipeline.predict_proba(pd.DataFrame([d]))[:, 1][0])
+
+    paths = [("pipeline", pipeline_one), ("compiled", scorer.predict_one)]
+    for name, fn in paths:
+        fn(devices[0])  # warm up
+        lat = _latencies(fn, devices)
+        print(f"{name:>9}: p50={np.percentile(lat, 50):8.1f}us  p99={np.percentile(lat, 99):8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_startup.py - cold start to first prediction: joblib pipeline vs compiled artifact
+"""
+Usage (from the repo root):
+    python benchmarks/bench_startup.py [--repeat 5]
+
+Exports best_model_gb.joblib with model_export.py into a temporary directory, then
+times fresh Python processes from launch to their first prediction:
+
+  joblib-pipeline   unpickle the pipeline, predict_proba on a one-row DataFrame
+  joblib-compiled   unpickle + CompiledScorer.from_pipeline (what app2.py does)
+  compiled-artifact model_export.load_compiled, no sklearn/pandas import
+  app2-joblib       import app2.py and serve /predict via the Flask test client
+  app2-compiled     same with MODEL_PATH pointing at the compiled artifact
+
+The best of --repeat runs is reported, plus whether sklearn was imported.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(ROOT, "best_model_gb.joblib")
+
+DEVICE = ("{'device_name': 'Ventilator', 'manufacturer': 'Fujifilm', 'device_age_years': 7, "
+          "'usage_hours_per_week': 27, 'maintenance_frequency_per_year': 4, "
+          "'last_maintenance_gap_days': 117, 'error_logs_past_month': 7, 'environment': 'Ward', "
+          "'criticality_level': 'Medium', 'spare_parts_availability': 'Poor', "
+          "'failures_past_year': 0, 'manufacturer_support_rating': 2}")
+
+SCRIPTS = {
+    "joblib-pipeline": (
+        "import joblib, pandas as pd\n"
+        f"m = joblib.load({MODEL_PATH!r})\n"
+        f"m.predict_proba(pd.DataFrame([{DEVICE}]))\n"),
+    "joblib-compiled": (
+        "import joblib\nfrom fast_scorer import CompiledScorer\n"
+        f"s = CompiledScorer.from_pipeline(joblib.load({MODEL_PATH!r}))\n"
+        f"s.predict_one({DEVICE})\n"),
+    "compiled-artifact": (
+        "from model_export import load_compiled\n"
+        "s = load_compiled(COMPILED_PATH)\n"
+        f"s.predict_one({DEVICE})\n"),
+    "app2-joblib": (
+        "import app2\n"
+        f"app2.app.test_client().post('/predict', json={{'device': {DEVICE}}})\n"),
+    "app2-compiled": (
+        "import app2\n"
+        f"app2.app.test_client().post('/predict', json={{'device': {DEVICE}}})\n"),
+}
+SUFFIX = "import sys\nprint('sklearn' in sys.modules)\n"
+
+
+def _run(code, env):
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return time.perf_counter() - t0, out.stdout.strip().splitlines()[-1] == "True"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        compiled = os.path.join(tmp, "best_model_gb.compiled")
+        subprocess.run([sys.executable, "-W", "ignore", "model_export.py", MODEL_PATH, compiled],
+                       cwd=ROOT, check=True, capture_output=True)
+        base_env = dict(os.environ, PYTHONPATH=ROOT, MODEL_WATCH_INTERVAL="0")
+
+        print(f"{'path':>18}  {'best':>8}  {'median':>8}  sklearn imported")
+        for name, code in SCRIPTS.items():
+            env = dict(base_env)
+            if name == "app2-compiled":
+                env["MODEL_PATH"] = compiled
+            code = code.replace("COMPILED_PATH", repr(compiled))
+            runs = [_run(code + SUFFIX, env) for _ in range(args.repeat)]
+            times = sorted(t for t, _ in runs)
+            print(f"{name:>18}  {times[0] * 1e3:7.0f}ms  {times[len(times) // 2] * 1e3:7.0f}ms  {runs[0][1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# bench_tree_ensemble.py - FlatTreeEnsemble vs sklearn GradientBoostingClassifier
+"""
+Usage (from the repo root):
+    python benchmarks/bench_tree_ensemble.py [--repeat 100] [--deep-rows 100000]
+
+Equivalence check: the flattened ensemble must reproduce pipeline.predict_proba on
+synthetic_device_failure_dataset_v4.csv within 1e-9, for both the single-row
+(level-by-level) and batch (bitvector) traversals. Then reports rows/sec for a
+batch built by tiling the dataset --repeat times, and single-row latency.
+
+Deep trees: a 300-tree max_depth=5 model (too deep for the bitvector tables, like
+the models tune.py searches) is fitted on the same data and checked on
+--deep-rows rows. The level-by-level traversal, contributions() and the
+CompiledScorer (sklearn for batches) must match sklearn, and the traversal and
+contributions must peak below DEEP_PEAK_MB of NumPy allocations (tracemalloc).
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fast_scorer import CompiledScorer  # noqa: E402
+from tree_ensemble import FlatTreeEnsemble  # noqa: E402
+
+MODEL_PATH = os.path.join(ROOT, "best_model_gb.joblib")
+DATA_PATH = os.path.join(ROOT, "Part2", "synthetic_device_failure_dataset_v4.csv")
+DEEP_PEAK_MB = 64
+
+
+def _best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _traced(fn):
+    """(result, seconds, peak MB allocated) of one call."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        out = fn()
+        return out, time.perf_counter() - t0, tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def check_deep(pipeline, X_raw, y, n_rows):
+    from sklearn.base import clone
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.pipeline import Pipeline
+
+    deep = Pipeline([("preprocessor", clone(pipeline.named_steps["preprocessor"])),
+                     ("gb", GradientBoostingClassifier(n_estimators=300, max_depth=5, random_state=0))])
+    deep.fit(X_raw, y)
+    gb = deep.steps[-1][1]
+    scorer = CompiledScorer.from_pipeline(deep)
+    flat = scorer.ensemble
+    assert not flat.bitvector and scorer.estimator is gb, "deep trees should keep the sklearn estimator"
+    X = np.tile(scorer.encode_columns(X_raw), (-(-n_rows // len(X_raw)), 1))[:n_rows]
+
+    ref, t_ref, peak_ref = _traced(lambda: gb.predict_proba(X)[:, 1])
+    got, t_flat, peak_flat = _traced(lambda: flat.predict_proba(X)[:, 1])
+    (bias, contrib), t_contrib, peak_contrib = _traced(lambda: flat.contributions(X))
+    diffs = {"level-by-level": np.abs(got - ref).max(),
+             "contributions": np.abs(1 / (1 + np.exp(-(bias + contrib.sum(axis=1)))) - ref).max(),
+             "scorer batch": np.abs(scorer.predict_proba(X) - ref).max(),
+             "scorer single-row": max(abs(scorer.predict_proba(X[i:i + 1])[0] - ref[i]) for i in range(200))}
+    print(f"\ndeep model ({flat.n_trees} trees, depth {flat.max_depth}) on {n_rows} rows:")
+    for name, diff in diffs.items():
+        print(f"{name:>18} max |diff|: {diff:.3e}")
+        assert diff <= 1e-9, f"{name} diverges from sklearn on the deep model"
+    # the contrib matrix itself (rows x features float64) is output, not working memory
+    contrib_mb = contrib.nbytes / 2**20
+    for name, sec, peak, limit in (("sklearn", t_ref, peak_ref, None),
+                                   ("level-by-level", t_flat, peak_flat, DEEP_PEAK_MB),
+                                   ("contributions", t_contrib, peak_contrib, DEEP_PEAK_MB + contrib_mb)):
+        print(f"{name:>18}: {sec:6.2f}s  peak {peak:7.1f} MB")
+        assert limit is None or peak <= limit, f"{name} peaked at {peak:.0f} MB (limit {limit:.0f} MB)"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=100, help="tile the dataset this many times for throughput")
+    ap.add_argument("--deep-rows", type=int, default=100_000, help="rows for the deep-tree check (0 skips it)")
+    args = ap.parse_args()
+
+    pipeline = joblib.load(MODEL_PATH)
+    gb = pipeline.steps[-1][1]
+    flat = FlatTreeEnsemble.from_estimator(gb)
+    df = pd.read_csv(DATA_PATH)
+    X_raw = df.drop(columns=["device_id", "failure_within_year"])
+    X = CompiledScorer.from_pipeline(pipeline, flatten=False).encode_columns(X_raw)
+
+    ref = pipeline.predict_proba(X_raw)[:, 1]
+    checks = {
+        "batch": flat.predict_proba(X)[:, 1],
+        "single-row": np.array([flat.predict_proba(X[i:i + 1])[0, 1] for i in range(len(X))]),
+    }
+    for name, got in checks.items():
+        diff = float(np.abs(got - ref).max())
+        print(f"{name:>10} max |flat - pipeline|: {diff:.3e}")
+        assert diff <= 1e-9, f"{name} traversal diverges from pipeline.predict_proba"
+
+    big = np.tile(X, (args.repeat, 1))
+    print(f"throughput on {len(big)} encoded rows ({flat.n_trees} trees, depth {flat.max_depth}):")
+    for name, fn in (("sklearn", gb.predict_proba), ("flat", flat.predict_proba)):
+        sec = _best_of(lambda: fn(big))
+        print(f"{name:>10}: {len(big) / sec:12,.0f} rows/s")
+
+    one = X[:1]
+    print("single-row latency:")
+    for name, fn in (("sklearn", gb.predict_proba), ("flat", flat.predict_proba)):
+        sec = _best_of(lambda: [fn(one) for _ in range(1000)])
+        print(f"{name:>10}: {sec * 1e3:8.1f} us/row")
+
+    if args.deep_rows:
+        check_deep(pipeline, X_raw, df["failure_within_year"].to_numpy(), args.deep_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# bench_validation.py - compiled request schema vs the per-request validators it replaced
+"""
+Usage (from the repo root):
+    python benchmarks/bench_validation.py [--rows 10000] [--n 20000]
+
+Builds app2's DeviceSchema from best_model_gb.joblib and compares it with the
+validate_devices() loop it replaced (kept here as the reference):
+  - both accept the same rows of a mixed batch (valid devices, missing fields,
+    strings/bools/None/lists in numeric fields, non-objects); the schema also
+    rejects NaN/inf, which the old loop passed on to the model
+  - single-device latency for a valid and an invalid device
+  - --rows-device batches that are all valid and 20% invalid
+  - strict categories: unknown values rejected with the allowed list
+"""
+import argparse
+import numbers
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scoring import pipeline_columns  # noqa: E402
+from validation import DeviceSchema  # noqa: E402
+
+MODEL_PATH = os.path.join(ROOT, "best_model_gb.joblib")
+DATA_PATH = os.path.join(ROOT, "Part2", "synthetic_device_failure_dataset_v4.csv")
+
+
+def validate_devices(devices, columns, numeric_cols):
+    """The pre-schema validator from scoring.py."""
+    numeric = set(numeric_cols)
+    valid, errors = [], {}
+    for i, device in enumerate(devices):
+        if not isinstance(device, dict):
+            errors[i] = "device must be a JSON object"
+            continue
+        missing = [c for c in columns if c not in device]
+        if missing:
+            errors[i] = "missing fields: " + ", ".join(missing)
+            continue
+        bad = [c for c in numeric
+               if isinstance(device[c], bool) or not isinstance(device[c], numbers.Real)]
+        if bad:
+            errors[i] = "non-numeric fields: " + ", ".join(bad)
+            continue
+        valid.append(i)
+    return valid, errors
+
+
+def _corrupt(devices, numeric_cols, frac, rng):
+    """Copy of devices with frac of them broken in one of several ways."""
+    out = [dict(d) for d in devices]
+    for i in rng.choice(len(out), int(len(out) * frac), replace=False).tolist():
+        how = i % 5
+        col = numeric_cols[i % len(numeric_cols)]
+        if how == 0:
+            del out[i][col]
+        elif how == 1:
+            out[i][col] = "12"
+        elif how == 2:
+            out[i][col] = True
+        elif how == 3:
+            out[i][col] = [1]
+        else:
+            out[i] = None
+    return out
+
+
+def _per_call_us(fn, items, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, (time.perf_counter() - t0) / len(items))
+    return best * 1e6
+
+
+def _best_ms(fn, repeat=5):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--n", type=int, default=20000, help="single-device calls per case")
+    args = ap.parse_args()
+    rng = np.random.default_rng(0)
+
+    pipeline = joblib.load(MODEL_PATH)
+    columns, numeric_cols = pipeline_columns(pipeline)
+    enc = pipeline.named_steps["preprocessor"].named_transformers_["cat"]
+    categories = {c: [str(v) for v in cats] for c, cats in zip(enc.feature_names_in_, enc.categories_)}
+    schema = DeviceSchema.from_columns(columns, numeric_cols, categories)
+
+    frame = pd.read_csv(DATA_PATH)[columns]
+    base = frame.to_dict(orient="records")
+    devices = (base * (args.rows // len(base) + 1))[:args.rows]
+    mixed = _corrupt(devices, numeric_cols, 0.2, rng)
+
+    old_valid, _ = validate_devices(mixed, columns, numeric_cols)
+    new_valid, errors = schema.validate_batch(mixed)
+    singles = [i for i, d in enumerate(mixed) if not schema.validate(d)]
+    print(f"same valid rows as validate_devices: {old_valid == new_valid}  "
+          f"(batch == single-device path: {singles == new_valid})")
+    nan = dict(devices[0], usage_hours_per_week=float("nan"))
+    print(f"NaN field: old accepts {validate_devices([nan], columns, numeric_cols)[0] == [0]}, "
+          f"schema -> {schema.validate(nan)[0]['error']}")
+
+    valid_one, invalid_one = devices[0], mixed[min(errors)]
+    print(f"\nsingle device ({args.n} calls)        validate_devices   schema")
+    for name, device in [("valid", valid_one), ("invalid", invalid_one)]:
+        items = [device] * args.n
+        old = _per_call_us(lambda d: validate_devices([d], columns, numeric_cols), items)
+        new = _per_call_us(schema.validate, items)
+        print(f"  {name:<34} {old:8.2f}us  {new:7.2f}us")
+
+    print(f"\n{args.rows:,}-device batch                  validate_devices   schema")
+    for name, batch in [("all valid", devices), ("20% invalid", mixed)]:
+        old = _best_ms(lambda: validate_devices(batch, columns, numeric_cols))
+        new = _best_ms(lambda: schema.validate_batch(batch))
+        print(f"  {name:<34} {old:8.2f}ms  {new:7.2f}ms")
+
+    strict = DeviceSchema.from_columns(columns, numeric_cols, categories, strict=True)
+    unknown = dict(devices[0], environment="Moon")
+    print(f"\nstrict categories: {strict.validate(unknown)}")
+    n_ok = len(strict.validate_batch(devices)[0])
+    print(f"strict batch of training rows accepted: {n_ok}/{len(devices)}  "
+          f"({_best_ms(lambda: strict.validate_batch(devices)):.2f}ms)")
+
+
+if __name__ == "__main__":
+    main()
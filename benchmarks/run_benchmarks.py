@@ -0,0 +1,342 @@
+# run_benchmarks.py - regression suite for the inference and data paths, with JSON results
+"""
+Usage (from the repo root):
+    python benchmarks/run_benchmarks.py [--quick] [--only single,batch] [--output results.json]
+    python benchmarks/run_benchmarks.py --compare baseline.json [--threshold 0.15]
+    python benchmarks/run_benchmarks.py --input results.json --compare baseline.json
+
+Runs offline: the Flask apps are driven through their test clients and the batch
+data comes from Part2/datascript.py. Benchmarks (name prefix = group):
+
+  load.*      unpickle best_model_gb.joblib; compile it into a CompiledScorer
+  startup.*   fresh process from launch to its first /predict (app2) or /predict-risk (app)
+  single.*    one-row latency: pipeline.predict_proba, CompiledScorer.predict_one,
+              app2 /predict, app /predict-risk
+  metadata.*  GET /metadata on app2 and app
+  batch.*     rows/s of pipeline.predict_proba and CompiledScorer.score_frame at
+              1 / 100 / 10k / 1M rows, and of app2 /predict/batch at 100 / 10k rows
+  datagen     rows/s of datascript.iter_dataset
+
+app.py benchmarks use risk_model_artifacts.joblib when it exists. The repo does not
+ship it, so otherwise they run on the synthetic recall artifact bench_predict_risk.py
+builds (a small random forest with a median SimpleImputer), passed to app.py through
+RISK_ARTIFACT_PATH. environment.app_artifact records which one was used. The
+prediction caches are disabled so repeated rows are really scored.
+
+Results are written as JSON with environment info (Python, platform, CPU count,
+package versions, git commit). Each result has a headline "value" and whether
+lower or higher is better. --compare flags every benchmark whose value moved the
+wrong way by more than --threshold against a baseline file and exits with
+status 1 if there is any.
+"""
+import argparse
+import atexit
+import datetime
+import importlib.metadata
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Part2"))
+os.chdir(ROOT)
+os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+os.environ["PREDICTION_CACHE_SIZE"] = "0"
+
+MODEL_PATH = os.path.join(ROOT, "best_model_gb.joblib")
+APP_ARTIFACT = os.path.join(ROOT, "risk_model_artifacts.joblib")
+DATA_PATH = os.path.join(ROOT, "Part2", "synthetic_device_failure_dataset_v4.csv")
+
+BATCH_SIZES = (1, 100, 10_000, 1_000_000)
+ENDPOINT_BATCH_SIZES = (100, 10_000)
+PACKAGES = ("numpy", "pandas", "scikit-learn", "joblib", "flask")
+
+# /predict-risk payload with the fields app.py's PAYLOAD_FIELDS requires
+RECALL_DEVICE = {"classification": "Cardiovascular Devices", "action_classification": "II",
+                 "determined_cause": "Device Design", "type": "Recall", "implanted": "NO",
+                 "year_initiated": 2015}
+
+
+# ---------- measurement ----------
+def _latency(fn, n, warmup=20):
+    """p50/p99/mean of n calls in milliseconds; headline value is the p50."""
+    for _ in range(warmup):
+        fn()
+    times = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - t0
+    times *= 1e3
+    return {"value": float(np.percentile(times, 50)), "unit": "ms", "better": "lower",
+            "p99": float(np.percentile(times, 99)), "mean": float(times.mean()), "n": n}
+
+
+def _best_time(fn, repeat):
+    fn()
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _ms(seconds):
+    return {"value": seconds * 1e3, "unit": "ms", "better": "lower"}
+
+
+def _throughput(fn, rows, repeat):
+    seconds = _best_time(fn, repeat)
+    return {"value": rows / seconds, "unit": "rows/s", "better": "higher", "seconds": seconds, "rows": rows}
+
+
+def _process_time(code, repeat):
+    """Best wall time of fresh interpreters running code, in milliseconds."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=ROOT, env=env,
+                       capture_output=True, check=True)
+        best = min(best, time.perf_counter() - t0)
+    return {"value": best * 1e3, "unit": "ms", "better": "lower", "repeat": repeat}
+
+
+# ---------- benchmarks ----------
+def bench_load(ctx):
+    import joblib
+    from fast_scorer import CompiledScorer
+    yield "load.joblib_artifact", _ms(_best_time(lambda: joblib.load(MODEL_PATH), ctx.repeat))
+    yield "load.compile_scorer", _ms(
+        _best_time(lambda: CompiledScorer.from_pipeline(ctx.pipeline), ctx.repeat))
+
+
+def bench_startup(ctx):
+    device = ctx.devices[0]
+    yield "startup.app2", _process_time(
+        "import app2\n"
+        f"assert app2.app.test_client().post('/predict', json={{'device': {device!r}}}).status_code == 200\n",
+        ctx.startup_repeat)
+    ctx.app_artifact   # the subprocesses find a synthetic artifact through RISK_ARTIFACT_PATH
+    yield "startup.app", _process_time(
+        "import app\n"
+        f"assert app.app.test_client().post('/predict-risk', json={RECALL_DEVICE!r}).status_code == 200\n",
+        ctx.startup_repeat)
+
+
+def bench_single(ctx):
+    devices, n = ctx.devices, ctx.n_single
+    frames = [pd.DataFrame([d]) for d in devices]
+    it = itertools.cycle(range(len(devices)))
+    yield "single.pipeline", _latency(lambda: ctx.pipeline.predict_proba(frames[next(it)]), n)
+    yield "single.compiled", _latency(lambda: ctx.scorer.predict_one(devices[next(it)]), n)
+    client = ctx.app2.app.test_client()
+    bodies = [{"device": d} for d in devices]
+    yield "single.app2_predict", _latency(lambda: client.post("/predict", json=bodies[next(it)]), n)
+    client = ctx.app.app.test_client()
+    yield "single.app_predict_risk", _latency(lambda: client.post("/predict-risk", json=RECALL_DEVICE), n)
+
+
+def bench_metadata(ctx):
+    client = ctx.app2.app.test_client()
+    yield "metadata.app2", _latency(lambda: client.get("/metadata"), ctx.n_single)
+    client = ctx.app.app.test_client()
+    yield "metadata.app", _latency(lambda: client.get("/metadata"), ctx.n_single)
+
+
+def bench_batch(ctx):
+    for size in ctx.batch_sizes:
+        X = ctx.frame.iloc[:size]
+        repeat = ctx.repeat if size < 1_000_000 else 1
+        yield f"batch.pipeline.{size}", _throughput(lambda: ctx.pipeline.predict_proba(X), size, repeat)
+        yield f"batch.compiled.{size}", _throughput(lambda: ctx.scorer.score_frame(X), size, repeat)
+    client = ctx.app2.app.test_client()
+    for size in ENDPOINT_BATCH_SIZES:
+        body = json.dumps(ctx.frame.iloc[:size].to_dict(orient="records"))
+        yield f"batch.app2_endpoint.{size}", _throughput(
+            lambda: client.post("/predict/batch", data=body, content_type="application/json"), size, ctx.repeat)
+
+
+def bench_datagen(ctx):
+    import datascript
+    rows = ctx.datagen_rows
+    yield "datagen", _throughput(lambda: sum(len(c) for c in datascript.iter_dataset(n=rows)), rows, 2)
+
+
+BENCHMARKS = [("load", bench_load), ("startup", bench_startup), ("single", bench_single),
+              ("metadata", bench_metadata), ("batch", bench_batch), ("datagen", bench_datagen)]
+
+
+class Context:
+    """Shared, lazily loaded inputs so a filtered run only pays for what it uses."""
+
+    def __init__(self, quick):
+        self.quick = quick
+        self.repeat = 3 if quick else 5
+        self.startup_repeat = 2 if quick else 3
+        self.n_single = 300 if quick else 2000
+        self.batch_sizes = tuple(s for s in BATCH_SIZES if not quick or s < 1_000_000)
+        self.datagen_rows = 200_000 if quick else 1_000_000
+
+    def __getattr__(self, name):
+        loader = getattr(type(self), "_load_" + name, None)
+        if loader is None:
+            raise AttributeError(name)
+        value = loader(self)
+        setattr(self, name, value)
+        return value
+
+    def _load_pipeline(self):
+        import joblib
+        return joblib.load(MODEL_PATH)
+
+    def _load_scorer(self):
+        from fast_scorer import CompiledScorer
+        return CompiledScorer.from_pipeline(self.pipeline)
+
+    def _load_devices(self):
+        df = pd.read_csv(DATA_PATH).drop(columns=["device_id", "failure_within_year"])
+        return df.head(500).to_dict(orient="records")
+
+    def _load_frame(self):
+        import datascript
+        df = pd.concat(datascript.iter_dataset(n=max(self.batch_sizes + ENDPOINT_BATCH_SIZES)), ignore_index=True)
+        for c in datascript.CATEGORICALS:
+            df[c] = df[c].astype(object)
+        return df.drop(columns=["device_id", "failure_within_year"])
+
+    def _load_app2(self):
+        import app2
+        return app2
+
+    def _load_app_artifact(self):
+        """Path of the artifact app.py serves; builds the synthetic one if the real one is absent."""
+        if os.path.exists(APP_ARTIFACT):
+            return APP_ARTIFACT
+        from bench_predict_risk import make_artifacts
+        tmp = tempfile.mkdtemp(prefix="risk_artifact_")
+        atexit.register(shutil.rmtree, tmp, True)
+        path = make_artifacts(tmp, np.random.default_rng(0))["simple"]
+        os.environ["RISK_ARTIFACT_PATH"] = path
+        return path
+
+    def _load_app(self):
+        self.app_artifact
+        import app
+        return app
+
+
+def _version(package):
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "packages": {name: _version(name) for name in PACKAGES},
+        "app_artifact": os.path.basename(APP_ARTIFACT) if os.path.exists(APP_ARTIFACT) else "synthetic",
+    }
+
+
+def run(groups, quick):
+    ctx = Context(quick)
+    results = {}
+    for group, fn in BENCHMARKS:
+        if groups and group not in groups:
+            continue
+        for name, result in fn(ctx):
+            results[name] = result
+            _print_result(name, result)
+    return {"environment": environment(), "quick": quick, "results": results}
+
+
+def _print_result(name, result):
+    if "skipped" in result:
+        print(f"{name:>30}  skipped: {result['skipped']}")
+    else:
+        extra = f"  (p99 {result['p99']:.3f})" if "p99" in result else ""
+        print(f"{name:>30}  {result['value']:14,.3f} {result['unit']}{extra}", flush=True)
+
+
+def compare(current, baseline, threshold):
+    """Print per-benchmark changes vs the baseline; returns the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':>30}  {'baseline':>14}  {'current':>14}  {'change':>8}")
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or "skipped" in old or "skipped" in new:
+            continue
+        change = new["value"] / old["value"] - 1.0
+        worse = change > threshold if new["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append(name)
+        print(f"{name:>30}  {old['value']:14,.3f}  {new['value']:14,.3f}  {change:+7.1%}"
+              f"{'  REGRESSION' if worse else ''}")
+    if current["environment"].get("platform") != baseline["environment"].get("platform") or \
+            current["environment"].get("cpu_count") != baseline["environment"].get("cpu_count"):
+        print("note: baseline was recorded on a different platform or CPU count")
+    if current["environment"].get("app_artifact") != baseline["environment"].get("app_artifact"):
+        print("note: app.py benchmarks ran on a different artifact than the baseline")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", default="", help="comma-separated groups: " + ",".join(g for g, _ in BENCHMARKS))
+    ap.add_argument("--quick", action="store_true", help="fewer repeats, no 1M-row batches")
+    ap.add_argument("--output", help="write the results JSON here")
+    ap.add_argument("--input", help="compare this results file instead of running the suite")
+    ap.add_argument("--compare", metavar="BASELINE", help="baseline results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="relative change that counts as a regression")
+    args = ap.parse_args()
+
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        groups = {g for g in args.only.split(",") if g}
+        unknown = groups - {g for g, _ in BENCHMARKS}
+        if unknown:
+            ap.error(f"unknown groups: {', '.join(sorted(unknown))}")
+        current = run(groups, args.quick)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# drift.py - streaming input-drift and score-distribution monitor
+"""
+Compares live prediction traffic with the data the model was trained on.
+
+A reference profile (build_profile) holds, per model input, fixed bins and the
+training counts in them: reference-quantile bins for numeric features, value counts
+for categorical ones, and 20 equal-width bins over [0, 1] for the predicted failure
+probability. It is saved next to the model as <model>.drift.json (train.py writes
+it; for an existing model run this module as a script).
+
+DriftMonitor counts live traffic into the same bins, so memory is fixed by the
+profile, not the traffic. observe() for one device is a bisect or dict lookup per
+feature under a lock (a few microseconds). observe_columns() does a batch with
+searchsorted/bincount. report() compares the live counts with the reference:
+
+  psi   population stability index, sum((live - ref) * ln(live / ref)) over bins
+  ks    largest gap between the binned CDFs (numeric features and probability)
+
+A feature is "warn" at PSI >= 0.1 and "alert" at PSI >= 0.25 (the usual rule of
+thumb), once at least MIN_OBSERVATIONS devices have been seen. Categorical values
+missing from the reference fall into an "__other__" bin.
+
+Usage:
+    python drift.py best_model_gb.joblib Part2/synthetic_device_failure_dataset_v4.csv
+"""
+import argparse
+import bisect
+import json
+import os
+import threading
+
+import numpy as np
+
+PROFILE_VERSION = 1
+NUMERIC_BINS = 10
+PROB_BINS = 20
+OTHER = "__other__"
+PSI_WARN, PSI_ALERT = 0.1, 0.25
+MIN_OBSERVATIONS = 100
+_EPS = 1e-4   # floor for bin proportions so empty bins keep PSI finite
+
+
+def profile_path(model_path):
+    """Where the reference profile of a model artifact (file or compiled directory) lives."""
+    return os.path.splitext(model_path.rstrip("/\\"))[0] + ".drift.json"
+
+
+def _numeric_entry(values, n_bins):
+    values = np.asarray(values, dtype=float)
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+    counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+    return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+
+def build_profile(frame, numeric_cols, categorical_cols, probs, n_bins=NUMERIC_BINS):
+    """Reference profile of a training frame and the model's probabilities on it."""
+    profile = {"version": PROFILE_VERSION, "n": int(len(frame)), "numeric": {}, "categorical": {}}
+    for c in numeric_cols:
+        profile["numeric"][c] = _numeric_entry(frame[c], n_bins)
+    for c in categorical_cols:
+        counts = frame[c].astype(str).value_counts()
+        profile["categorical"][c] = {"values": counts.index.tolist(), "counts": counts.tolist()}
+    edges = np.linspace(0, 1, PROB_BINS + 1)[1:-1]
+    counts = np.bincount(np.searchsorted(edges, probs, side="right"), minlength=PROB_BINS)
+    profile["probability"] = {"edges": edges.tolist(), "counts": counts.tolist()}
+    return profile
+
+
+def save_profile(profile, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f)
+
+
+def load_profile(path):
+    with open(path, encoding="utf-8") as f:
+        profile = json.load(f)
+    if profile.get("version") != PROFILE_VERSION:
+        raise ValueError(f"Unsupported drift profile version {profile.get('version')!r} in {path}")
+    return profile
+
+
+def psi(reference, live):
+    ref = np.maximum(np.asarray(reference, dtype=float) / max(sum(reference), 1), _EPS)
+    cur = np.maximum(np.asarray(live, dtype=float) / max(sum(live), 1), _EPS)
+    return float(np.sum((cur - ref) * np.log(cur / ref)))
+
+
+def binned_ks(reference, live):
+    ref = np.cumsum(reference) / max(sum(reference), 1)
+    cur = np.cumsum(live) / max(sum(live), 1)
+    return float(np.abs(cur - ref).max())
+
+
+class DriftMonitor:
+    """Live bin counts for every feature in a profile; see the module docstring."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._numeric = [(c, e["edges"]) for c, e in profile["numeric"].items()]
+        self._categorical = [(c, {v: i for i, v in enumerate(e["values"])})
+                             for c, e in profile["categorical"].items()]
+        self._prob_edges = profile["probability"]["edges"]
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.n = 0
+            self._num_counts = [[0] * (len(edges) + 1) for _, edges in self._numeric]
+            # last bin of a categorical feature is OTHER
+            self._cat_counts = [[0] * (len(index) + 1) for _, index in self._categorical]
+            self._prob_counts = [0] * (len(self._prob_edges) + 1)
+            self._num_slots = [(c, edges, counts) for (c, edges), counts in zip(self._numeric, self._num_counts)]
+            self._cat_slots = [(c, index, counts) for (c, index), counts in zip(self._categorical, self._cat_counts)]
+
+    def observe(self, device, p):
+        """Count one scored device dict and its failure probability."""
+        bisect_right = bisect.bisect_right
+        with self._lock:
+            self.n += 1
+            for c, edges, counts in self._num_slots:
+                counts[bisect_right(edges, device[c])] += 1
+            for c, index, counts in self._cat_slots:
+                counts[index.get(device[c], -1)] += 1
+            self._prob_counts[bisect_right(self._prob_edges, p)] += 1
+
+    def observe_columns(self, data, probs):
+        """Count a batch given as {column: values} plus its probabilities."""
+        probs = np.asarray(probs, dtype=float)
+        if not len(probs):
+            return
+        binned = []
+        for c, edges in self._numeric:
+            values = np.asarray(data[c], dtype=float)
+            binned.append(np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1))
+        for c, index in self._categorical:
+            codes = np.fromiter((index.get(v, len(index)) for v in data[c]), dtype=np.intp, count=len(probs))
+            binned.append(np.bincount(codes, minlength=len(index) + 1))
+        binned.append(np.bincount(np.searchsorted(self._prob_edges, probs, side="right"),
+                                  minlength=len(self._prob_edges) + 1))
+        with self._lock:
+            self.n += len(probs)
+            for counts, add in zip(self._num_counts + self._cat_counts + [self._prob_counts], binned):
+                for i, k in enumerate(add.tolist()):
+                    counts[i] += k
+
+    def observe_devices(self, devices, probs):
+        columns = [c for c, _ in self._numeric] + [c for c, _ in self._categorical]
+        self.observe_columns({c: [d[c] for d in devices] for c in columns}, probs)
+
+    # ---------- report ----------
+    @staticmethod
+    def _status(value, n):
+        if n < MIN_OBSERVATIONS:
+            return "insufficient_data"
+        return "alert" if value >= PSI_ALERT else "warn" if value >= PSI_WARN else "ok"
+
+    def report(self):
+        with self._lock:
+            n = self.n
+            num_counts = [list(c) for c in self._num_counts]
+            cat_counts = [list(c) for c in self._cat_counts]
+            prob_counts = list(self._prob_counts)
+
+        features = {}
+        for (c, edges), live in zip(self._numeric, num_counts):
+            ref = self.profile["numeric"][c]["counts"]
+            value = psi(ref, live)
+            features[c] = {"type": "numeric", "psi": value, "ks": binned_ks(ref, live),
+                           "status": self._status(value, n), "edges": edges, "counts": live}
+        for (c, index), live in zip(self._categorical, cat_counts):
+            ref = self.profile["categorical"][c]["counts"] + [0]
+            value = psi(ref, live)
+            features[c] = {"type": "categorical", "psi": value, "status": self._status(value, n),
+                           "counts": dict(zip(list(index) + [OTHER], live))}
+        ref = self.profile["probability"]["counts"]
+        value = psi(ref, prob_counts)
+        prediction = {"psi": value, "ks": binned_ks(ref, prob_counts), "status": self._status(value, n),
+                      "edges": self._prob_edges, "counts": prob_counts}
+
+        statuses = [f["status"] for f in features.values()] + [prediction["status"]]
+        overall = next((s for s in ("alert", "warn", "insufficient_data") if s in statuses), "ok")
+        return {"n_observed": n, "reference_n": self.profile["n"], "status": overall,
+                "thresholds": {"psi_warn": PSI_WARN, "psi_alert": PSI_ALERT, "min_observations": MIN_OBSERVATIONS},
+                "features": features, "failure_probability": prediction}
+
+
+def main(argv=None):
+    import joblib
+    import pandas as pd
+
+    from scoring import pipeline_columns
+
+    ap = argparse.ArgumentParser(description="Write the drift reference profile of a joblib pipeline.")
+    ap.add_argument("model", help="joblib Pipeline")
+    ap.add_argument("data", help="training CSV the model was fitted on")
+    ap.add_argument("-o", "--output", help="profile path (default: <model>.drift.json)")
+    args = ap.parse_args(argv)
+
+    pipeline = joblib.load(args.model)
+    columns, numeric_cols = pipeline_columns(pipeline)
+    frame = pd.read_csv(args.data)
+    probs = pipeline.predict_proba(frame[columns])[:, 1]
+    profile = build_profile(frame, numeric_cols, [c for c in columns if c not in numeric_cols], probs)
+    out = args.output or profile_path(args.model)
+    save_profile(profile, out)
+    print(f"Wrote drift profile of {len(frame)} rows to {out}")
+
+
+if __name__ == "__main__":
+    main()
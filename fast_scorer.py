@@ -0,0 +1,222 @@
+# fast_scorer.py - pandas-free scorer compiled from the fitted sklearn pipeline
+"""
+CompiledScorer reads the fitted ColumnTransformer(OneHotEncoder, StandardScaler)
+once and keeps only what inference needs: a category -> column index map per
+categorical field and the scaler mean/scale arrays. Devices are encoded straight
+into a float64 feature vector laid out exactly like the ColumnTransformer output,
+and the vector is handed to the pipeline's final estimator.
+
+A gradient boosting model is flattened into a FlatTreeEnsemble, kept as
+`ensemble` for explanations and export. It also scores when its trees fit the
+bitvector traversal (at most 8 leaves). Deeper trees (the max_depth 4-5 models
+tune.py searches) score batches faster in sklearn's own tree code, so the
+sklearn estimator stays `estimator` and the ensemble only takes batches below
+ENSEMBLE_MAX_ROWS, where its per-call overhead is much lower.
+
+A leading EngineeredFeatures step (feature_engineering.py) is supported: its
+columns are derived from the inputs with the same engineer() function and then
+scaled with the other numeric columns.
+
+Only the fitted attributes are read, so this module does not import sklearn
+(feature_engineering is imported only by scorers that use engineered features).
+"""
+import threading
+
+import numpy as np
+
+from tree_ensemble import FlatTreeEnsemble
+
+# deep-tree models: batches smaller than this go to the FlatTreeEnsemble, larger ones to sklearn
+ENSEMBLE_MAX_ROWS = 16
+
+
+class CompiledScorer:
+    def __init__(self, columns, cat_cols, cat_maps, cat_offsets, num_cols, num_offset,
+                 mean, scale, estimator, n_features, engineered=(), ensemble=None):
+        self.columns = list(columns)              # raw input columns the pipeline expects
+        self.cat_cols = list(cat_cols)
+        self.cat_maps = cat_maps                  # per categorical column: {value: category index}
+        self.cat_offsets = np.asarray(cat_offsets, dtype=np.intp)
+        self.engineered = list(engineered)        # columns derived by feature_engineering.engineer()
+        self.scaled_cols = list(num_cols)         # scaler block: numeric inputs + engineered columns
+        self.num_cols = [c for c in self.scaled_cols if c not in self.engineered]
+        self.num_offset = int(num_offset)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.estimator = estimator
+        if ensemble is None and isinstance(estimator, FlatTreeEnsemble):
+            ensemble = estimator
+        self.ensemble = ensemble                  # FlatTreeEnsemble for explanations/export, else None
+        self.n_features = int(n_features)
+        self._local = threading.local()
+        self._engineer = self._engineer_columns = None
+        if self.engineered:
+            from feature_engineering import engineer, engineer_columns
+            self._engineer, self._engineer_columns = engineer, engineer_columns
+
+    # ---------- construction ----------
+    @classmethod
+    def from_pipeline(cls, pipeline, flatten=True):
+        """Compile a fitted Pipeline([features,] preprocessor=ColumnTransformer(cat, num), clf)."""
+        pre = pipeline.named_steps["preprocessor"]
+        engineered = getattr(pipeline.named_steps.get("features"), "engineered_columns", [])
+        estimator, ensemble = pipeline.steps[-1][1], None
+        if flatten and hasattr(estimator, "estimators_") and hasattr(estimator, "learning_rate"):
+            ensemble = FlatTreeEnsemble.from_estimator(estimator)
+            if ensemble.bitvector:
+                estimator = ensemble
+        if getattr(pre, "remainder", "drop") != "drop":
+            raise ValueError("Only ColumnTransformer(remainder='drop') can be compiled")
+
+        cat_cols, cat_maps, cat_offsets = [], [], []
+        num_cols, mean, scale, num_offset = [], None, None, None
+        offset = 0
+        for name, trans, cols in pre.transformers_:
+            if name == "remainder" or trans == "drop":
+                continue
+            cols = [str(c) for c in cols]
+            if hasattr(trans, "categories_"):
+                infrequent = getattr(trans, "infrequent_categories_", None) or []
+                if getattr(trans, "drop_idx_", None) is not None or \
+                        any(c is not None for c in infrequent):
+                    raise ValueError("OneHotEncoder with drop/infrequent categories is not supported")
+                for col, cats in zip(cols, trans.categories_):
+                    cat_cols.append(col)
+                    cat_maps.append({v: i for i, v in enumerate(cats.tolist())})
+                    cat_offsets.append(offset)
+                    offset += len(cats)
+            elif hasattr(trans, "n_features_in_") and hasattr(trans, "scale_"):
+                if num_cols:
+                    raise ValueError("Only one numeric transformer is supported")
+                n = len(cols)
+                num_cols = cols
+                num_offset = offset
+                mean = trans.mean_ if trans.mean_ is not None else np.zeros(n)
+                scale = trans.scale_ if trans.scale_ is not None else np.ones(n)
+                offset += n
+            else:
+                raise ValueError(f"Unsupported transformer {name!r}: {type(trans).__name__}")
+
+        columns = [str(c) for c in getattr(pipeline, "feature_names_in_", cat_cols + num_cols)]
+        return cls(columns, cat_cols, cat_maps, cat_offsets, num_cols,
+                   offset if num_offset is None else num_offset,
+                   mean if mean is not None else np.zeros(0),
+                   scale if scale is not None else np.ones(0),
+                   estimator, offset, engineered, ensemble)
+
+    # ---------- encoding ----------
+    def _buffer(self):
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = self._local.buf = np.zeros((1, self.n_features), dtype=float)
+        return buf
+
+    def encode(self, device, out=None):
+        """Encode one device dict into a (1, n_features) row; reuses a per-thread buffer."""
+        row = self._buffer() if out is None else out
+        row.fill(0.0)
+        vec = row[0]
+        if self._engineer is not None:
+            device = {**device, **self._engineer(device)}
+        for col, lut, off in zip(self.cat_cols, self.cat_maps, self.cat_offsets):
+            idx = lut.get(device[col])
+            if idx is not None:
+                vec[off + idx] = 1.0
+        n = len(self.scaled_cols)
+        if n:
+            nums = vec[self.num_offset:self.num_offset + n]
+            nums[:] = [device[c] for c in self.scaled_cols]
+            nums -= self.mean
+            nums /= self.scale
+        return row
+
+    def _category_codes(self, values, lut):
+        values = np.asarray(values, dtype=object)
+        try:
+            uniques, inverse = np.unique(values, return_inverse=True)
+        except TypeError:  # mixed, unorderable types
+            return np.fromiter((lut.get(v, -1) for v in values), dtype=np.intp, count=len(values))
+        codes = np.array([lut.get(u, -1) for u in uniques.tolist()], dtype=np.intp)
+        return codes[inverse.reshape(-1)] if len(values) else codes
+
+    def encode_columns(self, data, n_rows=None):
+        """
+        Encode a column block (mapping column -> sequence, e.g. a DataFrame or a dict of
+        arrays) into an (n_rows, n_features) matrix without per-row Python work.
+        """
+        if n_rows is None:
+            n_rows = len(data[self.columns[0]]) if self.columns else 0
+        if self._engineer_columns is not None:
+            data = {**{c: data[c] for c in self.columns}, **self._engineer_columns(data)}
+        X = np.zeros((n_rows, self.n_features), dtype=float)
+        rows = np.arange(n_rows)
+        for col, lut, off in zip(self.cat_cols, self.cat_maps, self.cat_offsets):
+            codes = self._category_codes(data[col], lut)
+            hit = codes >= 0
+            X[rows[hit], off + codes[hit]] = 1.0
+        if self.scaled_cols:
+            block = X[:, self.num_offset:self.num_offset + len(self.scaled_cols)]
+            for j, col in enumerate(self.scaled_cols):
+                block[:, j] = np.asarray(data[col], dtype=float)
+            block -= self.mean
+            block /= self.scale
+        return X
+
+    def encode_devices(self, devices):
+        """Encode a list of device dicts (already validated) into a feature matrix."""
+        data = {c: [d[c] for d in devices] for c in self.columns}
+        return self.encode_columns(data, n_rows=len(devices))
+
+    # ---------- scoring ----------
+    def predict_proba(self, X):
+        """Positive-class probability for an already encoded feature matrix."""
+        if self.ensemble is not None and self.ensemble is not self.estimator and len(X) < ENSEMBLE_MAX_ROWS:
+            return self.ensemble.predict_proba(X)[:, 1]
+        return self.estimator.predict_proba(X)[:, 1]
+
+    def predict_one(self, device) -> float:
+        return float(self.predict_proba(self.encode(device))[0])
+
+    def score_devices(self, devices):
+        if not devices:
+            return np.empty(0, dtype=float)
+        return self.predict_proba(self.encode_devices(devices))
+
+    def score_frame(self, data):
+        return self.predict_proba(self.encode_columns(data))
+
+    # ---------- explanations ----------
+    @property
+    def fields(self):
+        """Explanation fields: the raw input columns, then any engineered columns."""
+        return self.columns + self.engineered
+
+    def field_values(self, device):
+        """A device dict extended with its engineered values, keyed like fields."""
+        return {**device, **self._engineer(device)} if self._engineer is not None else device
+
+    def field_index(self):
+        """Field (index into self.fields) that each encoded feature comes from."""
+        idx = np.empty(self.n_features, dtype=np.intp)
+        pos = {c: i for i, c in enumerate(self.fields)}
+        for col, lut, off in zip(self.cat_cols, self.cat_maps, self.cat_offsets):
+            idx[off:off + len(lut)] = pos[col]
+        for j, col in enumerate(self.scaled_cols):
+            idx[self.num_offset + j] = pos[col]
+        return idx
+
+    def explain(self, X):
+        """
+        Per-field log-odds contributions for an encoded matrix: returns
+        (bias, contrib) with contrib of shape (n_rows, len(fields)); the one-hot
+        columns of a categorical field are summed into that field.
+        """
+        if self.ensemble is None:
+            raise ValueError("Explanations need a gradient boosting model (FlatTreeEnsemble)")
+        bias, contrib = self.ensemble.contributions(X)
+        fields = np.zeros((self.n_features, len(self.fields)))
+        fields[np.arange(self.n_features), self.field_index()] = 1.0
+        return bias, contrib @ fields
+
+    def explain_devices(self, devices):
+        return self.explain(self.encode_devices(devices))
@@ -0,0 +1,70 @@
+# feature_engineering.py - engineered device features shared by training and serving
+"""
+The engineered features of Modelling.ipynb (columns of
+Part2/v4_test_predictions_with_proba.csv), as one fitted-pipeline step:
+
+  cumulative_wear      device_age_years * usage_hours_per_week
+  error_rate           error_logs_past_month / (usage_hours_per_week + 1)
+  overdue_maintenance  1 if last_maintenance_gap_days > 180 else 0
+  critical_errors      error_logs_past_month if criticality_level == "High" else 0
+  spare_quality_num    spare_parts_availability Good / Moderate / Poor -> 1 / 2 / 3 (0 if unknown)
+  support_spares_risk  spare_quality_num * (6 - manufacturer_support_rating)
+
+engineer() uses only arithmetic and comparison operators, so the same code scores
+one device (Python scalars) and a column block (NumPy arrays, one vectorized pass
+per feature, no per-row Python). EngineeredFeatures runs it as the first step of
+a Pipeline(features, preprocessor, clf); the preprocessor then scales the new
+columns like any other numeric input. CompiledScorer calls engineer() directly, so
+training, batch scoring and single-row serving share one definition.
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+ENGINEERED = ["cumulative_wear", "error_rate", "overdue_maintenance",
+              "critical_errors", "spare_quality_num", "support_spares_risk"]
+NUMERIC_INPUTS = ["device_age_years", "usage_hours_per_week", "last_maintenance_gap_days",
+                  "error_logs_past_month", "manufacturer_support_rating"]
+CATEGORICAL_INPUTS = ["criticality_level", "spare_parts_availability"]
+OVERDUE_GAP_DAYS = 180
+
+
+def engineer(d):
+    """Engineered features from a mapping of inputs: scalars per device or NumPy columns."""
+    errors, usage, rating = d["error_logs_past_month"], d["usage_hours_per_week"], d["manufacturer_support_rating"]
+    spares = d["spare_parts_availability"]
+    spare_quality = (spares == "Good") * 1 + (spares == "Moderate") * 2 + (spares == "Poor") * 3
+    return {
+        "cumulative_wear": d["device_age_years"] * usage,
+        "error_rate": errors / (usage + 1),
+        "overdue_maintenance": (d["last_maintenance_gap_days"] > OVERDUE_GAP_DAYS) * 1,
+        "critical_errors": errors * (d["criticality_level"] == "High"),
+        "spare_quality_num": spare_quality,
+        "support_spares_risk": spare_quality * (6 - rating),
+    }
+
+
+def engineer_columns(data):
+    """engineer() over a column block (DataFrame or mapping of sequences) -> {name: float array}."""
+    cols = {c: np.asarray(data[c], dtype=float) for c in NUMERIC_INPUTS}
+    cols.update({c: np.asarray(data[c], dtype=object) for c in CATEGORICAL_INPUTS})
+    return {name: np.asarray(values, dtype=float) for name, values in engineer(cols).items()}
+
+
+class EngineeredFeatures(TransformerMixin, BaseEstimator):
+    """Pipeline step: DataFrame in, the same DataFrame plus the ENGINEERED columns out."""
+
+    engineered_columns = ENGINEERED
+
+    def fit(self, X, y=None):
+        missing = [c for c in NUMERIC_INPUTS + CATEGORICAL_INPUTS if c not in X.columns]
+        if missing:
+            raise ValueError(f"EngineeredFeatures needs columns: {', '.join(missing)}")
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        return self
+
+    def transform(self, X):
+        return X.assign(**engineer_columns(X))
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(list(self.feature_names_in_) + ENGINEERED, dtype=object)
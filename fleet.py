@@ -0,0 +1,659 @@
+# fleet.py - scored device fleet with precomputed risk aggregates
+"""
+Fleet holds a device table in columnar NumPy arrays (categorical fields as integer
+codes into a per-field vocabulary), scored once with a CompiledScorer. Alongside
+it a FleetCube keeps, for every combination of GROUP_FIELDS, the risk-category
+counts, the probability sum and a probability histogram. A filtered or grouped
+summary is a sum over a slice of the cube, so queries never touch the rows or the
+model. upsert() scores only the incoming rows and moves their contribution
+between cube cells, so updates cost time proportional to the rows changed.
+
+Every row also stores a hash of its model inputs. A delta feed can therefore
+resend devices freely: rows whose hash is unchanged are skipped without scoring.
+set_model() rescores the whole fleet when the model version changes.
+
+Fleet.open(path, ...) keeps the table on disk: one memory-mapped .npy file per
+column plus meta.json (row count, vocabularies, model version). Updates write
+straight into the mapped rows, and flush() makes them durable. The device index
+and the cube are rebuilt from the columns when a store is opened.
+
+top() answers "the K riskiest devices matching these filters" from a TopKIndex:
+per cube cell, the rows sorted by descending probability. A query merges the
+first K entries of each selected cell. The index is built on first use and then
+updated by upsert() in place.
+
+    python fleet.py STORE --data delta.csv [--model best_model_gb.joblib]
+
+opens (or creates) STORE, rescores it if the model changed, applies the rows in
+--data and flushes.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from scoring import HIGH_CUTOFF, LOW_CUTOFF, RISK_LABELS
+
+ID_COL = "device_id"
+GROUP_FIELDS = ["manufacturer", "device_name", "environment", "criticality_level"]
+HIST_BINS = 20
+MERGE_FRACTION = 0.05   # DeviceIndex folds recent inserts into its sorted arrays past this share
+STORE_FORMAT_VERSION = 1
+RESCORE_CHUNK_ROWS = 500_000
+
+
+def risk_codes(probs):
+    """Index into RISK_LABELS for each probability (vectorized categorize_prob_fixed)."""
+    return ((probs >= LOW_CUTOFF).astype(np.int8) + (probs >= HIGH_CUTOFF)).astype(np.int8)
+
+
+class DeviceIndex:
+    """
+    device_id -> row position. The bulk lives in sorted arrays searched with
+    np.searchsorted; ids inserted since the last merge sit in a dict, which is
+    merged back once it holds more than MERGE_FRACTION of the index.
+    """
+
+    def __init__(self):
+        self._ids = np.empty(0, dtype=np.int64)
+        self._rows = np.empty(0, dtype=np.int64)
+        self._recent = {}
+
+    def __len__(self):
+        return len(self._ids) + len(self._recent)
+
+    def lookup(self, ids):
+        """Row of every id, -1 where unknown."""
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        if len(self._ids):
+            pos = np.minimum(np.searchsorted(self._ids, ids), len(self._ids) - 1)
+            hit = self._ids[pos] == ids
+            rows[hit] = self._rows[pos[hit]]
+        if self._recent:
+            for k in np.flatnonzero(rows < 0).tolist():
+                rows[k] = self._recent.get(int(ids[k]), -1)
+        return rows
+
+    def insert(self, ids, rows):
+        """Add ids that are not in the index yet."""
+        if len(ids) > MERGE_FRACTION * len(self):
+            self._merge(np.asarray(ids, dtype=np.int64), np.asarray(rows, dtype=np.int64))
+            return
+        self._recent.update(zip(np.asarray(ids).tolist(), np.asarray(rows).tolist()))
+        if len(self._recent) > max(1024, MERGE_FRACTION * len(self._ids)):
+            self._merge(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    def _merge(self, ids, rows):
+        recent_ids = np.fromiter(self._recent.keys(), dtype=np.int64, count=len(self._recent))
+        recent_rows = np.fromiter(self._recent.values(), dtype=np.int64, count=len(self._recent))
+        all_ids = np.concatenate([self._ids, recent_ids, ids])
+        order = np.argsort(all_ids, kind="stable")
+        self._ids = all_ids[order]
+        self._rows = np.concatenate([self._rows, recent_rows, rows])[order]
+        self._recent = {}
+
+
+class FleetCube:
+    """Dense aggregates over the cross product of the group fields' vocabularies."""
+
+    def __init__(self, fields, sizes, n_bins=HIST_BINS):
+        self.fields = list(fields)
+        self.n_bins = int(n_bins)
+        shape = tuple(sizes)
+        self.counts = np.zeros(shape + (len(RISK_LABELS),), dtype=np.int64)
+        self.prob_sum = np.zeros(shape)
+        self.hist = np.zeros(shape + (self.n_bins,), dtype=np.int64)
+
+    @property
+    def shape(self):
+        return self.prob_sum.shape
+
+    def grow(self, axis, size):
+        """Extend one field's axis to size entries (a new category appeared)."""
+        extra = size - self.shape[axis]
+        if extra <= 0:
+            return
+        pad = [(0, 0)] * self.counts.ndim
+        pad[axis] = (0, extra)
+        self.counts = np.pad(self.counts, pad)
+        self.hist = np.pad(self.hist, pad)
+        self.prob_sum = np.pad(self.prob_sum, pad[:-1])
+
+    def cells(self, codes):
+        """Flat cell id for per-field code arrays (in self.fields order)."""
+        return np.ravel_multi_index(tuple(codes), self.shape)
+
+    def add(self, cells, probs, risk, sign=1):
+        """Add (sign=1) or remove (sign=-1) scored rows from their cells."""
+        if len(cells) == 0:
+            return
+        n_cells = self.prob_sum.size
+        n_risk = len(RISK_LABELS)
+        bins = np.minimum((probs * self.n_bins).astype(np.intp), self.n_bins - 1)
+        self.counts.reshape(n_cells, n_risk)[:] += sign * np.bincount(
+            cells * n_risk + risk, minlength=n_cells * n_risk).reshape(n_cells, n_risk)
+        self.hist.reshape(n_cells, self.n_bins)[:] += sign * np.bincount(
+            cells * self.n_bins + bins, minlength=n_cells * self.n_bins).reshape(n_cells, self.n_bins)
+        self.prob_sum.reshape(n_cells)[:] += sign * np.bincount(cells, weights=probs, minlength=n_cells)
+
+    def slice(self, selected):
+        """(counts, prob_sum, hist) restricted to the selected codes per field (None = all)."""
+        counts, prob_sum, hist = self.counts, self.prob_sum, self.hist
+        for axis, codes in enumerate(selected):
+            if codes is not None:
+                counts = counts.take(codes, axis=axis)
+                prob_sum = prob_sum.take(codes, axis=axis)
+                hist = hist.take(codes, axis=axis)
+        return counts, prob_sum, hist
+
+
+class TopKIndex:
+    """
+    Rows of every partition (combination of group-field codes) sorted by descending
+    probability, as parallel arrays of negated probabilities and row positions.
+    """
+
+    def __init__(self):
+        self.parts = {}   # partition code tuple -> (neg_prob ascending, rows)
+
+    @classmethod
+    def build(cls, part_codes, probs, rows):
+        index = cls()
+        index.add(part_codes, probs, rows)
+        return index
+
+    @staticmethod
+    def _groups(part_codes, neg):
+        """(partition tuple, positions sorted by neg) for each distinct row of the codes matrix."""
+        if len(part_codes) == 0:
+            return
+        dims = part_codes.max(axis=0) + 1
+        cell = np.ravel_multi_index(tuple(part_codes.T), dims)
+        order = np.lexsort((neg, cell))
+        cell = cell[order]
+        bounds = np.flatnonzero(np.diff(cell)) + 1
+        keys = np.column_stack(np.unravel_index(cell[np.r_[0, bounds]], dims))
+        yield from zip(map(tuple, keys.tolist()), np.split(order, bounds))
+
+    def add(self, part_codes, probs, rows):
+        for key, pos in self._groups(part_codes, -probs):
+            neg, new_rows = -probs[pos], rows[pos]
+            if key in self.parts:
+                old_neg, old_rows = self.parts[key]
+                at = np.searchsorted(old_neg, neg, side="right")
+                neg, new_rows = np.insert(old_neg, at, neg), np.insert(old_rows, at, new_rows)
+            self.parts[key] = (neg, new_rows)
+
+    def remove(self, part_codes, probs, rows):
+        for key, pos in self._groups(part_codes, -probs):
+            neg, part_rows = self.parts[key]
+            # the old entries sit within the runs of their (unchanged) stored values
+            lo = np.searchsorted(neg, -probs[pos], side="left")
+            hi = np.searchsorted(neg, -probs[pos], side="right")
+            candidates = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)])
+            drop = candidates[np.isin(part_rows[candidates], rows[pos])]
+            self.parts[key] = (np.delete(neg, drop), np.delete(part_rows, drop))
+
+    def top(self, keys, k, accept=None):
+        """
+        Rows of the k highest probabilities over the given partitions, best first
+        (ties by row).
+        accept(rows) -> bool mask applies extra filters; partitions are then scanned
+        deeper until no unscanned row can still make the top k.
+        """
+        parts = [self.parts[key] for key in keys if key in self.parts and len(self.parts[key][0])]
+        if accept is None:
+            # any partition's k-th value bounds the overall k-th, so only a prefix of each qualifies
+            bound = min((neg[k - 1] for neg, _ in parts if len(neg) >= k), default=np.inf)
+            negs, rows = [], []
+            for neg, part_rows in parts:
+                if neg[0] <= bound:
+                    end = np.searchsorted(neg, bound, side="right")
+                    negs.append(neg[:end])
+                    rows.append(part_rows[:end])
+            if not negs:
+                return np.empty(0, dtype=np.int64)
+            neg, rows = np.concatenate(negs), np.concatenate(rows)
+            return rows[np.lexsort((rows, neg))[:k]]
+        best_neg, best_rows = np.empty(0), np.empty(0, dtype=np.int64)
+        start, depth = 0, k
+        while parts:
+            negs = [best_neg] + [neg[start:depth] for neg, _ in parts]
+            rows = [best_rows] + [part_rows[start:depth] for _, part_rows in parts]
+            neg, rows = np.concatenate(negs), np.concatenate(rows)
+            ok = accept(rows)
+            ok[:len(best_rows)] = True
+            neg, rows = neg[ok], rows[ok]
+            order = np.lexsort((rows, neg))[:k]
+            best_neg, best_rows = neg[order], rows[order]
+            # keep scanning only partitions whose next row could still make the top k
+            kth = best_neg[-1] if len(best_neg) == k else np.inf
+            parts = [(neg, part_rows) for neg, part_rows in parts if len(neg) > depth and neg[depth] <= kth]
+            start, depth = depth, depth * 4
+        return best_rows
+
+
+class Fleet:
+    def __init__(self, scorer, version, group_fields=GROUP_FIELDS, n_bins=HIST_BINS, path=None):
+        missing = [f for f in group_fields if f not in scorer.cat_cols]
+        if missing:
+            raise ValueError(f"Group fields must be categorical model inputs: {', '.join(missing)}")
+        self.scorer = scorer
+        self.version = version
+        self.cat_cols = list(scorer.cat_cols)
+        self.num_cols = list(scorer.num_cols)
+        self.group_fields = list(group_fields)
+        self.vocab = {c: sorted(lut, key=lut.get) for c, lut in zip(scorer.cat_cols, scorer.cat_maps)}
+        self._categories = {c: frozenset(lut) for c, lut in zip(scorer.cat_cols, scorer.cat_maps)}
+        self._vocab_index = {c: {v: i for i, v in enumerate(vals)} for c, vals in self.vocab.items()}
+
+        self.path = path
+        self.n = 0
+        dtypes = {ID_COL: np.int64, "prob": np.float64, "risk": np.int8, "hash": np.uint64}
+        dtypes.update({c: np.int32 for c in self.cat_cols})
+        dtypes.update({c: np.float64 for c in self.num_cols})
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self._cols = {name: self._commit(name, self._allocate(name, dtype, 0)) for name, dtype in dtypes.items()}
+        self.index = DeviceIndex()
+        self.cube = FleetCube(self.group_fields, [len(self.vocab[f]) for f in self.group_fields], n_bins)
+        self._topk = None
+        self.lock = threading.RLock()
+
+    # ---------- loading ----------
+    @classmethod
+    def from_file(cls, path, scorer, version, chunk_size=500_000, **kwargs):
+        """Load and score a CSV/Parquet fleet table chunk by chunk."""
+        from score_file import iter_chunks
+        fleet = cls(scorer, version, **kwargs)
+        for chunk in iter_chunks(path, chunk_size, columns=[ID_COL] + scorer.columns):
+            fleet.upsert(chunk)
+        return fleet
+
+    @classmethod
+    def open(cls, path, scorer, version, **kwargs):
+        """
+        Open the on-disk store at path, creating an empty one if needed. A store
+        scored with another model version is rescored (and flushed) first.
+        """
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            fleet = cls(scorer, version, path=path, **kwargs)
+            fleet.flush()
+            return fleet
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported fleet store format {meta.get('format_version')!r}")
+
+        fleet = cls.__new__(cls)
+        fleet.scorer = scorer
+        fleet.version = meta["model_version"]
+        fleet.cat_cols, fleet.num_cols = meta["categorical_cols"], meta["numeric_cols"]
+        fleet.group_fields = meta["group_fields"]
+        fleet.vocab = meta["vocab"]
+        fleet._vocab_index = {c: {v: i for i, v in enumerate(vals)} for c, vals in fleet.vocab.items()}
+        fleet.path = path
+        fleet.n = meta["n"]
+        fleet._cols = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r+")
+                       for name in meta["columns"]}
+        fleet.index = DeviceIndex()
+        fleet.index.insert(fleet.column(ID_COL), np.arange(fleet.n))
+        fleet.lock = threading.RLock()
+        fleet._topk = None
+        fleet._rebuild_cube(meta["n_bins"])
+        fleet.set_model(scorer, version)
+        return fleet
+
+    def flush(self):
+        """Persist mapped columns and metadata (no-op for in-memory fleets)."""
+        if self.path is None:
+            return
+        with self.lock:
+            for arr in self._cols.values():
+                arr.flush()
+            meta = {
+                "format_version": STORE_FORMAT_VERSION,
+                "model_version": self.version,
+                "n": self.n,
+                "columns": list(self._cols),
+                "categorical_cols": self.cat_cols,
+                "numeric_cols": self.num_cols,
+                "group_fields": self.group_fields,
+                "n_bins": self.cube.n_bins,
+                "vocab": self.vocab,
+            }
+            tmp = os.path.join(self.path, "meta.json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def column(self, name):
+        return self._cols[name][:self.n]
+
+    def values(self, field, rows=None):
+        """Decoded values of a categorical field (object array)."""
+        codes = self.column(field) if rows is None else self._cols[field][rows]
+        return np.asarray(self.vocab[field], dtype=object)[codes]
+
+    # ---------- storage ----------
+    def _allocate(self, name, dtype, capacity):
+        """A zeroed column: an array in memory, or a mapped .npy written next to the live one."""
+        if self.path is None:
+            return np.zeros(capacity, dtype=dtype)
+        tmp = os.path.join(self.path, name + ".npy.tmp")
+        return np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=(max(capacity, 1),))
+
+    def _commit(self, name, arr):
+        """Move a column from _allocate into place; rows past meta.json's n are never read."""
+        if self.path is not None:
+            arr.flush()
+            os.replace(os.path.join(self.path, name + ".npy.tmp"), os.path.join(self.path, name + ".npy"))
+        return arr
+
+    def _reserve(self, n):
+        capacity = len(self._cols[ID_COL])
+        if n <= capacity:
+            return
+        capacity = max(n, 2 * capacity, 1024)
+        for name, arr in self._cols.items():
+            grown = self._allocate(name, arr.dtype, capacity)
+            grown[:self.n] = arr[:self.n]
+            self._cols[name] = self._commit(name, grown)
+
+    # ---------- updates ----------
+    def feature_hash(self, data):
+        """uint64 hash of each row's model inputs; 7 and 7.0 hash alike."""
+        frame = pd.DataFrame({c: np.asarray(data[c], dtype=object) for c in self.cat_cols})
+        for c in self.num_cols:
+            frame[c] = np.asarray(data[c], dtype=float)
+        return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+    def _encode(self, field, values):
+        """Vocabulary codes for raw values, adding unseen values (known to the model) to the vocabulary."""
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        index, vocab = self._vocab_index[field], self.vocab[field]
+        for u in uniques.tolist():
+            if u not in index:
+                index[u] = len(vocab)
+                vocab.append(u)
+        if field in self.group_fields:
+            self.cube.grow(self.group_fields.index(field), len(vocab))
+        lut = np.array([index[u] for u in uniques.tolist()], dtype=np.int32)
+        return lut[codes]
+
+    def _part_codes(self, rows):
+        """(len(rows), n_group_fields) matrix of partition codes."""
+        return np.column_stack([self._cols[f][rows] for f in self.group_fields])
+
+    def _cells(self, rows):
+        return self.cube.cells([self._cols[f][rows] for f in self.group_fields])
+
+    def _clean(self, frame):
+        """
+        Rows with an id, every model column present and categories the model or the
+        vocabulary already knows; keeps the last row per device_id. Unknown categories
+        are dropped so arbitrary strings cannot grow the vocabulary and the cube.
+        """
+        required = [ID_COL] + self.cat_cols + self.num_cols
+        missing = [c for c in required if c not in frame.columns]
+        if missing:
+            raise ValueError("missing columns: " + ", ".join(missing))
+        frame = frame[required]
+        ok = frame.notna().all(axis=1).to_numpy().copy()
+        for c in self.num_cols:
+            ok &= pd.to_numeric(frame[c], errors="coerce").notna().to_numpy()
+        for c in self.cat_cols:
+            known = self._vocab_index[c].keys() | self._categories[c]
+            ok &= frame[c].isin(list(known)).to_numpy()
+        frame = frame[ok]
+        frame = frame[~frame[ID_COL].duplicated(keep="last").to_numpy()]
+        return frame, int((~ok).sum())
+
+    def upsert(self, frame):
+        """
+        Insert new devices and replace existing ones (matched on device_id). Rows
+        whose inputs hash the same as the stored row are left alone; only new and
+        changed rows are scored. Returns counts of inserted, updated, unchanged and
+        skipped (invalid or unknown-category) rows.
+        """
+        with self.lock:
+            frame, skipped = self._clean(pd.DataFrame(frame))
+            counts = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": skipped}
+            if not len(frame):
+                return counts
+            ids = frame[ID_COL].to_numpy(dtype=np.int64)
+            data = {c: frame[c].to_numpy() for c in self.cat_cols}
+            data.update({c: pd.to_numeric(frame[c]).to_numpy(dtype=float) for c in self.num_cols})
+            hashes = self.feature_hash(data)
+
+            rows = self.index.lookup(ids)
+            existing = rows >= 0
+            same = np.zeros(len(rows), dtype=bool)
+            same[existing] = self._cols["hash"][rows[existing]] == hashes[existing]
+            counts["unchanged"] = int(same.sum())
+            if same.all():
+                return counts
+            if same.any():
+                keep = ~same
+                ids, rows, existing, hashes = ids[keep], rows[keep], existing[keep], hashes[keep]
+                data = {c: v[keep] for c, v in data.items()}
+
+            probs = self.scorer.score_frame(data)
+            codes = {c: self._encode(c, data[c]) for c in self.cat_cols}
+            old = rows[existing]
+            self.cube.add(self._cells(old), self._cols["prob"][old], self._cols["risk"][old], -1)
+            if self._topk is not None:
+                self._topk.remove(self._part_codes(old), self._cols["prob"][old], old)
+
+            n_new = int((~existing).sum())
+            self._reserve(self.n + n_new)
+            new_rows = np.arange(self.n, self.n + n_new)
+            rows[~existing] = new_rows
+            self.index.insert(ids[~existing], new_rows)
+            self.n += n_new
+
+            risk = risk_codes(probs)
+            self._write(rows, ids, codes, data, probs, risk, hashes)
+            self.cube.add(self._cells(rows), probs, risk, 1)
+            if self._topk is not None:
+                self._topk.add(self._part_codes(rows), probs, rows)
+            counts.update(inserted=n_new, updated=int(existing.sum()))
+            return counts
+
+    def _write(self, rows, ids, codes, data, probs, risk, hashes):
+        self._cols[ID_COL][rows] = ids
+        self._cols["hash"][rows] = hashes
+        for c in self.cat_cols:
+            self._cols[c][rows] = codes[c]
+        for c in self.num_cols:
+            self._cols[c][rows] = data[c]
+        self._cols["prob"][rows] = probs
+        self._cols["risk"][rows] = risk
+
+    def _rows_data(self, start, stop):
+        """Raw model inputs of rows start..stop, as score_frame expects them."""
+        data = {c: np.asarray(self.vocab[c], dtype=object)[self._cols[c][start:stop]] for c in self.cat_cols}
+        data.update({c: np.asarray(self._cols[c][start:stop]) for c in self.num_cols})
+        return data
+
+    def _rebuild_cube(self, n_bins=None):
+        cube = FleetCube(self.group_fields, [len(self.vocab[f]) for f in self.group_fields],
+                         n_bins or self.cube.n_bins)
+        for start in range(0, self.n, RESCORE_CHUNK_ROWS):
+            rows = np.arange(start, min(start + RESCORE_CHUNK_ROWS, self.n))
+            cube.add(cube.cells([self._cols[f][rows] for f in self.group_fields]),
+                     self._cols["prob"][rows], self._cols["risk"][rows])
+        self.cube = cube
+
+    def set_model(self, scorer, version):
+        """Serve scores from another model; rescores every row if the version changed."""
+        if list(scorer.cat_cols) != self.cat_cols or list(scorer.num_cols) != self.num_cols:
+            raise ValueError("The new model expects different input columns than the fleet store")
+        with self.lock:
+            self.scorer = scorer
+            self._categories = {c: frozenset(lut) for c, lut in zip(scorer.cat_cols, scorer.cat_maps)}
+            if version == self.version:
+                return False
+            for start in range(0, self.n, RESCORE_CHUNK_ROWS):
+                stop = min(start + RESCORE_CHUNK_ROWS, self.n)
+                probs = scorer.score_frame(self._rows_data(start, stop))
+                self._cols["prob"][start:stop] = probs
+                self._cols["risk"][start:stop] = risk_codes(probs)
+            self.version = version
+            self._topk = None
+            self._rebuild_cube()
+            self.flush()
+            return True
+
+    # ---------- queries ----------
+    def _selection(self, filters):
+        """Per group field: array of selected codes, or None for no filter."""
+        selected = []
+        for f in self.group_fields:
+            wanted = filters.get(f)
+            if wanted is None:
+                selected.append(None)
+                continue
+            index = self._vocab_index[f]
+            # np.unique: a value repeated in the filter must not be counted twice
+            selected.append(np.unique(np.array([index[v] for v in wanted if v in index], dtype=np.intp)))
+        return selected
+
+    def _stats(self, counts, prob_sum, hist=None):
+        n = int(counts.sum())
+        out = {"n": n, "mean_probability": float(prob_sum) / n if n else None,
+               "risk_counts": dict(zip(RISK_LABELS.tolist(), counts.tolist()))}
+        if hist is not None:
+            out["histogram"] = hist.tolist()
+        return out
+
+    def summary(self, filters=None, group_by=(), histograms=False):
+        """
+        Aggregates for the devices matching filters ({field: [values]}, fields from
+        GROUP_FIELDS), overall and per combination of the group_by fields.
+        """
+        filters = filters or {}
+        unknown = [f for f in list(filters) + list(group_by) if f not in self.group_fields]
+        if unknown:
+            raise ValueError(f"Can only filter/group by {', '.join(self.group_fields)}; got {', '.join(unknown)}")
+        with self.lock:
+            selected = self._selection(filters)
+            counts, prob_sum, hist = self.cube.slice(selected)
+            n_fields = len(self.group_fields)
+            result = {
+                "model_version": self.version,
+                "n_devices": self.n,
+                "filters": {f: list(v) for f, v in filters.items()},
+                "bin_edges": np.linspace(0.0, 1.0, self.cube.n_bins + 1).round(6).tolist(),
+                "overall": self._stats(counts.reshape(-1, counts.shape[-1]).sum(axis=0), prob_sum.sum(),
+                                       hist.reshape(-1, hist.shape[-1]).sum(axis=0)),
+            }
+            if not group_by:
+                return result
+
+            keep = [self.group_fields.index(f) for f in group_by]
+            drop = tuple(a for a in range(n_fields) if a not in keep)
+            # move grouped axes to the front in group_by order, then sum the rest away
+            g_counts = np.moveaxis(counts.sum(axis=drop, keepdims=True), keep, range(len(keep)))
+            g_prob = np.moveaxis(prob_sum.sum(axis=drop, keepdims=True), keep, range(len(keep)))
+            g_hist = np.moveaxis(hist.sum(axis=drop, keepdims=True), keep, range(len(keep)))
+            g_counts = g_counts.reshape(g_prob.shape[:len(keep)] + (-1,))
+            g_hist = g_hist.reshape(g_prob.shape[:len(keep)] + (-1,))
+            g_prob = g_prob.reshape(g_prob.shape[:len(keep)])
+
+            groups = []
+            for key in zip(*np.nonzero(g_counts.sum(axis=-1))):
+                codes = [selected[a][k] if selected[a] is not None else k for a, k in zip(keep, key)]
+                entry = {f: self.vocab[f][c] for f, c in zip(group_by, codes)}
+                entry.update(self._stats(g_counts[key], g_prob[key], g_hist[key] if histograms else None))
+                groups.append(entry)
+            groups.sort(key=lambda g: -g["mean_probability"])
+            result["group_by"] = list(group_by)
+            result["groups"] = groups
+            return result
+
+
+    def top(self, k, filters=None):
+        """
+        The k highest-probability devices matching filters ({field: [values]} over any
+        categorical model input), best first, as {"devices": [dict, ...], ...}.
+        """
+        filters = filters or {}
+        unknown = [f for f in filters if f not in self.cat_cols]
+        if unknown:
+            raise ValueError(f"Can only filter on {', '.join(self.cat_cols)}; got {', '.join(unknown)}")
+        with self.lock:
+            if self._topk is None:
+                rows = np.arange(self.n)
+                self._topk = TopKIndex.build(self._part_codes(rows), self.column("prob"), rows)
+            selected = [None if sel is None else set(sel.tolist()) for sel in self._selection(filters)]
+            keys = list(self._topk.parts)
+            for axis, sel in enumerate(selected):
+                if sel is not None:
+                    keys = [key for key in keys if key[axis] in sel]
+
+            # filters on fields that are not partitions are checked per candidate row
+            extra = {}
+            for f, wanted in filters.items():
+                if f not in self.group_fields:
+                    index = self._vocab_index[f]
+                    extra[f] = np.array([index[v] for v in wanted if v in index], dtype=np.int32)
+            accept = None
+            if extra:
+                def accept(rows):
+                    ok = np.ones(len(rows), dtype=bool)
+                    for f, codes in extra.items():
+                        ok &= np.isin(self._cols[f][rows], codes)
+                    return ok
+
+            rows = self._topk.top(keys, int(k), accept)
+            devices = {ID_COL: self._cols[ID_COL][rows].tolist()}
+            devices.update({c: self.values(c, rows).tolist() for c in self.cat_cols})
+            devices.update({c: self._cols[c][rows].tolist() for c in self.num_cols})
+            probs = self._cols["prob"][rows]
+            devices["failure_probability"] = probs.tolist()
+            devices["risk_category"] = RISK_LABELS[self._cols["risk"][rows]].tolist()
+            names = list(devices)
+            return {"devices": [dict(zip(names, vals)) for vals in zip(*devices.values())],
+                    "n_devices": self.n, "model_version": self.version}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("store", help="fleet store directory (created if missing)")
+    ap.add_argument("--data", help="CSV/Parquet of full or changed device rows, with device_id")
+    ap.add_argument("--model", default="best_model_gb.joblib", help="joblib pipeline or model_export.py directory")
+    ap.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_ROWS)
+    args = ap.parse_args(argv)
+
+    from model_registry import content_version
+    from score_file import iter_chunks, load_scorer
+
+    scorer = load_scorer(args.model)[3]
+    if scorer is None:
+        raise SystemExit("The fleet store needs a model that compiles to a CompiledScorer")
+    t0 = time.perf_counter()
+    fleet = Fleet.open(args.store, scorer, content_version(args.model))
+    print(f"opened {args.store}: {fleet.n:,} devices, model {fleet.version} ({time.perf_counter() - t0:.2f}s)",
+          file=sys.stderr)
+
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+    if args.data:
+        t0 = time.perf_counter()
+        for chunk in iter_chunks(args.data, args.chunk_size, columns=[ID_COL] + scorer.columns):
+            for k, v in fleet.upsert(chunk).items():
+                totals[k] += v
+        fleet.flush()
+        print(f"applied {args.data} in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+    print(json.dumps(dict(totals, n_devices=fleet.n, model_version=fleet.version)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# http_cache.py - JSON payloads serialized once and served with ETag / conditional GET
+import hashlib
+import json
+
+from flask import Response
+
+
+class PrecomputedJSON:
+    """A JSON document serialized to bytes once, with a strong ETag over those bytes."""
+
+    def __init__(self, payload, max_age=300):
+        self.payload = payload
+        self.body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.cache_control = f"public, max-age={int(max_age)}, must-revalidate"
+
+    def response(self, request):
+        """200 with the cached body, or 304 when If-None-Match matches the ETag (W/ tags too)."""
+        if request.if_none_match.contains_weak(self.etag):
+            resp = Response(status=304)
+        else:
+            resp = Response(self.body, mimetype="application/json")
+        resp.set_etag(self.etag)
+        resp.headers["Cache-Control"] = self.cache_control
+        return resp
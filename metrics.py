@@ -0,0 +1,229 @@
+# metrics.py - low-overhead request/stage timing histograms with a Prometheus /metrics endpoint
+"""
+Per-request instrumentation shared by app.py and app2.py.
+
+Each request gets a RequestTimer; the handler calls timer.stage("parse"),
+timer.stage("validate"), ... as it goes and each call records the time since
+the previous mark into a fixed-bucket histogram labelled by endpoint and stage.
+The Flask hooks installed by instrument() start the timer, record the response
+serialization as the final "serialize" stage and count requests by status code.
+
+Recording is a perf_counter() call, a bisect and a few integer adds under one
+lock, so it stays on in production. Disabled (METRICS_ENABLED=0), the hooks and
+the /metrics route are not installed and handlers get a timer whose stage() does
+nothing.
+
+Collectors registered with Metrics.collector() are polled only when /metrics is
+scraped, for values that already live elsewhere (cache stats, model version).
+"""
+import bisect
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+# histogram upper bounds: seconds for timings, rows for batch sizes
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative-on-render histogram over fixed upper bounds."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)   # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metrics:
+    """
+    Thread-safe registry of labelled histograms and counters plus scrape-time
+    collectors. collector(fn): fn() -> iterable of (name, kind, help, labels, value),
+    labels a dict.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}   # name -> {label tuple: Histogram}
+        self._counters = {}     # name -> {label tuple: value}
+        self._meta = {}         # name -> (kind, help, label names, buckets)
+        self._collectors = []
+
+    def histogram(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self._meta[name] = ("histogram", help, tuple(labels), tuple(buckets))
+        self._histograms[name] = {}
+
+    def counter(self, name, help, labels):
+        self._meta[name] = ("counter", help, tuple(labels), None)
+        self._counters[name] = {}
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+
+    def observe(self, name, labels, value):
+        series = self._histograms[name]
+        with self._lock:
+            hist = series.get(labels)
+            if hist is None:
+                hist = series[labels] = Histogram(self._meta[name][3])
+            hist.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        series = self._counters[name]
+        with self._lock:
+            series[labels] = series.get(labels, 0) + amount
+
+    def timer(self, endpoint):
+        return RequestTimer(self, endpoint) if self.enabled else NULL_TIMER
+
+    # ---------- exposition ----------
+    def render(self):
+        """All series in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, (kind, help, label_names, buckets) in self._meta.items():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                if kind == "counter":
+                    for labels, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}{_labels(label_names, labels)} {value}")
+                    continue
+                for labels, hist in sorted(self._histograms[name].items()):
+                    total = 0
+                    for bound, count in zip(buckets + ("+Inf",), hist.counts):
+                        total += count
+                        le = bound if bound == "+Inf" else repr(float(bound))
+                        lines.append(f"{name}_bucket{_labels(label_names + ('le',), labels + (le,))} {total}")
+                    lines.append(f"{name}_sum{_labels(label_names, labels)} {hist.sum!r}")
+                    lines.append(f"{name}_count{_labels(label_names, labels)} {total}")
+        seen = set()
+        for fn in self._collectors:
+            for name, kind, help, labels, value in fn():
+                if name not in seen:
+                    seen.add(name)
+                    lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class RequestTimer:
+    """Marks stage boundaries within one request; see the module docstring."""
+
+    __slots__ = ("metrics", "endpoint", "start", "last", "marked")
+
+    def __init__(self, metrics, endpoint):
+        self.metrics = metrics
+        self.endpoint = endpoint
+        self.start = self.last = time.perf_counter()
+        self.marked = False
+
+    def stage(self, name):
+        now = time.perf_counter()
+        self.metrics.observe("prediction_stage_seconds", (self.endpoint, name), now - self.last)
+        self.last = now
+        self.marked = True
+
+    def batch(self, n_rows):
+        self.metrics.observe("prediction_batch_size", (self.endpoint,), n_rows)
+
+    def finish(self, status):
+        if self.marked:
+            self.stage("serialize")
+        self.metrics.observe("prediction_request_seconds", (self.endpoint,), time.perf_counter() - self.start)
+        self.metrics.inc("prediction_requests_total", (self.endpoint, str(status)))
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def stage(self, name):
+        pass
+
+    def batch(self, n_rows):
+        pass
+
+    def finish(self, status):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+def instrument(app, metrics, endpoints):
+    """
+    Time the given Flask endpoints (view function names), expose GET /metrics and
+    return a function that gives the current request's timer (NULL_TIMER when
+    disabled or outside an instrumented endpoint).
+    """
+    from flask import Response, g, request
+
+    metrics.histogram("prediction_stage_seconds", "Time spent in each stage of a request.",
+                      ("endpoint", "stage"))
+    metrics.histogram("prediction_request_seconds", "Total handler time per request.", ("endpoint",))
+    metrics.histogram("prediction_batch_size", "Devices per scoring request.", ("endpoint",), SIZE_BUCKETS)
+    metrics.counter("prediction_requests_total", "Requests by endpoint and HTTP status.", ("endpoint", "status"))
+
+    def current_timer():
+        return g.get("metrics_timer", NULL_TIMER)
+
+    if not metrics.enabled:
+        return current_timer
+
+    endpoints = set(endpoints)
+
+    @app.before_request
+    def _start_timer():
+        if request.endpoint in endpoints:
+            g.metrics_timer = metrics.timer(request.endpoint)
+
+    @app.after_request
+    def _finish_timer(response):
+        timer = g.pop("metrics_timer", None)
+        if timer is not None:
+            timer.finish(response.status_code)
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def prometheus_metrics():
+        return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+    return current_timer
+
+
+def cache_collector(cache):
+    """Collector for a PredictionCache's counters and size."""
+    def collect():
+        stats = cache.stats()
+        for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+            yield (f"prediction_cache_{key}_total", "counter", f"Prediction cache {key}.", {}, stats[key])
+        yield ("prediction_cache_size", "gauge", "Entries in the prediction cache.", {}, stats["size"])
+    return collect
+
+
+def model_collector(registry):
+    """Collector exposing the serving model version as an info-style gauge."""
+    def collect():
+        yield ("model_info", "gauge", "Model version currently served.", {"version": registry.version}, 1)
+        yield ("model_reloads_total", "counter", "Model artifacts swapped in since start.", {}, registry.reloads)
+    return collect
@@ -0,0 +1,143 @@
+# model_export.py - export the fitted pipeline to a compact, memory-mappable artifact
+"""
+Usage:
+    python model_export.py best_model_gb.joblib best_model_gb.compiled
+
+Writes a directory with one .npy file per array (scaler mean/scale and the
+flattened tree arrays) plus manifest.json holding the format version, encoder
+vocabularies, column layout, the array file names and the content version of the
+source artifact.
+
+Re-exporting into a directory a server is serving from is safe: every export
+writes its arrays under new file names and then swaps manifest.json atomically,
+so a running process keeps reading the arrays it mapped and a reload sees either
+the old or the new export, never a mix. Array files of older exports than the
+previous one are removed (a mapped file stays readable after unlinking).
+load_compiled() rebuilds a CompiledScorer from it with np.load(mmap_mode="r"), so
+serving from the export imports neither sklearn nor joblib and worker processes
+share the array pages through the OS page cache.
+"""
+import argparse
+import json
+import os
+import uuid
+
+import numpy as np
+
+from fast_scorer import CompiledScorer
+from tree_ensemble import FlatTreeEnsemble
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+TREE_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+def is_compiled_artifact(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def export_compiled(scorer, out_dir, source_version=None):
+    """Write a CompiledScorer (with a FlatTreeEnsemble) to out_dir."""
+    ens = scorer.ensemble
+    if not isinstance(ens, FlatTreeEnsemble):
+        raise ValueError("Only gradient boosting pipelines (FlatTreeEnsemble) can be exported")
+    os.makedirs(out_dir, exist_ok=True)
+
+    arrays = {"scaler_mean": scorer.mean, "scaler_scale": scorer.scale}
+    arrays.update({f"tree_{name}": getattr(ens, name) for name in TREE_ARRAYS})
+    if ens.cover is not None:
+        arrays["tree_cover"] = ens.cover
+    # fresh file names per export: arrays another process has mapped are never overwritten
+    token = uuid.uuid4().hex[:12]
+    files = {name: f"{name}.{token}.npy" for name in arrays}
+    for name, arr in arrays.items():
+        np.save(os.path.join(out_dir, files[name]), np.ascontiguousarray(arr))
+    previous = _array_files(out_dir) if is_compiled_artifact(out_dir) else {}
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "source_version": source_version,
+        "columns": scorer.columns,
+        "categorical_cols": scorer.cat_cols,
+        "categories": [sorted(lut, key=lut.get) for lut in scorer.cat_maps],
+        "category_offsets": scorer.cat_offsets.tolist(),
+        "numeric_cols": scorer.scaled_cols,
+        "engineered_cols": scorer.engineered,
+        "numeric_offset": scorer.num_offset,
+        "n_features": scorer.n_features,
+        "tree": {"max_depth": ens.max_depth, "init_raw": ens.init_raw,
+                 "n_features_in": ens.n_features_in_},
+        "arrays": sorted(arrays),
+        "files": files,
+    }
+    # manifest last: a directory without one is never picked up as an artifact
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+
+    # keep this export's and the previous export's arrays; a reload that read the old
+    # manifest just before the swap can still load them
+    keep = set(files.values()) | set(previous.values())
+    for fname in os.listdir(out_dir):
+        if fname.endswith(".npy") and fname not in keep:
+            os.remove(os.path.join(out_dir, fname))
+    return manifest
+
+
+def _array_files(path, manifest=None):
+    """{array name: file name} of an export (exports before "files" used <name>.npy)."""
+    manifest = manifest or read_manifest(path)
+    files = manifest.get("files", {})
+    return {name: files.get(name, name + ".npy") for name in manifest["arrays"]}
+
+
+def load_compiled(path, mmap=True):
+    """Rebuild a CompiledScorer from an exported directory without sklearn."""
+    manifest = read_manifest(path)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled artifact format {manifest.get('format_version')!r}")
+    mode = "r" if mmap else None
+    a = {name: np.load(os.path.join(path, fname), mmap_mode=mode)
+         for name, fname in _array_files(path, manifest).items()}
+
+    tree = manifest["tree"]
+    ens = FlatTreeEnsemble(a["tree_feature"], a["tree_threshold"], a["tree_left"], a["tree_right"],
+                           a["tree_value"], a["tree_roots"], tree["max_depth"], tree["init_raw"],
+                           tree["n_features_in"], a.get("tree_cover"))
+    cat_maps = [{v: i for i, v in enumerate(cats)} for cats in manifest["categories"]]
+    return CompiledScorer(manifest["columns"], manifest["categorical_cols"], cat_maps,
+                          manifest["category_offsets"], manifest["numeric_cols"],
+                          manifest["numeric_offset"], a["scaler_mean"], a["scaler_scale"],
+                          ens, manifest["n_features"], manifest.get("engineered_cols", []))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("model", help="joblib pipeline to export")
+    ap.add_argument("out_dir")
+    args = ap.parse_args(argv)
+
+    import joblib
+    from model_registry import content_version
+
+    pipeline = joblib.load(args.model)
+    scorer = CompiledScorer.from_pipeline(pipeline)
+    manifest = export_compiled(scorer, args.out_dir, source_version=content_version(args.model))
+
+    exported = load_compiled(args.out_dir)
+    probe = np.zeros((4, scorer.n_features))
+    probe[:, scorer.num_offset:] = np.arange(4)[:, None]
+    diff = float(np.abs(exported.predict_proba(probe) - scorer.predict_proba(probe)).max())
+    size = sum(os.path.getsize(os.path.join(args.out_dir, f)) for f in manifest["files"].values())
+    print(f"exported {args.model} -> {args.out_dir} ({size / 1024:.1f} KiB arrays, "
+          f"version {manifest['source_version']}, self-check diff {diff:.1e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# model_registry.py - hot-swappable model snapshots for the Flask apps
+"""
+ModelRegistry owns the currently served ModelSnapshot. A reload (admin call or a
+change of the artifact file picked up by the watcher thread) builds and warms up a
+complete new snapshot off the request path, then swaps it in with one reference
+assignment. Request handlers read `registry.current` once and use only that
+snapshot, so in-flight requests finish on the version they started with.
+
+The on_swap hook (e.g. rescoring a fleet table) runs after the reload lock is
+released, so a slow hook does not hold up the next reload; hooks run one at a
+time and a hook whose snapshot has already been replaced is skipped. Hook and
+watcher failures are logged and never stop the watcher.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from prediction_cache import artifact_version
+
+log = logging.getLogger(__name__)
+
+
+def content_version(path):
+    """
+    Short content hash of an artifact; identical files give identical versions. A
+    compiled artifact directory (model_export.py) reports its source's version.
+    """
+    if os.path.isdir(path):
+        from model_export import read_manifest
+        manifest = read_manifest(path)
+        return manifest.get("source_version") or hashlib.sha256(
+            json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:12]
+
+
+class ModelSnapshot:
+    """Everything one loaded artifact needs for serving; treated as immutable."""
+
+    def __init__(self, version, path, **parts):
+        self.version = version
+        self.path = path
+        self.loaded_at = time.time()
+        self.__dict__.update(parts)
+
+
+class ModelRegistry:
+    def __init__(self, path, loader, warmup=None, on_swap=None):
+        """
+        loader(path, version) -> dict of snapshot parts; warmup(snapshot) runs before the swap;
+        on_swap(old, new) runs after it. The first load happens synchronously.
+        """
+        self.path = path
+        self.loader = loader
+        self.warmup = warmup
+        self.on_swap = on_swap
+        self._reload_lock = threading.Lock()
+        self._hook_lock = threading.Lock()
+        self._watcher = None
+        self.last_error = None
+        self.reloads = 0
+        self._file_version = artifact_version(path)
+        self.current = self._build()
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def _build(self):
+        version = content_version(self.path)
+        snap = ModelSnapshot(version, self.path, **self.loader(self.path, version))
+        if self.warmup is not None:
+            self.warmup(snap)
+        return snap
+
+    def reload(self, force=False):
+        """
+        Load, warm up and swap in the artifact at self.path. Returns the served
+        snapshot; on failure the old one keeps serving and last_error is set.
+        """
+        with self._reload_lock:
+            self._file_version = artifact_version(self.path)
+            try:
+                if not force and content_version(self.path) == self.current.version:
+                    return self.current
+                new = self._build()
+            except Exception as e:
+                log.exception("Model reload from %s failed; keeping version %s", self.path, self.version)
+                self.last_error = f"{type(e).__name__}: {e}"
+                return self.current
+            old, self.current = self.current, new
+            self.last_error = None
+            self.reloads += 1
+            log.info("Swapped model %s -> %s", old.version, new.version)
+        self._run_swap_hook(old, new)
+        return new
+
+    def _run_swap_hook(self, old, new):
+        if self.on_swap is None:
+            return
+        with self._hook_lock:
+            if new is not self.current:
+                return   # a newer swap happened meanwhile; its hook brings state up to date
+            try:
+                self.on_swap(old, new)
+            except Exception as e:
+                log.exception("on_swap hook failed for model %s", new.version)
+                self.last_error = f"on_swap: {type(e).__name__}: {e}"
+
+    def reload_async(self, force=False):
+        t = threading.Thread(target=self.reload, kwargs={"force": force}, daemon=True)
+        t.start()
+        return t
+
+    def watch(self, interval=5.0):
+        """Poll the artifact's size/mtime every interval seconds and reload on change."""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    if artifact_version(self.path) not in (None, self._file_version):
+                        self.reload()
+                except Exception:
+                    log.exception("Model watcher check of %s failed", self.path)
+
+        self._watcher = threading.Thread(target=_loop, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        snap = self.current
+        return {
+            "model_version": snap.version,
+            "model_path": snap.path,
+            "loaded_at": snap.loaded_at,
+            "reloads": self.reloads,
+            "watching": self._watcher is not None,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,141 @@
+# parallel_scoring.py - multi-process scoring with the model loaded once per worker
+"""
+Workers never receive the model through task pickles. On platforms with fork the
+parent shares its already-loaded scorer (share_scorer) and workers inherit it
+copy-on-write; otherwise each worker loads the artifact once in its initializer.
+DataFrame chunks are sent as task data; encoded feature matrices are placed in a
+shared memory block once and tasks only carry row ranges. Results are yielded back
+in input order.
+
+The shared matrix is float64, so pool results equal in-process ones for any
+estimator. Only a FlatTreeEnsemble, which compares in float32 anyway, gets a
+float32 block (matrix_dtype). Workers attach to the block without registering it
+with a resource tracker; the parent that created it is the only one to unlink it.
+"""
+import multiprocessing as mp
+import os
+import threading
+from collections import deque
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# per-process scoring state: {"score_frame", "numeric_cols", "predict_proba"}
+_worker = {}
+
+
+def share_scorer(score_frame=None, numeric_cols=None, predict_proba=None):
+    """Register this process's scorer so forked workers inherit it instead of reloading."""
+    _worker.update(score_frame=score_frame, numeric_cols=list(numeric_cols or []),
+                   predict_proba=predict_proba)
+
+
+def _init_worker(model_path):
+    if _worker.get("score_frame") is None and _worker.get("predict_proba") is None:
+        from score_file import load_scorer
+        score_frame, _columns, numeric_cols, scorer = load_scorer(model_path)
+        share_scorer(score_frame, numeric_cols, scorer.predict_proba if scorer else None)
+
+
+def _score_chunk_task(args):
+    chunk, keep_columns = args
+    from score_file import score_chunk
+    return score_chunk(_worker["score_frame"], chunk, _worker["numeric_cols"], keep_columns)
+
+
+def matrix_dtype(estimator):
+    """Dtype to share encoded matrices in: float32 for a FlatTreeEnsemble, else float64."""
+    from tree_ensemble import FlatTreeEnsemble
+    return np.float32 if isinstance(estimator, FlatTreeEnsemble) else np.float64
+
+
+def _attach(name):
+    """Open the parent's block without tracking it here (it would be reported as leaked)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _predict_task(args):
+    shm_name, shape, dtype, start, stop = args
+    shm = _attach(shm_name)
+    try:
+        X = np.ndarray(shape, dtype=dtype, buffer=shm.buf)[start:stop]
+        return _worker["predict_proba"](np.array(X))
+    finally:
+        shm.close()
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+class ParallelScorer:
+    """Process pool whose workers hold the model; use as a context manager."""
+
+    def __init__(self, workers=None, model_path="best_model_gb.joblib", start_method=None, dtype=np.float64):
+        self.workers = max(1, int(workers or default_workers()))
+        self.dtype = np.dtype(dtype)   # of the shared matrix, see matrix_dtype
+        if start_method is None:
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+        self._pool = ctx.Pool(self.workers, initializer=_init_worker, initargs=(model_path,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self, wait=True):
+        """Stop accepting tasks; already queued tasks still run. wait=False joins in the background."""
+        self._pool.close()
+        if wait:
+            self._pool.join()
+        else:
+            threading.Thread(target=self._pool.join, daemon=True).start()
+
+    def _ordered(self, fn, tasks, max_pending=None):
+        """Like Pool.imap but never queues more than max_pending tasks (bounded memory)."""
+        max_pending = max_pending or 2 * self.workers
+        pending = deque()
+        for task in tasks:
+            pending.append(self._pool.apply_async(fn, (task,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def score_chunks(self, chunks, keep_columns=False):
+        """Yield scored output frames (see score_file.score_chunk) in input order."""
+        return self._ordered(_score_chunk_task, ((c, keep_columns) for c in chunks))
+
+    def predict_proba(self, X, rows_per_task=65536):
+        """
+        Score an encoded feature matrix across the workers and merge in order. The
+        matrix is shared in self.dtype.
+        """
+        X = np.asarray(X)
+        if len(X) == 0:
+            return np.empty(0, dtype=float)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, X.size * self.dtype.itemsize))
+        try:
+            shared = np.ndarray(X.shape, dtype=self.dtype, buffer=shm.buf)
+            shared[:] = X
+            step = max(1, min(rows_per_task, -(-len(X) // self.workers)))
+            # submit every range up front so a close() right after cannot strand this call
+            pending = [self._pool.apply_async(_predict_task, ((shm.name, X.shape, self.dtype.str, i, i + step),))
+                       for i in range(0, len(X), step)]
+            out = np.concatenate([r.get() for r in pending])
+            del shared
+            return out
+        finally:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,115 @@
+# prediction_cache.py - bounded in-process LRU/TTL cache for single-device predictions
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = ("<missing>",)  # stands in for absent fields so they never collide with None
+
+
+def artifact_version(path):
+    """
+    Cheap fingerprint of a model artifact (size + mtime), None if missing. For a
+    compiled artifact directory the manifest file is fingerprinted.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, "manifest.json")
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def feature_key(device, columns):
+    """
+    Canonical cache key for a device: values of the model's feature columns in a
+    fixed order, so device_id and any other extra keys are ignored. 7 and 7.0 map to
+    the same key (equal and equal-hashing in Python). Returns None if a value is
+    unhashable.
+    """
+    key = tuple(device.get(c, _MISSING) for c in columns)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL. When version_fn is given it is polled
+    at most every check_interval seconds and the cache is cleared whenever the
+    returned version changes (e.g. the model artifact was replaced).
+    """
+
+    def __init__(self, maxsize=10000, ttl=300.0, version_fn=None, check_interval=1.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.version_fn = version_fn
+        self.check_interval = float(check_interval)
+        self._data = OrderedDict()          # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._version = version_fn() if version_fn else None
+        self._next_check = time.monotonic() + self.check_interval
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def _check_version(self, now):
+        if self.version_fn is None or now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        version = self.version_fn()
+        if version != self._version:
+            self._version = version
+            self._data.clear()
+            self.invalidations += 1
+
+    def get(self, key):
+        if key is None or self.maxsize <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(now)
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if key is None or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model_version": self._version,
+            }
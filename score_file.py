@@ -0,0 +1,167 @@
+# score_file.py - stream a CSV/Parquet device table through the saved pipeline
+"""
+Usage:
+    python score_file.py INPUT OUTPUT [--model best_model_gb.joblib] [--chunk-size 100000]
+                         [--keep-columns] [--workers N]
+
+Reads INPUT (.csv or .parquet) in fixed-size chunks, scores each chunk with the
+compiled pipeline and appends failure_probability / risk_category to OUTPUT (.csv
+or .parquet) before reading the next one, so memory stays bounded by the chunk
+size. Rows with missing numeric values get an empty probability and category.
+With --workers, chunks are scored in a process pool (see parallel_scoring.py) and
+written back in input order. Throughput is reported on stderr.
+
+Parquet input/output needs pyarrow.
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from fast_scorer import CompiledScorer
+from scoring import categorize_probs, pipeline_columns
+
+ID_COLUMN = "device_id"
+
+
+def _is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def iter_chunks(path, chunk_size, columns=None):
+    """Yield DataFrames of at most chunk_size rows from a CSV or Parquet file."""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        names = None if columns is None else [c for c in columns if c in pf.schema_arrow.names]
+        for batch in pf.iter_batches(batch_size=chunk_size, columns=names):
+            yield batch.to_pandas()
+    else:
+        usecols = None if columns is None else (lambda c: c in columns)
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=usecols)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = _is_parquet(path)
+        self._writer = None
+        self._header = True
+
+    def write(self, df):
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def load_scorer(model_path):
+    """
+    Load the saved pipeline (or a model_export.py directory) and return
+    (score_fn, columns, numeric_cols, scorer): score_fn maps a frame to probabilities;
+    scorer is the CompiledScorer, or None if the pipeline could not be compiled.
+    """
+    if os.path.isdir(model_path):
+        from model_export import load_compiled
+        scorer = load_compiled(model_path)
+        return scorer.score_frame, scorer.columns, scorer.num_cols, scorer
+    pipeline = joblib.load(model_path)
+    columns, numeric_cols = pipeline_columns(pipeline)
+    try:
+        scorer = CompiledScorer.from_pipeline(pipeline)
+        score_fn = scorer.score_frame
+    except Exception:
+        traceback.print_exc()
+        scorer = None
+        score_fn = lambda df: pipeline.predict_proba(df[columns])[:, 1]  # noqa: E731
+    return score_fn, columns, numeric_cols, scorer
+
+
+def score_chunk(score_fn, chunk, numeric_cols, keep_columns=False):
+    """Score one chunk; rows with missing numerics get NaN / empty category."""
+    missing = chunk[numeric_cols].isna().any(axis=1).to_numpy() if numeric_cols else None
+    if missing is not None and missing.any():
+        probs = np.full(len(chunk), np.nan)
+        ok = ~missing
+        if ok.any():
+            probs[ok] = score_fn(chunk.loc[ok])
+    else:
+        probs = score_fn(chunk)
+    cats = categorize_probs(probs)
+    if missing is not None:
+        cats[missing] = ""
+
+    if keep_columns:
+        out = chunk.copy()
+    elif ID_COLUMN in chunk.columns:
+        out = chunk[[ID_COLUMN]].copy()
+    else:
+        out = pd.DataFrame(index=chunk.index)
+    out["failure_probability"] = probs
+    out["risk_category"] = cats
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("input")
+    ap.add_argument("output")
+    ap.add_argument("--model", default="best_model_gb.joblib")
+    ap.add_argument("--chunk-size", type=int, default=100_000)
+    ap.add_argument("--keep-columns", action="store_true", help="copy all input columns to the output")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="score chunks in this many processes (0 = one per CPU)")
+    args = ap.parse_args(argv)
+
+    if not os.path.exists(args.model):
+        ap.error(f"Model file not found at {args.model}")
+    score_fn, pipeline_cols, numeric_cols, scorer = load_scorer(args.model)
+    read_cols = None if args.keep_columns else set(pipeline_cols) | {ID_COLUMN}
+    chunks = iter_chunks(args.input, args.chunk_size, read_cols)
+
+    pool = None
+    if args.workers != 1:
+        from parallel_scoring import ParallelScorer, share_scorer
+        share_scorer(score_fn, numeric_cols, scorer.predict_proba if scorer else None)
+        pool = ParallelScorer(args.workers or None, model_path=args.model)
+        scored = pool.score_chunks(chunks, args.keep_columns)
+    else:
+        scored = (score_chunk(score_fn, c, numeric_cols, args.keep_columns) for c in chunks)
+
+    writer = ChunkWriter(args.output)
+    total, t0 = 0, time.perf_counter()
+    try:
+        for out in scored:
+            writer.write(out)
+            total += len(out)
+            elapsed = time.perf_counter() - t0
+            print(f"scored {total:,} rows  {total / elapsed:,.0f} rows/s", file=sys.stderr)
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.close()
+
+    elapsed = time.perf_counter() - t0
+    print(f"done: {total:,} rows in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/s) -> {args.output}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
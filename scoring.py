@@ -0,0 +1,55 @@
+# scoring.py - shared helpers for scoring devices with the saved pipeline
+import numpy as np
+import pandas as pd
+
+# Fixed cutoffs: Low=0.30, High=0.70
+LOW_CUTOFF = 0.30
+HIGH_CUTOFF = 0.70
+RISK_LABELS = np.array(["Safe", "Moderate Risk", "High Risk"], dtype=object)
+
+
+class InvalidDevice(ValueError):
+    """A device payload that cannot be scored (missing or mistyped fields)."""
+
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)   # per-field error dicts, see validation.py
+
+
+def categorize_prob_fixed(p: float) -> str:
+    """Fixed cutoffs: Low=0.30, High=0.70."""
+    if p >= HIGH_CUTOFF:
+        return "High Risk"
+    elif p >= LOW_CUTOFF:
+        return "Moderate Risk"
+    else:
+        return "Safe"
+
+
+def categorize_probs(probs) -> np.ndarray:
+    """Vectorized categorize_prob_fixed over an array of probabilities."""
+    probs = np.asarray(probs, dtype=float)
+    idx = (probs >= LOW_CUTOFF).astype(np.intp) + (probs >= HIGH_CUTOFF)
+    return RISK_LABELS[idx]
+
+
+def pipeline_columns(pipeline):
+    """Return (feature_columns, numeric_columns) the fitted pipeline expects."""
+    columns = [str(c) for c in getattr(pipeline, "feature_names_in_", [])]
+    numeric = []
+    pre = getattr(pipeline, "named_steps", {}).get("preprocessor")
+    for name, _trans, cols in getattr(pre, "transformers_", []) or []:
+        if name == "num":
+            numeric = [str(c) for c in cols]
+    if columns:
+        # engineered columns (feature_engineering.py) are scaled but not sent by clients
+        numeric = [c for c in numeric if c in columns]
+    return columns, numeric
+
+
+def score_devices(pipeline, devices, columns):
+    """Score a list of validated device dicts with one predict_proba call."""
+    if not devices:
+        return np.empty(0, dtype=float)
+    df = pd.DataFrame({c: [d[c] for d in devices] for c in columns}, columns=columns)
+    return pipeline.predict_proba(df)[:, 1]
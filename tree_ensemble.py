@@ -0,0 +1,241 @@
+# tree_ensemble.py - array-backed evaluator for a fitted GradientBoostingClassifier
+"""
+FlatTreeEnsemble exports every boosted regression tree into contiguous NumPy arrays
+(feature, threshold, left, right, value) indexed by a global node id.
+
+Two evaluation strategies share those arrays:
+
+* level-by-level (small batches, single rows, trees too deep for the bitvector):
+  each step gathers the split feature of the current node for every (row, tree)
+  pair and moves to the left or right child with one np.where. Leaves point to
+  themselves, so after max_depth steps every pair sits on its leaf. Rows go in
+  blocks of about LEVELWISE_BLOCK_PAIRS (row, tree) pairs, so the node and value
+  arrays stay a few MB whatever the batch size.
+* predicated bitvector traversal (large batches, trees with at most 8 leaves):
+  every tree keeps a uint8 mask of candidate leaves per row. Each split node whose
+  test fails clears the bits of its left subtree, branch-free over a whole column
+  of rows; the exit leaf is the lowest set bit, looked up in a 256-entry table of
+  leaf values.
+
+contributions() attributes each row's log-odds to the input features with the
+Saabas path method: walking a row from root to leaf, every split credits its
+feature with the change in the expected value of the node (cover-weighted mean of
+its leaves). Contributions plus the bias add up exactly to decision_function.
+
+Rows are compared in float32 exactly like sklearn's tree code, so every row lands
+on the same leaves and probabilities match GradientBoostingClassifier.predict_proba
+up to float summation order. Only fitted attributes are read;
+sklearn is not imported.
+"""
+import numpy as np
+
+# batches at least this large use the bitvector traversal
+BITVECTOR_MIN_ROWS = 64
+BITVECTOR_BLOCK_ROWS = 32768
+# (row, tree) pairs per block of the level-by-level traversal and of contributions()
+LEVELWISE_BLOCK_PAIRS = 1 << 18
+
+
+class FlatTreeEnsemble:
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 init_raw, n_features, cover=None):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)   # learning rate folded in
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.init_raw = float(init_raw)
+        self.n_features_in_ = int(n_features)
+        self.cover = None if cover is None else np.asarray(cover, dtype=np.float64)  # training weight per node
+        self._expected = None
+        self.classes_ = np.array([0, 1])
+        self._bitvector = _build_bitvector_tables(self)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_estimator(cls, gb):
+        """Flatten a fitted binary GradientBoostingClassifier."""
+        estimators = getattr(gb, "estimators_", None)
+        if estimators is None or estimators.ndim != 2 or estimators.shape[1] != 1:
+            raise ValueError("Only fitted binary GradientBoostingClassifier models can be flattened")
+        if getattr(gb, "loss", "log_loss") not in ("log_loss", "deviance"):
+            raise ValueError(f"Unsupported loss {gb.loss!r}")
+
+        lr = float(gb.learning_rate)
+        feature, threshold, left, right, value, roots, cover = [], [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for est in estimators[:, 0]:
+            t = est.tree_
+            n = t.node_count
+            is_leaf = t.children_left == -1
+            ids = np.arange(offset, offset + n)
+            feature.append(np.where(is_leaf, 0, t.feature))
+            # leaves loop on themselves: x <= inf always goes "left" to the same node
+            threshold.append(np.where(is_leaf, np.inf, t.threshold))
+            left.append(np.where(is_leaf, ids, t.children_left + offset))
+            right.append(np.where(is_leaf, ids, t.children_right + offset))
+            value.append(lr * t.value.reshape(n))
+            cover.append(t.weighted_n_node_samples)
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, t.max_depth)
+
+        return cls(np.concatenate(feature), np.concatenate(threshold), np.concatenate(left),
+                   np.concatenate(right), np.concatenate(value), roots, max_depth,
+                   _init_raw_prediction(gb), gb.n_features_in_, np.concatenate(cover))
+
+    # ---------- evaluation ----------
+    @property
+    def bitvector(self):
+        """True if every tree is small enough (at most 8 leaves) for the bitvector traversal."""
+        return self._bitvector is not None
+
+    def _row_blocks(self, n):
+        step = max(1, LEVELWISE_BLOCK_PAIRS // max(1, self.n_trees))
+        return [(start, min(start + step, n)) for start in range(0, n, step)]
+
+    def _descend(self, X, node):
+        """One level down for every (row, tree) pair of a C-contiguous float32 block."""
+        x = X.ravel()[(np.arange(X.shape[0]) * X.shape[1])[:, None] + self.feature[node]]
+        return np.where(x <= self.threshold[node], self.left[node], self.right[node])
+
+    def _apply_block(self, X):
+        node = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            node = self._descend(X, node)
+        return node
+
+    def apply(self, X):
+        """Leaf node id for every (row, tree) pair, shape (n_rows, n_trees)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        node = np.empty((X.shape[0], self.n_trees), dtype=np.intp)
+        for start, stop in self._row_blocks(X.shape[0]):
+            node[start:stop] = self._apply_block(X[start:stop])
+        return node
+
+    def _decision_levelwise(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        raw = np.empty(X.shape[0])
+        for start, stop in self._row_blocks(X.shape[0]):
+            raw[start:stop] = self.init_raw + self.value[self._apply_block(X[start:stop])].sum(axis=1)
+        return raw
+
+    def _decision_bitvector(self, X):
+        tree_ptr, feature, threshold, clear, leaf_table = self._bitvector
+        X = np.asarray(X, dtype=np.float32)
+        raw = np.full(X.shape[0], self.init_raw)
+        for start in range(0, X.shape[0], BITVECTOR_BLOCK_ROWS):
+            # float32-rounded values compared against float64 thresholds, column-major
+            cols = np.ascontiguousarray(X[start:start + BITVECTOR_BLOCK_ROWS].T, dtype=np.float64)
+            out = raw[start:start + cols.shape[1]]
+            for t in range(self.n_trees):
+                mask = np.full(cols.shape[1], 0xFF, dtype=np.uint8)
+                for k in range(tree_ptr[t], tree_ptr[t + 1]):
+                    mask &= ~((cols[feature[k]] > threshold[k]).view(np.uint8) * clear[k])
+                out += leaf_table[t][mask]
+        return raw
+
+    def decision_function(self, X):
+        X = np.asarray(X)
+        if self._bitvector is not None and X.shape[0] >= BITVECTOR_MIN_ROWS:
+            return self._decision_bitvector(X)
+        return self._decision_levelwise(X)
+
+    def predict_proba(self, X):
+        p = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return (self.decision_function(X) > 0).astype(int)
+
+    # ---------- explanations ----------
+    def node_expectations(self):
+        """
+        Expected raw value of every node: the leaf value for leaves, the cover-weighted
+        mean of the children for splits. The stored values of internal nodes cannot be
+        used because boosting only rewrites the leaves after each tree is grown.
+        """
+        if self._expected is None:
+            if self.cover is None:
+                raise ValueError("Tree covers are missing; re-export the model to enable explanations")
+            internal = self.left != np.arange(len(self.left))
+            l, r = self.left[internal], self.right[internal]
+            weight = np.where(self.cover > 0, self.cover, 1.0)
+            expected = self.value.copy()
+            for _ in range(self.max_depth):
+                expected[internal] = (self.cover[l] * expected[l] + self.cover[r] * expected[r]) / weight[internal]
+            self._expected = expected
+        return self._expected
+
+    def contributions(self, X):
+        """
+        Saabas attributions: returns (bias, contrib) with contrib of shape
+        (n_rows, n_features_in_) such that bias + contrib.sum(1) == decision_function(X).
+        """
+        expected = self.node_expectations()
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        m = self.n_features_in_
+        contrib = np.zeros((X.shape[0], m))
+        for start, stop in self._row_blocks(X.shape[0]):
+            block, n = X[start:stop], stop - start
+            out = contrib[start:stop].reshape(-1)   # a view: rows of C-contiguous contrib
+            row_base = (np.arange(n) * m)[:, None]
+            node = np.broadcast_to(self.roots, (n, self.n_trees)).copy()
+            for _ in range(self.max_depth):
+                child = self._descend(block, node)
+                # leaves loop on themselves, so their delta is zero
+                out += np.bincount((row_base + self.feature[node]).ravel(),
+                                   weights=(expected[child] - expected[node]).ravel(), minlength=n * m)
+                node = child
+        bias = self.init_raw + float(expected[self.roots].sum())
+        return bias, contrib
+
+
+def _init_raw_prediction(gb):
+    """Log-odds of the init estimator, as GradientBoostingClassifier computes it."""
+    init = gb.init_
+    if init == "zero":
+        return 0.0
+    proba = init.predict_proba(np.zeros((1, gb.n_features_in_)))[0, 1]
+    eps = np.finfo(np.float32).eps
+    proba = np.clip(proba, eps, 1 - eps)
+    return float(np.log(proba / (1 - proba)))
+
+
+def _build_bitvector_tables(ens):
+    """
+    Per-tree split lists for the bitvector traversal, or None if a tree has more
+    than 8 leaves. Leaves are numbered left to right; a failed test (x > threshold)
+    clears the bits of the node's left subtree.
+    """
+    tree_ptr, feature, threshold, clear = [0], [], [], []
+    leaf_table = np.zeros((ens.n_trees, 256))
+    lowest_bit = np.array([(m & -m).bit_length() - 1 if m else 0 for m in range(256)])
+    for t, root in enumerate(ens.roots.tolist()):
+        leaves, splits = [], []
+
+        # in-order walk recording the leaf range of each split's left subtree
+        def walk(node):
+            if ens.left[node] == node:
+                leaves.append(node)
+                return
+            first = len(leaves)
+            walk(ens.left[node])
+            splits.append((node, first, len(leaves)))
+            walk(ens.right[node])
+        walk(root)
+        if len(leaves) > 8:
+            return None
+        for node, lo, hi in splits:
+            feature.append(ens.feature[node])
+            threshold.append(ens.threshold[node])
+            clear.append(sum(1 << b for b in range(lo, hi)))
+        tree_ptr.append(len(feature))
+        leaf_values = ens.value[leaves]
+        leaf_table[t] = leaf_values[np.minimum(lowest_bit, len(leaves) - 1)]
+    return (tree_ptr, feature, threshold, np.array(clear, dtype=np.uint8), leaf_table)
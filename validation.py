@@ -0,0 +1,211 @@
+# validation.py - request schema compiled once per loaded model
+"""
+DeviceSchema checks device payloads (JSON objects) against what the loaded model
+can score, before any DataFrame or feature vector is built:
+
+  number    int or float (not bool), finite
+  integer   int (not bool)
+  string    str; with strict categories also one of the encoder's categories
+
+It is compiled once per model snapshot from the pipeline metadata (input columns,
+numeric vs categorical, OneHotEncoder categories). Type checks go through a
+per-kind {type: ok} table, so a field costs one dict lookup; types not seen
+before are classified once and added to the table.
+
+validate() checks one device. validate_batch() checks a list column by column:
+each column's values and types are gathered with C-level map() calls and
+classified with np.fromiter, and error dicts are built only for the rows that
+fail, so invalid traffic costs about as much as valid traffic.
+
+Errors are lists of {"field", "error", "message"} dicts (plus "allowed" for
+unknown categories); format_errors() turns one into a single message string.
+Categories are checked only with strict=True. An encoder with handle_unknown=
+"ignore" scores unknown values as all-zero columns, so they are valid input.
+"""
+import itertools
+import math
+import numbers
+import operator
+
+import numpy as np
+
+_MISSING = object()
+_KINDS = ("number", "integer", "string")
+
+
+def _type_ok(kind, t):
+    if kind == "string":
+        return issubclass(t, str)
+    if issubclass(t, bool):
+        return False
+    if kind == "integer":
+        return issubclass(t, numbers.Integral)
+    return issubclass(t, numbers.Real)
+
+
+def _finite(v):
+    try:
+        return math.isfinite(v)
+    except OverflowError:   # ints too large for a float
+        return False
+
+
+def field_error(field, error, message, **extra):
+    return {"field": field, "error": error, "message": message, **extra}
+
+
+def format_errors(errors):
+    """One message per error kind, e.g. "missing fields: a, b; non-numeric fields: c"."""
+    groups = {}
+    for e in errors:
+        groups.setdefault(e["error"], []).append(e)
+    parts = []
+    for code, group in groups.items():
+        if code == "not_an_object":
+            parts.append(group[0]["message"])
+        else:
+            parts.append(f"{_SUMMARY.get(code, code)}: " + ", ".join(e["field"] for e in group))
+    return "; ".join(parts)
+
+
+_SUMMARY = {"missing": "missing fields", "not_a_number": "non-numeric fields",
+            "not_an_integer": "non-integer fields", "not_finite": "non-finite fields",
+            "not_a_string": "non-string fields", "unknown_category": "unknown categories"}
+_MESSAGES = {"missing": "field is required", "not_a_number": "expected a number",
+             "not_an_integer": "expected an integer", "not_finite": "expected a finite number",
+             "not_a_string": "expected a string"}
+_TYPE_ERRORS = {"number": "not_a_number", "integer": "not_an_integer", "string": "not_a_string"}
+_NOT_AN_OBJECT = [field_error(None, "not_an_object", "device must be a JSON object")]
+
+
+class DeviceSchema:
+    """Compiled field checks; see the module docstring."""
+
+    def __init__(self, fields, categories=None, strict=False):
+        # fields: {name: kind}; categories: {name: allowed values} for string fields
+        for name, kind in fields.items():
+            if kind not in _KINDS:
+                raise ValueError(f"Unknown kind {kind!r} for field {name!r}")
+        self.fields = dict(fields)
+        self.strict = bool(strict)
+        self.categories = {c: frozenset(v) for c, v in (categories or {}).items()
+                           if c in self.fields and v}
+        self._allowed = {c: sorted(v) for c, v in self.categories.items()}
+        self._type_tables = {kind: {} for kind in _KINDS}
+        self._checks = tuple((name, kind, self._type_tables[kind],
+                              self.categories.get(name) if self.strict else None)
+                             for name, kind in self.fields.items())
+
+    @classmethod
+    def from_columns(cls, columns, numeric_cols, categories=None, strict=False):
+        """Numeric columns are "number", every other column "string"."""
+        numeric = set(numeric_cols)
+        return cls({c: "number" if c in numeric else "string" for c in columns}, categories, strict)
+
+    def describe(self):
+        return {"fields": self.fields, "strict_categories": self.strict,
+                "categories": self._allowed if self.strict else {}}
+
+    @staticmethod
+    def _types_ok(table, kind, types):
+        for t in types.difference(table):
+            table[t] = _type_ok(kind, t)
+
+    def _value_error(self, name, kind, allowed, v):
+        """Error dict for one present value, or None if it is valid."""
+        table = self._type_tables[kind]
+        ok = table.get(type(v))
+        if ok is None:
+            ok = table[type(v)] = _type_ok(kind, type(v))
+        if not ok:
+            return field_error(name, _TYPE_ERRORS[kind], _MESSAGES[_TYPE_ERRORS[kind]])
+        if kind != "string":
+            return None if _finite(v) else field_error(name, "not_finite", _MESSAGES["not_finite"])
+        if allowed is not None and v not in allowed:
+            return field_error(name, "unknown_category", f"unknown category {v!r}",
+                               allowed=self._allowed[name])
+        return None
+
+    # ---------- single device ----------
+    def validate(self, device):
+        """Errors of one device; an empty list if it can be scored."""
+        if not isinstance(device, dict):
+            return list(_NOT_AN_OBJECT)
+        errors = []
+        get = device.get
+        for name, kind, table, allowed in self._checks:
+            v = get(name, _MISSING)
+            if v is _MISSING:
+                errors.append(field_error(name, "missing", _MESSAGES["missing"]))
+                continue
+            # common case: a known-good type holding a finite number or an allowed category
+            if table.get(type(v)) and (_finite(v) if kind != "string" else allowed is None or v in allowed):
+                continue
+            error = self._value_error(name, kind, allowed, v)
+            if error is not None:
+                errors.append(error)
+        return errors
+
+    # ---------- batches ----------
+    def validate_batch(self, devices):
+        """
+        Split a list of devices into rows that can be scored and per-row errors.
+
+        Returns (valid_positions, errors) where errors maps position -> error list.
+        """
+        n = len(devices)
+        bad = np.zeros(n, dtype=bool)
+        is_obj = np.fromiter(map(isinstance, devices, itertools.repeat(dict)), dtype=bool, count=n)
+        rows = devices
+        if not is_obj.all():
+            bad |= ~is_obj
+            blank = dict.fromkeys(self.fields, _MISSING)
+            rows = [d if ok else blank for d, ok in zip(devices, is_obj.tolist())]
+
+        failed = []     # (field, kind, allowed, column values, bad positions)
+        for name, kind, table, allowed in self._checks:
+            try:
+                values = list(map(operator.itemgetter(name), rows))
+            except KeyError:
+                values = [d.get(name, _MISSING) for d in rows]
+            types = set(map(type, values))
+            self._types_ok(table, kind, types)
+            if all(map(table.__getitem__, types)):
+                ok, typed = np.ones(n, dtype=bool), values
+            else:
+                ok = np.fromiter(map(table.__getitem__, map(type, values)), dtype=bool, count=n)
+                typed = list(itertools.compress(values, ok.tolist()))
+            # value checks on the rows whose type is right
+            if kind != "string":
+                # one sum() is finite only if every value is; otherwise find the culprits
+                try:
+                    all_finite = _finite(sum(typed))
+                except OverflowError:
+                    all_finite = False
+                if not all_finite:
+                    ok[ok] = np.isfinite(self._as_float(typed))
+            elif allowed is not None:
+                ok[ok] = np.fromiter(map(allowed.__contains__, typed), dtype=bool, count=len(typed))
+            if not ok.all():
+                col_bad = ~ok & is_obj
+                if col_bad.any():
+                    failed.append((name, kind, allowed, values, np.flatnonzero(col_bad)))
+                bad |= col_bad
+
+        errors = {int(i): list(_NOT_AN_OBJECT) for i in np.flatnonzero(~is_obj)}
+        for name, kind, allowed, values, positions in failed:
+            for i in positions.tolist():
+                v = values[i]
+                if v is _MISSING:
+                    error = field_error(name, "missing", _MESSAGES["missing"])
+                else:
+                    error = self._value_error(name, kind, allowed, v)
+                errors.setdefault(i, []).append(error)
+        return np.flatnonzero(~bad).tolist(), {i: errors[i] for i in sorted(errors)}
+
+    @staticmethod
+    def _as_float(values):
+        try:
+            return np.asarray(values, dtype=float)
+        except OverflowError:
+            return np.array([v if _finite(v) else math.inf for v in values], dtype=float)